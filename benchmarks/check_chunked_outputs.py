@@ -0,0 +1,261 @@
+import os
+import sys
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+import src.utils
+import src.batch_results
+from concurrent.futures import ThreadPoolExecutor
+from src.utils import (
+    update_video_metadata,
+    update_profile_metadata,
+    build_profile_prompt,
+    perform_profile_interview,
+)
+from src.apify_runs import run_actor, mark_actor_run_consumed
+from benchmarks.fake_services import FakeApifyClient, FakeOpenAIClient
+from benchmarks.synthetic_data import (
+    generate_video_items,
+    generate_profile_handles,
+    generate_transcript,
+)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+CHECK_PROJECT = "chunked-check-synthetic"
+VIDEO_METADATA_FILE = "video_metadata.csv"
+PROFILE_METADATA_FILE = "profile_metadata.csv"
+VIDEOS_PER_PROFILE = 25  # Matches PROFILE_SEARCH_RESULTS_PER_PAGE
+LLM_RESPONSE_FIELD = "query_response"
+
+
+def prepare_synthetic_project(size: int, seed: int = 0) -> None:
+    """
+    Ingests synthetic videos from the fake Apify service and gives every video a transcript, as if
+    the search and transcription stages had completed.
+
+    Args:
+        size (int): The number of synthetic videos.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        None
+    """
+    rng = np.random.default_rng(seed)
+    project_dir = f"{base_dir}/../data/{CHECK_PROJECT}"
+    shutil.rmtree(project_dir, ignore_errors=True)
+    os.makedirs(f"{project_dir}/batch-files", exist_ok=True)
+
+    num_profiles = max(1, size // VIDEOS_PER_PROFILE)
+    apify_client = FakeApifyClient(
+        list(generate_video_items(size, num_profiles, seed=seed))
+    )
+    run = run_actor(apify_client, CHECK_PROJECT, "synthetic", {"size": size})
+    update_video_metadata(
+        CHECK_PROJECT,
+        VIDEO_METADATA_FILE,
+        apify_client,
+        run,
+        True,
+        generate_profile_handles(num_profiles),
+    )
+    mark_actor_run_consumed(CHECK_PROJECT, run["id"])
+    update_profile_metadata(CHECK_PROJECT, PROFILE_METADATA_FILE, VIDEO_METADATA_FILE)
+
+    video_metadata = pd.read_csv(f"{project_dir}/{VIDEO_METADATA_FILE}")
+    video_metadata["video_transcript"] = [
+        generate_transcript(rng, 80) for _ in range(len(video_metadata))
+    ]
+    video_metadata.to_csv(f"{project_dir}/{VIDEO_METADATA_FILE}", index=False)
+
+    return None
+
+
+def load_output_rows(output_file: str, ignore_columns: list = []) -> pd.DataFrame:
+    """
+    Loads an output file with its rows ordered by profile ID, since the chunked outputs are
+    ordered by bucket.
+
+    Args:
+        output_file (str): The name of the output file.
+        ignore_columns (list, optional): Columns left out of the comparison. Defaults to [].
+
+    Returns:
+        pd.DataFrame: The rows of the output file.
+    """
+    output_rows = pd.read_csv(
+        f"{base_dir}/../data/{CHECK_PROJECT}/{output_file}", dtype={"id": str}
+    )
+    output_rows = output_rows.drop(columns=ignore_columns, errors="ignore")
+
+    return output_rows.sort_values(by="id").reset_index(drop=True)
+
+
+def compare_outputs(
+    expected_file: str, output_file: str, ignore_columns: list = []
+) -> bool:
+    """
+    Checks that two output files contain identical rows, regardless of their order.
+
+    Args:
+        expected_file (str): The name of the output file of the in-memory run.
+        output_file (str): The name of the output file of a chunked run.
+        ignore_columns (list, optional): Columns left out of the comparison. Defaults to [].
+
+    Returns:
+        bool: Whether the rows are identical.
+    """
+    expected_rows = load_output_rows(expected_file, ignore_columns)
+    output_rows = load_output_rows(output_file, ignore_columns)
+    try:
+        pd.testing.assert_frame_equal(
+            expected_rows, output_rows[expected_rows.columns], check_like=True
+        )
+    except (AssertionError, KeyError) as e:
+        print(f"MISMATCH {output_file} != {expected_file}: {e}")
+        return False
+
+    print(f"OK       {output_file} == {expected_file} ({len(output_rows)} rows)")
+    return True
+
+
+def check_chunked_outputs(
+    size: int, chunk_size: int, concurrency: int, seed: int = 0
+) -> bool:
+    """
+    Checks that the chunked profile prompt and interview stages write the same rows as their
+    in-memory versions, including when several chunked runs of the same project run concurrently.
+
+    The synthetic LLM responses are random, so the interview outputs are compared without them and
+    every profile is only checked to have received a response.
+
+    Args:
+        size (int): The number of synthetic videos.
+        chunk_size (int): The number of profiles held in memory at a time by the chunked runs.
+        concurrency (int): The number of concurrent chunked runs of each stage.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        bool: Whether every chunked output matches the in-memory output.
+    """
+    fake_openai_client = FakeOpenAIClient(seed=seed)
+    src.utils.get_openai_client = lambda: fake_openai_client
+    src.batch_results.get_openai_client = lambda: fake_openai_client
+    prepare_synthetic_project(size, seed=seed)
+
+    def build_prompts(output_file: str, chunk_size: int = None) -> None:
+        build_profile_prompt(
+            project_name=CHECK_PROJECT,
+            profile_metadata_input_file=PROFILE_METADATA_FILE,
+            profile_metadata_output_file=output_file,
+            video_metadata_file=VIDEO_METADATA_FILE,
+            chunk_size=chunk_size,
+        )
+
+    def interview(output_file: str, chunk_size: int = None) -> None:
+        perform_profile_interview(
+            project_name=CHECK_PROJECT,
+            gpt_model="gpt-4o",
+            profile_metadata_file=PROFILE_METADATA_FILE,
+            video_metadata_file=VIDEO_METADATA_FILE,
+            output_file=output_file,
+            system_prompt_field="system_prompt",
+            user_prompt_field="user_prompt",
+            llm_response_field=LLM_RESPONSE_FIELD,
+            interview_type="finfluencer_identification",
+            batch_file_prefix=os.path.splitext(output_file)[0],
+            chunk_size=chunk_size,
+        )
+
+    matches = True
+    for stage, run_stage, ignore_columns in [
+        ("prompts", build_prompts, []),
+        ("interview", interview, [LLM_RESPONSE_FIELD]),
+    ]:
+        expected_file = f"{stage}_in_memory.csv"
+        run_stage(expected_file)
+
+        # Chunked runs of the same project share the video store and data folder
+        output_files = [f"{stage}_chunked_{i}.csv" for i in range(concurrency)]
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(
+                executor.map(
+                    lambda output_file: run_stage(output_file, chunk_size), output_files
+                )
+            )
+
+        for output_file in output_files:
+            matches &= compare_outputs(expected_file, output_file, ignore_columns)
+            if LLM_RESPONSE_FIELD in ignore_columns:
+                output_rows = load_output_rows(output_file)
+                if output_rows[LLM_RESPONSE_FIELD].isnull().any():
+                    print(f"MISMATCH {output_file} has profiles without a response")
+                    matches = False
+
+    return matches
+
+
+def parse_args(args: list = None) -> argparse.Namespace:
+    """
+    Parses the command-line arguments.
+
+    Args:
+        args (list, optional): The arguments to parse. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.check_chunked_outputs",
+        description="Check that the chunked profile stages write the same rows as the in-memory ones.",
+    )
+    parser.add_argument(
+        "--size", type=int, default=2_000, help="The number of synthetic videos."
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=7,
+        help="The number of profiles held in memory at a time by the chunked runs.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=3,
+        help="The number of concurrent chunked runs of each stage.",
+    )
+    parser.add_argument(
+        "--keep-data",
+        action="store_true",
+        help="Keep the synthetic project data after the check.",
+    )
+
+    return parser.parse_args(args)
+
+
+def main(args: list = None) -> int:
+    """
+    Runs the check and returns the exit status.
+
+    Args:
+        args (list, optional): The command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: 0 if every chunked output matches the in-memory output, 1 otherwise.
+    """
+    args = parse_args(args)
+
+    try:
+        matches = check_chunked_outputs(
+            args.size, chunk_size=args.chunk_size, concurrency=args.concurrency
+        )
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(f"{base_dir}/../data/{CHECK_PROJECT}", ignore_errors=True)
+
+    return 0 if matches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,258 @@
+import io
+import json
+import time
+import uuid
+import numpy as np
+from types import SimpleNamespace
+from contextlib import contextmanager
+from benchmarks.synthetic_data import generate_llm_response, generate_transcript
+
+
+class FakeApifyClient:
+    """
+    An in-memory stand-in for the Apify client that serves synthetic video items.
+
+    Args:
+        items (iterable): The items returned by every dataset (e.g. from generate_video_items).
+        latency (float, optional): The seconds slept per actor run. Defaults to 0.0.
+        page_latency (float, optional): The seconds slept per page of dataset items. Defaults to 0.0.
+        page_size (int, optional): The number of dataset items per page. Defaults to 1000.
+    """
+
+    def __init__(
+        self,
+        items,
+        latency: float = 0.0,
+        page_latency: float = 0.0,
+        page_size: int = 1000,
+    ):
+        self.items = items
+        self.latency = latency
+        self.page_latency = page_latency
+        self.page_size = page_size
+        self.runs = {}
+
+    def _start_run(self, run_input: dict = None) -> dict:
+        run_id = uuid.uuid4().hex
+        self.runs[run_id] = {
+            "id": run_id,
+            "status": "SUCCEEDED",
+            "defaultDatasetId": f"dataset-{run_id}",
+        }
+        return self.runs[run_id]
+
+    def _call(self, run_input: dict = None, **kwargs) -> dict:
+        time.sleep(self.latency)
+        return self._start_run(run_input)
+
+    def _wait_for_finish(self, run_id: str) -> dict:
+        time.sleep(self.latency)
+        return self.runs[run_id]
+
+    def _iterate_items(self):
+        for i, item in enumerate(self.items):
+            if i % self.page_size == 0:
+                time.sleep(self.page_latency)
+            yield item
+
+    def actor(self, actor_id: str) -> SimpleNamespace:
+        return SimpleNamespace(call=self._call, start=self._start_run)
+
+    def run(self, run_id: str) -> SimpleNamespace:
+        return SimpleNamespace(
+            get=lambda: self.runs.get(run_id),
+            wait_for_finish=lambda **kwargs: self._wait_for_finish(run_id),
+        )
+
+    def dataset(self, dataset_id: str) -> SimpleNamespace:
+        return SimpleNamespace(iterate_items=self._iterate_items)
+
+
+class FakeOpenAIClient:
+    """
+    An in-memory stand-in for the OpenAI client covering the Whisper, chat completion,
+    file and batch endpoints used by the pipeline.
+
+    Batch outputs follow the format of the OpenAI batch output files, including token usage.
+
+    Args:
+        latency (float, optional): The seconds slept per request. Defaults to 0.0.
+        transcript_words (int, optional): The number of words per synthetic transcript. Defaults to 80.
+        seed (int, optional): The random seed. Defaults to 0.
+        batch_error_rate (float, optional): The fraction of batch requests written to the
+            error file instead of the output file. Defaults to 0.0.
+        batch_expiry_rate (float, optional): The fraction of batch requests left unprocessed,
+            in which case the batch ends as expired. Defaults to 0.0.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        transcript_words: int = 80,
+        seed: int = 0,
+        batch_error_rate: float = 0.0,
+        batch_expiry_rate: float = 0.0,
+    ):
+        self.latency = latency
+        self.batch_error_rate = batch_error_rate
+        self.batch_expiry_rate = batch_expiry_rate
+        self.transcript_words = transcript_words
+        self.rng = np.random.default_rng(seed)
+        self.files_content = {}
+        self.batch_jobs = {}
+
+        self.audio = SimpleNamespace(
+            transcriptions=SimpleNamespace(create=self._create_transcription)
+        )
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self._create_chat_completion)
+        )
+        self.files = SimpleNamespace(
+            create=self._create_file,
+            content=self._file_content,
+            with_streaming_response=SimpleNamespace(content=self._stream_file_content),
+        )
+        self.batches = SimpleNamespace(
+            create=self._create_batch, retrieve=self._retrieve_batch
+        )
+
+    def _create_transcription(self, model: str, file, response_format: str = "text"):
+        time.sleep(self.latency)
+        file.read()
+        return generate_transcript(self.rng, self.transcript_words)
+
+    def _usage(self, messages: list, content: str) -> dict:
+        # Approximate token counts at four characters per token
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _completion_body(self, model: str, messages: list) -> dict:
+        content = generate_llm_response(self.rng)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": self._usage(messages, content),
+        }
+
+    def _create_chat_completion(self, model: str, messages: list, **kwargs):
+        time.sleep(self.latency)
+        body = self._completion_body(model, messages)
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(
+                        content=body["choices"][0]["message"]["content"]
+                    )
+                )
+            ],
+            usage=SimpleNamespace(**body["usage"]),
+        )
+
+    def _create_file(self, file, purpose: str):
+        time.sleep(self.latency)
+        file_id = f"file-{uuid.uuid4().hex}"
+        self.files_content[file_id] = file.read()
+        return SimpleNamespace(id=file_id, purpose=purpose)
+
+    def _file_content(self, file_id: str):
+        time.sleep(self.latency)
+        content = self.files_content[file_id]
+        return SimpleNamespace(content=content, iter_bytes=lambda: iter([content]))
+
+    @contextmanager
+    def _stream_file_content(self, file_id: str):
+        time.sleep(self.latency)
+        content = self.files_content[file_id]
+        yield SimpleNamespace(
+            iter_bytes=lambda chunk_size=None: (
+                content[i : i + (chunk_size or len(content) or 1)]
+                for i in range(0, len(content), chunk_size or len(content) or 1)
+            )
+        )
+
+    def _create_batch(self, input_file_id: str, endpoint: str, completion_window: str):
+        time.sleep(self.latency)
+
+        output = io.StringIO()
+        errors = io.StringIO()
+        expired = False
+        for line in self.files_content[input_file_id].decode().splitlines():
+            task = json.loads(line)
+            outcome = self.rng.random()
+            if outcome < self.batch_expiry_rate:
+                expired = True
+                continue
+            elif outcome < self.batch_expiry_rate + self.batch_error_rate:
+                errors.write(
+                    json.dumps(
+                        {
+                            "id": f"batch_req_{uuid.uuid4().hex}",
+                            "custom_id": task["custom_id"],
+                            "response": {
+                                "status_code": 500,
+                                "request_id": uuid.uuid4().hex,
+                                "body": {
+                                    "error": {
+                                        "message": "The server had an error processing your request.",
+                                        "type": "server_error",
+                                    }
+                                },
+                            },
+                            "error": None,
+                        }
+                    )
+                    + "\n"
+                )
+                continue
+
+            output.write(
+                json.dumps(
+                    {
+                        "id": f"batch_req_{uuid.uuid4().hex}",
+                        "custom_id": task["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "request_id": uuid.uuid4().hex,
+                            "body": self._completion_body(
+                                task["body"]["model"], task["body"]["messages"]
+                            ),
+                        },
+                        "error": None,
+                    }
+                )
+                + "\n"
+            )
+        output_file_id = f"file-{uuid.uuid4().hex}"
+        self.files_content[output_file_id] = output.getvalue().encode()
+        error_file_id = None
+        if errors.getvalue():
+            error_file_id = f"file-{uuid.uuid4().hex}"
+            self.files_content[error_file_id] = errors.getvalue().encode()
+
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        self.batch_jobs[batch_id] = SimpleNamespace(
+            id=batch_id,
+            status="expired" if expired else "completed",
+            input_file_id=input_file_id,
+            output_file_id=output_file_id,
+            error_file_id=error_file_id,
+        )
+        return self.batch_jobs[batch_id]
+
+    def _retrieve_batch(self, batch_id: str):
+        time.sleep(self.latency)
+        return self.batch_jobs[batch_id]
@@ -0,0 +1,495 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+import src.utils
+import src.batch_results
+import src.transcription_backends
+from src.utils import (
+    update_video_metadata,
+    update_profile_metadata,
+    transcribe_videos,
+    load_video_metadata,
+    extract_video_transcripts_grouped,
+    construct_system_prompt,
+    construct_user_prompt,
+    create_batch_file,
+    batch_query,
+    merge_batch_responses,
+    extract_llm_responses,
+)
+from src.apify_runs import run_actor, mark_actor_run_consumed
+from src.market_signals_interview import extract_stock_mentions_from_transcripts
+from config.video_metadata_config import PROMPT_VIDEO_COLUMNS
+from benchmarks.fake_services import FakeApifyClient, FakeOpenAIClient
+from benchmarks.synthetic_data import (
+    generate_video_items,
+    generate_profile_handles,
+    generate_stock_tickers,
+    generate_transcript,
+)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+BENCHMARK_PROJECT = "benchmark-synthetic"
+VIDEO_METADATA_FILE = "video_metadata.csv"
+PROFILE_METADATA_FILE = "profile_metadata.csv"
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+VIDEOS_PER_PROFILE = 25  # Matches PROFILE_SEARCH_RESULTS_PER_PAGE
+BASELINE_FILE = f"{base_dir}/baseline.jsonl"  # Stored results that later runs are checked against
+DEFAULT_TOLERANCE = 0.3  # Fraction by which a stage may be slower than its baseline
+STAGE_TOLERANCES = {  # Stages whose timings are noisier (file I/O and fake service round trips)
+    "ingest_videos": 0.5,
+    "transcription_sample": 0.5,
+    "batch_query": 0.5,
+}
+MIN_REGRESSION_SECONDS = 0.5  # Slowdowns shorter than this are treated as noise
+
+
+def time_stage(results: list, size: int, stage: str, rows: int, function, *args):
+    """
+    Runs a function, records its wall time and prints the result.
+
+    Args:
+        results (list): The list the benchmark result is appended to.
+        size (int): The number of synthetic videos of the benchmark run.
+        stage (str): The name of the timed stage.
+        rows (int): The number of rows processed by the stage.
+        function (callable): The function to time.
+        *args: The arguments passed to the function.
+
+    Returns:
+        The return value of the function.
+    """
+    start_time = time.perf_counter()
+    output = function(*args)
+    seconds = time.perf_counter() - start_time
+
+    result = {
+        "size": size,
+        "stage": stage,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds, 1) if seconds > 0 else None,
+    }
+    results.append(result)
+    print(
+        f"{size:>9} videos  {stage:<24} {rows:>9} rows  {seconds:>9.3f} s  "
+        f"{result['rows_per_second'] or 0:>11.1f} rows/s"
+    )
+
+    return output
+
+
+def run_benchmark(
+    size: int,
+    latency: float,
+    page_latency: float,
+    transcription_sample: int,
+    stock_scan_sample: int,
+    seed: int = 0,
+) -> list:
+    """
+    Benchmarks the pipeline stages on synthetic data with fake Apify and OpenAI services.
+
+    Args:
+        size (int): The number of synthetic videos.
+        latency (float): The seconds slept per fake API request.
+        page_latency (float): The seconds slept per page of fake Apify dataset items.
+        transcription_sample (int): The number of videos transcribed with the fake Whisper endpoint.
+        stock_scan_sample (int): The number of profiles scanned for stock mentions.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        list: The benchmark results of every stage.
+    """
+    results = []
+    rng = np.random.default_rng(seed)
+    project_dir = f"{base_dir}/../data/{BENCHMARK_PROJECT}"
+    shutil.rmtree(project_dir, ignore_errors=True)
+    os.makedirs(f"{project_dir}/video-downloads", exist_ok=True)
+    os.makedirs(f"{project_dir}/batch-files", exist_ok=True)
+
+    num_profiles = max(1, size // VIDEOS_PER_PROFILE)
+    fake_openai_client = FakeOpenAIClient(latency=latency, seed=seed)
+    src.utils.get_openai_client = lambda: fake_openai_client
+    src.batch_results.get_openai_client = lambda: fake_openai_client
+    src.transcription_backends.get_openai_client = lambda: fake_openai_client
+    # The placeholder video files contain no audio to detect speech in
+    src.utils.TRANSCRIPTION_VAD = False
+
+    # Ingest: fetch the dataset of a search run and update the video and profile metadata
+    # (items are generated up front so that generation is not timed)
+    apify_client = FakeApifyClient(
+        list(generate_video_items(size, num_profiles, seed=seed)),
+        latency=latency,
+        page_latency=page_latency,
+    )
+    run = run_actor(apify_client, BENCHMARK_PROJECT, "synthetic", {"size": size})
+    time_stage(
+        results,
+        size,
+        "ingest_videos",
+        size,
+        update_video_metadata,
+        BENCHMARK_PROJECT,
+        VIDEO_METADATA_FILE,
+        apify_client,
+        run,
+        True,
+        generate_profile_handles(num_profiles),
+    )
+    mark_actor_run_consumed(BENCHMARK_PROJECT, run["id"])
+    time_stage(
+        results,
+        size,
+        "ingest_profiles",
+        size,
+        update_profile_metadata,
+        BENCHMARK_PROJECT,
+        PROFILE_METADATA_FILE,
+        VIDEO_METADATA_FILE,
+    )
+
+    # Transcription: transcribe a sample of placeholder video files with the fake Whisper endpoint
+    video_metadata = pd.read_csv(f"{project_dir}/{VIDEO_METADATA_FILE}")
+    video_sample = video_metadata.head(transcription_sample).copy()
+    video_sample["video_filename"] = video_sample["id"].astype(str) + ".mp4"
+    for video_filename in video_sample["video_filename"]:
+        with open(f"{project_dir}/video-downloads/{video_filename}", "wb") as file:
+            file.write(b"\0" * 1024)
+    time_stage(
+        results,
+        size,
+        "transcription_sample",
+        len(video_sample),
+        lambda: video_sample.apply(
+            transcribe_videos, args=(BENCHMARK_PROJECT,), axis=1
+        ),
+    )
+
+    # Give every video a transcript, as if the transcription stage had completed
+    video_metadata["video_transcript"] = [
+        generate_transcript(rng, 80) for _ in range(len(video_metadata))
+    ]
+    video_metadata.to_csv(f"{project_dir}/{VIDEO_METADATA_FILE}", index=False)
+    del video_metadata
+
+    # Load and preprocess the profile and video metadata
+    def load_metadata():
+        profile_metadata = pd.read_csv(f"{project_dir}/{PROFILE_METADATA_FILE}")
+        video_metadata = load_video_metadata(
+            BENCHMARK_PROJECT, VIDEO_METADATA_FILE, usecols=PROMPT_VIDEO_COLUMNS
+        )
+        video_metadata["createTimeISO"] = pd.to_datetime(
+            video_metadata["createTimeISO"]
+        )
+        video_metadata["profile_id"] = video_metadata["profile_id"].astype(str)
+        profile_metadata["id"] = profile_metadata["id"].astype(str)
+        return profile_metadata, video_metadata
+
+    profile_metadata, video_metadata = time_stage(
+        results, size, "load_metadata", size, load_metadata
+    )
+
+    # Transcript aggregation
+    video_transcripts = time_stage(
+        results,
+        size,
+        "transcript_aggregation",
+        size,
+        extract_video_transcripts_grouped,
+        video_metadata,
+    )
+    profile_metadata["transcripts_combined"] = (
+        profile_metadata["id"].map(video_transcripts).fillna("")
+    )
+    del video_metadata, video_transcripts
+
+    # Prompt construction and batch file creation
+    def construct_prompts():
+        profile_metadata["system_prompt"] = profile_metadata.apply(
+            construct_system_prompt, args=("finfluencer_identification",), axis=1
+        )
+        profile_metadata["user_prompt"] = profile_metadata.apply(
+            construct_user_prompt, args=("finfluencer_identification",), axis=1
+        )
+        profile_metadata["custom_id"] = profile_metadata.index
+        create_batch_file(
+            profile_metadata,
+            project_name=BENCHMARK_PROJECT,
+            gpt_model="gpt-4o",
+            system_prompt_field="system_prompt",
+            user_prompt_field="user_prompt",
+        )
+
+    time_stage(
+        results, size, "prompt_construction", len(profile_metadata), construct_prompts
+    )
+
+    # Stock mention scanning on a sample of profiles against a synthetic Russell 4000 table
+    russell_4000_stock = generate_stock_tickers(seed=seed)
+    profile_sample = profile_metadata.head(stock_scan_sample)
+    time_stage(
+        results,
+        size,
+        "stock_mention_scan",
+        len(profile_sample),
+        lambda: profile_sample.apply(
+            extract_stock_mentions_from_transcripts,
+            args=(russell_4000_stock,),
+            axis=1,
+        ),
+    )
+
+    # Batch query against the fake batch endpoint (upload, download and parsing of the output file)
+    llm_responses = time_stage(
+        results,
+        size,
+        "batch_query",
+        len(profile_metadata),
+        batch_query,
+        BENCHMARK_PROJECT,
+        "batch_input.jsonl",
+        "batch_output.jsonl",
+    )
+
+    # Response parsing
+    time_stage(
+        results,
+        size,
+        "response_parsing",
+        len(llm_responses),
+        lambda: [extract_llm_responses(response) for response in llm_responses.values()],
+    )
+
+    # Merging responses with the profile metadata
+    time_stage(
+        results,
+        size,
+        "response_merge",
+        len(llm_responses),
+        merge_batch_responses,
+        profile_metadata,
+        llm_responses,
+        "query_response",
+    )
+
+    return results
+
+
+def load_baseline(baseline_path: str) -> dict:
+    """
+    Loads stored benchmark results.
+
+    Args:
+        baseline_path (str): The path to the JSON lines file of the baseline results.
+
+    Returns:
+        dict: The baseline results keyed by (size, stage), empty if the file does not exist.
+    """
+    if not os.path.exists(baseline_path):
+        return {}
+
+    with open(baseline_path, "r") as file:
+        baseline_results = [json.loads(line) for line in file if line.strip()]
+
+    return {(result["size"], result["stage"]): result for result in baseline_results}
+
+
+def save_baseline(baseline_path: str, results: list) -> None:
+    """
+    Stores benchmark results as the baseline, replacing the baseline of the same sizes and
+    stages and keeping the others.
+
+    Args:
+        baseline_path (str): The path to the JSON lines file of the baseline results.
+        results (list): The benchmark results.
+
+    Returns:
+        None
+    """
+    baseline = load_baseline(baseline_path)
+    for result in results:
+        baseline[(result["size"], result["stage"])] = result
+
+    with open(baseline_path, "w") as file:
+        for size, stage in sorted(baseline, key=lambda key: key[0]):
+            file.write(json.dumps(baseline[(size, stage)]) + "\n")
+
+    return None
+
+
+def check_regressions(
+    results: list, baseline: dict, tolerance: float = DEFAULT_TOLERANCE
+) -> list:
+    """
+    Compares every stage with its baseline at the same size and prints the result.
+
+    A stage regresses when it is slower than its baseline by more than its tolerance (from
+    STAGE_TOLERANCES, or the default tolerance) and by more than MIN_REGRESSION_SECONDS.
+
+    Args:
+        results (list): The benchmark results.
+        baseline (dict): The baseline results keyed by (size, stage) (see load_baseline).
+        tolerance (float, optional): The tolerance of the stages without their own. Defaults to DEFAULT_TOLERANCE.
+
+    Returns:
+        list: The results of the stages that regressed.
+    """
+    regressions = []
+    for result in results:
+        baseline_result = baseline.get((result["size"], result["stage"]))
+        if baseline_result is None:
+            print(f"{result['size']:>9} videos  {result['stage']:<24} no baseline")
+            continue
+
+        stage_tolerance = STAGE_TOLERANCES.get(result["stage"], tolerance)
+        baseline_seconds = baseline_result["seconds"]
+        slowdown = result["seconds"] / baseline_seconds - 1 if baseline_seconds > 0 else 0.0
+        regressed = (
+            result["seconds"] > baseline_seconds * (1 + stage_tolerance)
+            and result["seconds"] - baseline_seconds > MIN_REGRESSION_SECONDS
+        )
+        if regressed:
+            regressions.append(result)
+        print(
+            f"{result['size']:>9} videos  {result['stage']:<24} {baseline_seconds:>9.3f} s -> "
+            f"{result['seconds']:>9.3f} s  {slowdown:>+8.1%}  (tolerance {stage_tolerance:.0%})"
+            f"  {'REGRESSION' if regressed else 'ok'}"
+        )
+
+    return regressions
+
+
+def parse_args(args: list = None) -> argparse.Namespace:
+    """
+    Parses the command-line arguments.
+
+    Args:
+        args (list, optional): The arguments to parse. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run_benchmarks",
+        description="Benchmark the pipeline stages on synthetic data with fake Apify and OpenAI services.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="The numbers of synthetic videos to benchmark.",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="The seconds slept per fake API request.",
+    )
+    parser.add_argument(
+        "--page-latency",
+        type=float,
+        default=0.0,
+        help="The seconds slept per page of fake Apify dataset items.",
+    )
+    parser.add_argument(
+        "--transcription-sample",
+        type=int,
+        default=100,
+        help="The number of videos transcribed with the fake Whisper endpoint.",
+    )
+    parser.add_argument(
+        "--stock-scan-sample",
+        type=int,
+        default=10,
+        help="The number of profiles scanned for stock mentions.",
+    )
+    parser.add_argument(
+        "--output", help="The JSON lines file the benchmark results are written to."
+    )
+    parser.add_argument(
+        "--keep-data",
+        action="store_true",
+        help="Keep the synthetic project data after the benchmark.",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_FILE,
+        help="The JSON lines file of the baseline results the stages are checked against.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="The fraction by which a stage without its own tolerance may be slower than its baseline.",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results as the baseline instead of checking them against it.",
+    )
+
+    return parser.parse_args(args)
+
+
+def main(args: list = None) -> int:
+    """
+    Runs the benchmark for every requested size and checks the stages against the baseline.
+
+    Args:
+        args (list, optional): The command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: 1 if a stage regressed against the baseline, 0 otherwise.
+    """
+    args = parse_args(args)
+
+    results = []
+    try:
+        for size in args.sizes:
+            results += run_benchmark(
+                size,
+                latency=args.latency,
+                page_latency=args.page_latency,
+                transcription_sample=args.transcription_sample,
+                stock_scan_sample=args.stock_scan_sample,
+            )
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(
+                f"{base_dir}/../data/{BENCHMARK_PROJECT}", ignore_errors=True
+            )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            for result in results:
+                file.write(json.dumps(result) + "\n")
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Stored the results as the baseline in {args.baseline}.")
+        return 0
+
+    print("Checking the stages against the baseline...")
+    regressions = check_regressions(
+        results, load_baseline(args.baseline), tolerance=args.tolerance
+    )
+    if regressions:
+        print(
+            f"{len(regressions)} stages regressed: "
+            + ", ".join(f"{result['stage']} ({result['size']})" for result in regressions)
+        )
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
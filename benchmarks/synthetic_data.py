@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+
+WORDS = (
+    "market stocks invest money portfolio dividend growth earnings trading options "
+    "bonds inflation rates savings crypto budget retirement index fund value price "
+    "today week buy sell hold risk return strategy analysis election vote policy"
+).split()
+
+
+def generate_stock_tickers(num_stocks: int = 4000, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates a synthetic stock ticker table with the columns of the Russell 4000 ticker file.
+
+    Args:
+        num_stocks (int, optional): The number of stocks. Defaults to 4000.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: A DataFrame with 'COMNAM', 'SHORTEN_COMNAM' and 'TICKER' columns.
+    """
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    short_names = [f"Company{i}" for i in range(num_stocks)]
+
+    return pd.DataFrame(
+        {
+            "COMNAM": [f"{name} Holdings Inc" for name in short_names],
+            "SHORTEN_COMNAM": short_names,
+            "TICKER": ["".join(rng.choice(letters, size=4)) for _ in range(num_stocks)],
+        }
+    )
+
+
+def generate_sentence(rng: np.random.Generator, num_words: int) -> str:
+    """
+    Generates a sentence of random words.
+
+    Args:
+        rng (np.random.Generator): The random number generator.
+        num_words (int): The number of words.
+
+    Returns:
+        str: The generated sentence.
+    """
+    return " ".join(rng.choice(WORDS, size=num_words))
+
+
+def generate_transcript(
+    rng: np.random.Generator, num_words: int, num_stocks: int = 4000
+) -> str:
+    """
+    Generates a synthetic video transcript that occasionally mentions a company.
+
+    Args:
+        rng (np.random.Generator): The random number generator.
+        num_words (int): The number of words.
+        num_stocks (int, optional): The number of companies that may be mentioned. Defaults to 4000.
+
+    Returns:
+        str: The generated transcript.
+    """
+    transcript = generate_sentence(rng, num_words)
+    if rng.random() < 0.3:
+        transcript += f" I am buying Company{rng.integers(num_stocks)} this week."
+
+    return transcript
+
+
+def generate_profile_handles(num_profiles: int) -> list:
+    """
+    Generates synthetic TikTok profile handles.
+
+    Args:
+        num_profiles (int): The number of profiles.
+
+    Returns:
+        list: The profile handles.
+    """
+    return [f"synthetic_user_{i}" for i in range(num_profiles)]
+
+
+def generate_video_items(
+    num_videos: int,
+    num_profiles: int,
+    profile_search: bool = True,
+    search_terms: list = None,
+    seed: int = 0,
+):
+    """
+    Generates synthetic video items in the format returned by the Apify TikTok scraper dataset.
+
+    Args:
+        num_videos (int): The number of videos.
+        num_profiles (int): The number of profiles the videos are spread across.
+        profile_search (bool, optional): Whether to generate profile search ('input') or keyword search ('searchQuery') items. Defaults to True.
+        search_terms (list, optional): The search terms used for keyword search items. Defaults to ["stocks"].
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Yields:
+        dict: A video item.
+    """
+    rng = np.random.default_rng(seed)
+    handles = generate_profile_handles(num_profiles)
+    search_terms = search_terms or ["stocks"]
+    profile_fans = rng.integers(100, 5_000_000, size=num_profiles)
+    start_time = 1_700_000_000
+
+    for i in range(num_videos):
+        profile_index = i % num_profiles
+        handle = handles[profile_index]
+        video_id = str(7_300_000_000_000_000_000 + i)
+        create_time = start_time + int(rng.integers(0, 30_000_000))
+        play_count = int(rng.integers(100, 10_000_000))
+
+        item = {
+            "id": video_id,
+            "text": f"{generate_sentence(rng, 12)} #finance #stocks",
+            "textLanguage": "en",
+            "createTime": create_time,
+            "createTimeISO": pd.Timestamp(create_time, unit="s").strftime(
+                "%Y-%m-%dT%H:%M:%S.000Z"
+            ),
+            "isAd": False,
+            "authorMeta": {
+                "id": str(6_800_000_000_000_000_000 + profile_index),
+                "name": handle,
+                "profileUrl": f"https://www.tiktok.com/@{handle}",
+                "nickName": f"Synthetic User {profile_index}",
+                "verified": bool(profile_index % 50 == 0),
+                "signature": generate_sentence(rng, 8),
+                "bioLink": None,
+                "avatar": f"https://p16-sign.tiktokcdn.com/{handle}.jpeg",
+                "privateAccount": False,
+                "region": "US",
+                "roomId": "",
+                "ttSeller": False,
+                "following": int(rng.integers(0, 2000)),
+                "friends": int(rng.integers(0, 500)),
+                "fans": int(profile_fans[profile_index]),
+                "heart": int(profile_fans[profile_index] * rng.integers(1, 20)),
+                "video": int(rng.integers(10, 2000)),
+                "digg": int(rng.integers(0, 10000)),
+            },
+            "musicMeta": {
+                "musicName": f"original sound - {handle}",
+                "musicAuthor": handle,
+                "musicOriginal": True,
+                "musicId": str(7_200_000_000_000_000_000 + i),
+            },
+            "webVideoUrl": f"https://www.tiktok.com/@{handle}/video/{video_id}",
+            "mediaUrls": [],
+            "videoMeta": {
+                "height": 1024,
+                "width": 576,
+                "duration": int(rng.integers(5, 180)),
+                "definition": "540p",
+                "format": "mp4",
+            },
+            "diggCount": int(play_count * rng.random() * 0.1),
+            "shareCount": int(play_count * rng.random() * 0.01),
+            "playCount": play_count,
+            "collectCount": int(play_count * rng.random() * 0.01),
+            "commentCount": int(play_count * rng.random() * 0.01),
+            "mentions": [],
+            "detailedMentions": [
+                {
+                    "id": str(6_800_000_000_000_000_000 + (profile_index + 1) % num_profiles),
+                    "name": handles[(profile_index + 1) % num_profiles],
+                    "nickName": f"Synthetic User {(profile_index + 1) % num_profiles}",
+                    "profileUrl": f"https://www.tiktok.com/@{handles[(profile_index + 1) % num_profiles]}",
+                }
+            ],
+            "hashtags": [
+                {"id": "1", "name": "finance", "title": "", "cover": ""},
+                {"id": "2", "name": "stocks", "title": "", "cover": ""},
+            ],
+            "effectStickers": [],
+            "isSlideshow": False,
+            "isPinned": False,
+            "isSponsored": False,
+        }
+        if profile_search:
+            item["input"] = handle
+        else:
+            item["searchQuery"] = search_terms[i % len(search_terms)]
+
+        yield item
+
+
+def generate_llm_response(rng: np.random.Generator) -> str:
+    """
+    Generates a synthetic LLM response in the format parsed by extract_llm_responses.
+
+    Args:
+        rng (np.random.Generator): The random number generator.
+
+    Returns:
+        str: The generated response.
+    """
+    is_finfluencer = rng.random() < 0.5
+    return (
+        f"**question: Is this a finfluencer?**  \n"
+        f"**explanation: {generate_sentence(rng, 30)}**  \n"
+        f"**symbol: {'A1' if is_finfluencer else 'A2'})**  \n"
+        f"**category: {'Yes' if is_finfluencer else 'No'}**  \n"
+        f"**speculation: {int(rng.integers(0, 100))}**\n\n"
+        f"**question: Which of these areas of finance are the primary focus of the influencer’s posts?**  \n"
+        f"**explanation: {generate_sentence(rng, 30)}**  \n"
+        f"**symbol: B{int(rng.integers(1, 8))}**  \n"
+        f"**speculation: {int(rng.integers(0, 100))}**\n\n"
+        f"**question: Indicate on a scale of 0 to 100, how influential this influencer is?**  \n"
+        f"**explanation: {generate_sentence(rng, 30)}**  \n"
+        f"**value: {int(rng.integers(0, 100))}**  \n"
+        f"**speculation: {int(rng.integers(0, 100))}**"
+    )
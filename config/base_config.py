@@ -12,3 +12,90 @@ GPT_MODEL = "gpt-4o"  # gpt-4o, gpt-4o-mini
 KEYWORD_SEARCH_RESULTS_PER_PAGE = 1000
 PROFILE_SEARCH_RESULTS_PER_PAGE = 25
 TOP_N_PROFILES = 100
+PIPELINE_MAX_WORKERS = 4  # Maximum number of independent pipeline stages run concurrently
+POLLING_STORE_FILE = "polling_store.sqlite"  # Append-only store of polling results and polled profiles
+POLLING_MAX_WORKERS = 16  # Concurrent chat completion requests when polling without the batch API
+IMPORT_TIME_BUDGET_MS = 750  # Maximum import time of a pipeline entry point (see src/import_budget.py)
+METRICS_FORMAT = "jsonl"  # jsonl (append-only stage metrics) or prometheus (also writes a Prometheus text file)
+METRICS_FILE = "metrics.jsonl"  # Stage metrics of every run, one JSON object per stage
+PROMETHEUS_METRICS_FILE = "metrics.prom"  # Latest stage metrics in the Prometheus text format
+GPT_MODEL_PRICING = {  # USD per 1M tokens (input, output) of the real-time API
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+BATCH_PRICE_DISCOUNT = 0.5  # Batch API requests are billed at half the real-time price
+BATCH_BUDGET_USD = 50.0  # Maximum projected cost of a single batch submission
+BATCH_BUDGET_ACTION = "shard"  # shard (split into submissions within budget) or refuse (raise an error)
+BATCH_EXPECTED_COMPLETION_TOKENS = 1000  # Completion tokens per request when no previous batch output exists
+BATCH_MAX_REQUESTS = 50000  # Maximum number of requests per batch file accepted by the OpenAI batch API
+BATCH_MAX_FILE_BYTES = 200 * 1024 * 1024  # Maximum batch file size accepted by the OpenAI batch API
+BATCH_DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes of a batch output file streamed to disk at a time
+BATCH_MAX_RESUBMISSIONS = 3  # Follow-up submissions of the failed or missing requests of a batch before giving up
+BATCH_REALTIME_RESUBMISSION_MAX = 100  # Failed or missing requests resent through the real-time API instead of a follow-up batch
+TRANSCRIPTION_STORE_FILE = "transcription_store.sqlite"  # Per-video transcription attempts and failures
+APIFY_RUN_STORE_FILE = "apify_run_store.sqlite"  # Started Apify actor runs, reattached to by restarted searches
+TRANSCRIPTION_MAX_ATTEMPTS = 5  # Failed attempts after which a video is no longer transcribed
+TRANSCRIPTION_RETRY_BASE_SECONDS = 3600  # Wait after the first failed attempt, doubled after each further failure
+TRANSCRIPTION_RETRY_MAX_SECONDS = 7 * 24 * 3600  # Maximum wait between two attempts
+TRANSCRIPTION_PERMANENT_ERROR_MESSAGES = [  # Download errors of videos that will never be available
+    "private",
+    "unavailable",
+    "not available",
+    "removed",
+    "404",
+]
+TRANSCRIPTION_SERVICE_ERROR_STATUS_CODES = [401, 403, 429]  # API errors of the account or quota rather than the video (as are 5xx errors)
+TRANSCRIPTION_SERVICE_ERROR_MESSAGES = [  # Download errors of the network or the video host rather than the video
+    "http error 429",
+    "http error 5",
+    "timed out",
+    "urlopen error",
+    "connection reset",
+    "connection refused",
+    "name resolution",
+]
+TRANSCRIPTION_PRIORITY_KEYS = [  # Order in which videos are transcribed, highest value first
+    "panel",  # Videos of panel profiles
+    "createTimeISO",  # Latest videos
+    "playCount",  # Most viewed videos
+    "engagement",  # Highest engagement rate (see calculate_video_engagement)
+]
+TRANSCRIPTION_BUDGET_AUDIO_MINUTES = None  # Maximum minutes of audio transcribed per run (None for no limit)
+TRANSCRIPTION_BUDGET_USD = None  # Maximum transcription spend per run (None for no limit)
+WHISPER_PRICE_PER_MINUTE = 0.006  # USD per minute of audio transcribed by whisper-1
+TRANSCRIPTION_PRICE_PER_MINUTE = {  # USD per minute of audio by transcription backend, the spend budget only applies to these
+    "openai": WHISPER_PRICE_PER_MINUTE,
+}
+TRANSCRIPTION_UNKNOWN_DURATION_SECONDS = 600  # Duration charged to the transcription budgets for videos whose duration is unknown
+TRANSCRIPTION_VAD = True  # Skip videos without speech and trim silence before transcription (requires webrtcvad)
+VAD_AGGRESSIVENESS = 2  # webrtcvad aggressiveness, from 0 (least) to 3 (most likely to classify audio as non-speech)
+VAD_FRAME_MS = 30  # Length of the audio frames classified by webrtcvad (10, 20 or 30 ms)
+VAD_WINDOW_MS = 300  # Sliding window over which speech is detected, so that isolated noisy frames are ignored
+VAD_TRIGGER_RATIO = 0.9  # Fraction of speech frames for a window to count as speech
+VAD_MIN_SPEECH_SECONDS = 1.0  # Minimum detected speech for a video to be transcribed
+VAD_PADDING_MS = 300  # Audio kept before the first and after the last speech frame
+AUDIO_FINGERPRINT = True  # Reuse the transcript of a previously transcribed video with the same audio (reused sounds, reposts)
+AUDIO_FINGERPRINT_SAMPLE_RATE = 5000  # Sample rate the audio is downsampled to before fingerprinting
+AUDIO_FINGERPRINT_FRAME = 2048  # Samples per fingerprinted frame (~0.4 s)
+AUDIO_FINGERPRINT_HOP = 128  # Samples between consecutive frames (one sub-fingerprint per hop)
+AUDIO_FINGERPRINT_BAND_EDGES = (300, 2000)  # Frequency range (Hz) split into 33 logarithmic bands
+AUDIO_FINGERPRINT_INDEX_STRIDE = 4  # Every nth sub-fingerprint of a transcribed video is indexed for lookup
+AUDIO_FINGERPRINT_MAX_CANDIDATES = 5  # Best aligned candidate videos compared bit by bit per lookup
+AUDIO_FINGERPRINT_MAX_BIT_ERROR_RATE = 0.2  # Maximum fraction of differing bits for two clips to match
+AUDIO_FINGERPRINT_MIN_OVERLAP = 0.9  # Minimum aligned fraction of the longer clip for two clips to match
+SUBTITLE_EXCLUDED_SOURCES = ["MT"]  # Subtitle sources that do not transcribe the spoken audio (machine translations)
+SUBTITLE_DOWNLOAD_TIMEOUT = 30  # Seconds before a subtitle download is abandoned and the video is transcribed with Whisper
+SUBTITLE_DOWNLOAD_MAX_WORKERS = 16  # Concurrent subtitle downloads at ingest
+TRANSCRIPTION_BACKEND = "openai"  # Default transcription backend: "openai" (Whisper API) or "faster-whisper" (local CPU model), see src/transcription_backends.py
+TRANSCRIPTION_BATCH_SIZE = 32  # Videos downloaded and then transcribed together by the backend
+LOCAL_WHISPER_MODEL = "small"  # faster-whisper model size of the local backend
+LOCAL_WHISPER_COMPUTE_TYPE = "int8"  # Quantization of the local model weights
+LOCAL_WHISPER_CPU_THREADS = 4  # CPU threads per local transcription worker
+LOCAL_WHISPER_BATCH_SIZE = 8  # Audio segments decoded together by a local transcription worker
+LOCAL_TRANSCRIPTION_WORKERS = None  # Local transcription worker processes (None for cpu_count // LOCAL_WHISPER_CPU_THREADS)
+VIDEO_DOWNLOAD_OPTIONS = {  # Options of the long-lived yt-dlp downloaders (the output file is set per video)
+    "format": "best",  # Download the best quality available
+    "continuedl": True,  # Resume partial downloads
+    "nopart": False,  # Download to a '.part' file first, so an interrupted download can be resumed
+    "retries": 3,  # Retries of a failed HTTP request
+}
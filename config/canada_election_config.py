@@ -23,3 +23,5 @@ PROFILE_METADATA_POST_ENTITY_GEOGRAPHIC_INCLUSION_FILE = (
 )
 PROFILE_METADATA_POST_QUOTA_INCLUSION_FILE = "profile_metadata_post_quota_inclusion.csv"
 PROFILE_METADATA_POST_POLLING_FILE = "polling_results.csv"
+VIDEO_TRANSCRIPTION_BACKEND = "openai"  # Backend transcribing the videos of this project: "openai" (Whisper API) or "faster-whisper" (local CPU model)
+PROFILE_PROMPT_VIDEOS_PER_PROFILE = None  # Latest videos per profile embedded in the profile prompts, and transcribed for them (None for every video)
@@ -23,3 +23,4 @@ TEMPORAL_INCLUSION_PERIOD = 7  # Profiles polled within the last 7 days will be
 # )
 # PROFILE_METADATA_POST_QUOTA_INCLUSION_FILE = "profile_metadata_post_quota_inclusion.csv"
 # PROFILE_METADATA_POST_POLLING_FILE = "polling_results.csv"
+VIDEO_TRANSCRIPTION_BACKEND = "openai"  # Backend transcribing the videos of this project: "openai" (Whisper API) or "faster-whisper" (local CPU model)
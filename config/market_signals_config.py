@@ -16,8 +16,20 @@ KEYWORDSEARCH_PROFILE_METADATA_FILE = "keywordsearch_profile_metadata.csv"
 POST_IDENTIFICATION_FILE = "profile_metadata_post_identification.csv"
 PANEL_PROFILE_METADATA_FILE = "profile_metadata_panel.csv"
 POST_REFLECTION_FILE = "profile_metadata_post_reflection.csv"
+POST_REFLECTION_PORTFOLIOMANAGER_FILE = (
+    "profile_metadata_post_reflection_portfoliomanager.csv"
+)
+POST_REFLECTION_INVESTMENTADVISOR_FILE = (
+    "profile_metadata_post_reflection_investmentadvisor.csv"
+)
+POST_REFLECTION_FINANCIALANALYST_FILE = (
+    "profile_metadata_post_reflection_financialanalyst.csv"
+)
+POST_REFLECTION_ECONOMIST_FILE = "profile_metadata_post_reflection_economist.csv"
 POST_STOCK_EXTRACTION_FILE = "profile_metadata_post_extraction.csv"
 POST_INTERVIEW_FILE = "profile_metadata_post_interview.csv"
 FORMATTED_POST_INTERVIEW_FILE = "profile_metadata_post_interview_formatted.csv"
 STOCK_RECOMMENDATION_FILE = "stock_recommendations_{interview_date}.csv"
 RUSSELL_4000_STOCK_TICKER_FILE = "russell4000_stock_tickers_shorten.csv"
+VIDEO_TRANSCRIPTION_BACKEND = "openai"  # Backend transcribing the videos of this project: "openai" (Whisper API) or "faster-whisper" (local CPU model)
+INTERVIEW_VIDEOS_PER_PROFILE = None  # Latest videos per profile embedded in the interview prompts, and transcribed for them (None for every video)
@@ -0,0 +1,50 @@
+VIDEO_METADATA_CHUNK_SIZE = 100000  # Rows of video metadata parsed at a time when loading
+
+# Column dtypes of the video metadata files. Columns that are not listed are loaded as objects.
+VIDEO_METADATA_DTYPES = {
+    # Ids are kept as strings so that large ids are not rounded through floats
+    "id": "string",
+    "profile_id": "string",
+    # Repeated strings
+    "profile": "category",
+    "searchQuery": "category",
+    "textLanguage": "category",
+    # Flags
+    "isAd": "boolean",
+    "isSponsored": "boolean",
+    "isSlideshow": "boolean",
+    "isPinned": "boolean",
+    # Counts
+    "createTime": "Int64",
+    "diggCount": "Int64",
+    "shareCount": "Int64",
+    "playCount": "Int64",
+    "collectCount": "Int64",
+    "commentCount": "Int64",
+}
+
+# Columns read by each stage (None loads every column)
+PROMPT_VIDEO_COLUMNS = [  # Formatting of video transcripts in profile, interview and polling prompts
+    "id",
+    "profile_id",
+    "createTimeISO",
+    "text",
+    "diggCount",
+    "shareCount",
+    "playCount",
+    "collectCount",
+    "commentCount",
+    "detailedMentions",
+    "hashtags",
+    "isSponsored",
+    "isAd",
+    "video_transcript",
+]
+PROFILE_SEARCH_VIDEO_COLUMNS = PROMPT_VIDEO_COLUMNS + ["profile"]
+PROMPT_VIDEOS_PER_PROFILE = None  # Latest videos per profile embedded in prompts, and transcribed by default (None for every video)
+VIDEO_STORE_COLUMNS = PROFILE_SEARCH_VIDEO_COLUMNS  # Kept in the video store
+TRANSCRIPTION_VIDEO_COLUMNS = None  # The transcription stage rewrites the whole video metadata file
+
+VIDEO_STORE_DIR = "video-store"  # Profile-partitioned copy of each video metadata file, for per-profile reads and chunked prompt construction
+VIDEO_STORE_BUCKETS = 64  # Number of profile hash buckets of the video store
+PROFILE_CHUNK_SIZE = None  # Profiles per chunk for out-of-core prompt construction (None loads all profiles at once)
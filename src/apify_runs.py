@@ -0,0 +1,189 @@
+import os
+import json
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from config.base_config import APIFY_RUN_STORE_FILE
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Statuses of runs that are still going or finished successfully, which a restarted search reattaches to
+APIFY_REATTACHABLE_STATUSES = ["READY", "RUNNING", "SUCCEEDED"]
+
+
+def connect_apify_run_store(project_name: str) -> sqlite3.Connection:
+    """
+    Opens the project's Apify run store, creating its table if it does not exist.
+
+    The store records every actor run as soon as it is started, so that a search whose process
+    dies while the run is scraping reattaches to the run instead of paying for a new scrape.
+
+    Args:
+        project_name (str): The project name used to locate the Apify run store.
+
+    Returns:
+        sqlite3.Connection: A connection to the Apify run store.
+    """
+    os.makedirs(f"{base_dir}/../data/{project_name}", exist_ok=True)
+    connection = sqlite3.connect(
+        f"{base_dir}/../data/{project_name}/{APIFY_RUN_STORE_FILE}", timeout=60
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS actor_runs (
+            run_id TEXT PRIMARY KEY,
+            run_key TEXT NOT NULL,
+            actor_id TEXT NOT NULL,
+            dataset_id TEXT,
+            status TEXT,
+            started_at TEXT NOT NULL,
+            consumed_at TEXT
+        )"""
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS actor_runs_run_key ON actor_runs (run_key)"
+    )
+
+    return connection
+
+
+def get_run_key(actor_id: str, run_input: dict) -> str:
+    """
+    Identifies a search batch by its actor and input.
+
+    Args:
+        actor_id (str): The Apify actor ID.
+        run_input (dict): The actor input.
+
+    Returns:
+        str: The SHA-256 hash of the actor ID and input.
+    """
+    return hashlib.sha256(
+        json.dumps({"actor_id": actor_id, "run_input": run_input}, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def record_actor_run(project_name: str, run_key: str, actor_id: str, run: dict) -> None:
+    """
+    Records the ID, dataset ID and status of an actor run.
+
+    Args:
+        project_name (str): The project name used to locate the Apify run store.
+        run_key (str): The key of the search batch (see get_run_key).
+        actor_id (str): The Apify actor ID.
+        run (dict): The run object returned by Apify.
+
+    Returns:
+        None
+    """
+    connection = connect_apify_run_store(project_name)
+    try:
+        with connection:
+            connection.execute(
+                """INSERT INTO actor_runs (run_id, run_key, actor_id, dataset_id, status, started_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (run_id) DO UPDATE SET dataset_id = excluded.dataset_id, status = excluded.status""",
+                (
+                    run["id"],
+                    run_key,
+                    actor_id,
+                    run.get("defaultDatasetId"),
+                    run.get("status"),
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+    finally:
+        connection.close()
+
+    return None
+
+
+def load_unconsumed_run_id(project_name: str, run_key: str) -> str:
+    """
+    Returns the latest run of a search batch whose dataset has not been ingested yet.
+
+    Args:
+        project_name (str): The project name used to locate the Apify run store.
+        run_key (str): The key of the search batch (see get_run_key).
+
+    Returns:
+        str: The run ID, or None if every run of the search batch has been ingested.
+    """
+    connection = connect_apify_run_store(project_name)
+    try:
+        row = connection.execute(
+            """SELECT run_id FROM actor_runs WHERE run_key = ? AND consumed_at IS NULL
+            ORDER BY started_at DESC LIMIT 1""",
+            (run_key,),
+        ).fetchone()
+    finally:
+        connection.close()
+
+    return row[0] if row else None
+
+
+def run_actor(
+    client: "ApifyClient", project_name: str, actor_id: str, run_input: dict
+) -> dict:
+    """
+    Runs an Apify actor and waits for it to finish, reattaching to the run of the same search
+    batch started by a previous process if its dataset has not been ingested yet.
+
+    A new run is recorded as soon as it starts, before waiting for it, so a crash while the
+    actor is scraping does not lose the run. Runs that failed, timed out or were aborted are not
+    reattached to.
+
+    Args:
+        client (ApifyClient): The Apify client.
+        project_name (str): The project name used to locate the Apify run store.
+        actor_id (str): The Apify actor ID.
+        run_input (dict): The actor input.
+
+    Returns:
+        dict: The finished run object, including the 'defaultDatasetId'. Once its dataset is
+            ingested, mark the run as consumed with mark_actor_run_consumed.
+    """
+    run_key = get_run_key(actor_id, run_input)
+
+    # Reattach to a running or finished run of the same search batch
+    run_id = load_unconsumed_run_id(project_name, run_key)
+    run = client.run(run_id).get() if run_id is not None else None
+    if run is not None and run.get("status") in APIFY_REATTACHABLE_STATUSES:
+        print(f"Reattaching to Apify run {run_id} ({run['status']})...")
+    else:
+        run = client.actor(actor_id).start(run_input=run_input)
+        print(f"Started Apify run {run['id']}...")
+        record_actor_run(project_name, run_key, actor_id, run)
+
+    run = client.run(run["id"]).wait_for_finish()
+    record_actor_run(project_name, run_key, actor_id, run)
+    if run.get("status") != "SUCCEEDED":
+        print(f"Apify run {run['id']} finished with status {run.get('status')}.")
+
+    return run
+
+
+def mark_actor_run_consumed(project_name: str, run_id: str) -> None:
+    """
+    Marks an actor run whose dataset has been ingested, so that the next search with the same
+    input starts a new run.
+
+    Args:
+        project_name (str): The project name used to locate the Apify run store.
+        run_id (str): The run ID.
+
+    Returns:
+        None
+    """
+    connection = connect_apify_run_store(project_name)
+    try:
+        with connection:
+            connection.execute(
+                "UPDATE actor_runs SET consumed_at = ? WHERE run_id = ?",
+                (datetime.now(timezone.utc).isoformat(), run_id),
+            )
+    finally:
+        connection.close()
+
+    return None
@@ -0,0 +1,219 @@
+import numpy as np
+from functools import lru_cache
+from config.base_config import (
+    VAD_AGGRESSIVENESS,
+    VAD_FRAME_MS,
+    VAD_WINDOW_MS,
+    VAD_TRIGGER_RATIO,
+    VAD_MIN_SPEECH_SECONDS,
+    VAD_PADDING_MS,
+    AUDIO_FINGERPRINT_SAMPLE_RATE,
+    AUDIO_FINGERPRINT_FRAME,
+    AUDIO_FINGERPRINT_HOP,
+    AUDIO_FINGERPRINT_BAND_EDGES,
+)
+
+# webrtcvad classifies 16-bit mono audio at 8, 16, 32 or 48 kHz
+SPEECH_SAMPLE_RATE = 16000
+SPEECH_SAMPLE_WIDTH = 2
+
+# Frames transformed at a time when fingerprinting, to bound memory on long videos
+FINGERPRINT_BLOCK_FRAMES = 1024
+
+
+@lru_cache(maxsize=None)
+def get_voice_activity_detector(aggressiveness: int = VAD_AGGRESSIVENESS):
+    """
+    Returns a webrtcvad voice activity detector, importing webrtcvad on first use.
+
+    Args:
+        aggressiveness (int, optional): The aggressiveness of the detector, from 0 to 3. Defaults to VAD_AGGRESSIVENESS.
+
+    Returns:
+        webrtcvad.Vad: The voice activity detector, or None if webrtcvad is not installed, in
+            which case the whole audio is transcribed.
+    """
+    try:
+        import webrtcvad
+    except ImportError:
+        print("webrtcvad is not installed, transcribing the whole audio of every video...")
+        return None
+
+    return webrtcvad.Vad(aggressiveness)
+
+
+def load_speech_audio(input_file_path: str):
+    """
+    Loads the audio of a file downsampled to 16 kHz, 16-bit mono.
+
+    Args:
+        input_file_path (str): The path to the audio or video file.
+
+    Returns:
+        AudioSegment: The downsampled audio.
+    """
+    from pydub import AudioSegment
+
+    return (
+        AudioSegment.from_file(input_file_path)
+        .set_frame_rate(SPEECH_SAMPLE_RATE)
+        .set_channels(1)
+        .set_sample_width(SPEECH_SAMPLE_WIDTH)
+    )
+
+
+def optimize_audio_file(input_file_path: str, output_file_path: str) -> None:
+    """
+    Optimize an audio file by downsampling it to 16 kHz and converting it to mono.
+
+    Args:
+        input_file_path (str): The path to the input audio file.
+        output_file_path (str): The path where the optimized audio file will be saved.
+
+    Returns:
+        None
+    """
+    from pydub import AudioSegment
+
+    # Load the audio file
+    audio = AudioSegment.from_file(input_file_path)
+
+    # Downsample the audio to 16 kHz and convert to mono
+    audio = audio.set_frame_rate(16000).set_channels(1)
+
+    # Export the optimized audio file
+    audio.export(output_file_path, format="wav")
+
+
+def trim_to_speech(input_file_path: str, output_file_path: str) -> float:
+    """
+    Detects speech in the downsampled audio of a file and, if there is any, saves the audio
+    from the first to the last speech frame, without the leading and trailing silence.
+
+    Args:
+        input_file_path (str): The path to the audio or video file.
+        output_file_path (str): The path where the trimmed WAV file will be saved.
+
+    Returns:
+        float: The seconds of trimmed audio saved, 0.0 if the file has less than
+            VAD_MIN_SPEECH_SECONDS of speech (nothing is saved), or None if webrtcvad is not installed.
+    """
+    voice_activity_detector = get_voice_activity_detector()
+    if voice_activity_detector is None:
+        return None
+
+    audio = load_speech_audio(input_file_path)
+    raw_audio = audio.raw_data
+    frame_bytes = SPEECH_SAMPLE_RATE * VAD_FRAME_MS // 1000 * SPEECH_SAMPLE_WIDTH
+
+    # Classify every complete frame as speech or non-speech
+    speech_frames = np.array(
+        [
+            voice_activity_detector.is_speech(
+                raw_audio[frame_start : frame_start + frame_bytes], SPEECH_SAMPLE_RATE
+            )
+            for frame_start in range(0, len(raw_audio) - frame_bytes + 1, frame_bytes)
+        ],
+        dtype=bool,
+    )
+
+    # Speech spans the windows in which most frames are speech, ignoring isolated noisy frames
+    window_frames = max(1, VAD_WINDOW_MS // VAD_FRAME_MS)
+    if len(speech_frames) < window_frames:
+        return 0.0
+    window_speech_frames = np.convolve(
+        speech_frames, np.ones(window_frames, dtype=int), mode="valid"
+    )
+    speech_windows = np.flatnonzero(
+        window_speech_frames >= VAD_TRIGGER_RATIO * window_frames
+    )
+    if len(speech_windows) == 0:
+        return 0.0
+    first_frame, last_frame = speech_windows[0], speech_windows[-1] + window_frames
+    if speech_frames[first_frame:last_frame].sum() * VAD_FRAME_MS / 1000 < VAD_MIN_SPEECH_SECONDS:
+        return 0.0
+
+    # Trim the leading and trailing silence, keeping some padding around the speech
+    speech_start_ms = max(0, int(first_frame) * VAD_FRAME_MS - VAD_PADDING_MS)
+    speech_end_ms = min(len(audio), int(last_frame) * VAD_FRAME_MS + VAD_PADDING_MS)
+    speech_audio = audio[speech_start_ms:speech_end_ms]
+    speech_audio.export(output_file_path, format="wav")
+
+    return len(speech_audio) / 1000
+
+
+def fingerprint_audio(input_file_path: str) -> np.ndarray:
+    """
+    Computes the Haitsma-Kalker fingerprint of the audio of a file: one 32-bit sub-fingerprint
+    per frame, whose bits are the signs of the energy differences between 33 logarithmic
+    frequency bands, across adjacent bands and consecutive frames. The fingerprint survives
+    re-encoding, so reposts and reused sounds have fingerprints with few differing bits.
+
+    Args:
+        input_file_path (str): The path to the audio or video file.
+
+    Returns:
+        np.ndarray: The sub-fingerprints (uint32), empty if the audio is shorter than two frames.
+    """
+    audio = load_speech_audio(input_file_path).set_frame_rate(
+        AUDIO_FINGERPRINT_SAMPLE_RATE
+    )
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    if len(samples) < AUDIO_FINGERPRINT_FRAME + AUDIO_FINGERPRINT_HOP:
+        return np.array([], dtype=np.uint32)
+
+    # Assign every frequency bin to one of the 33 bands, or to none (-1 or 33)
+    bin_frequencies = np.fft.rfftfreq(
+        AUDIO_FINGERPRINT_FRAME, 1 / AUDIO_FINGERPRINT_SAMPLE_RATE
+    )
+    band_edges = np.geomspace(*AUDIO_FINGERPRINT_BAND_EDGES, 34)
+    bin_bands = np.digitize(bin_frequencies, band_edges) - 1
+    band_matrix = (bin_bands[:, None] == np.arange(33)[None, :]).astype(np.float32)
+
+    # Band energies of every frame
+    frames = np.lib.stride_tricks.sliding_window_view(samples, AUDIO_FINGERPRINT_FRAME)[
+        ::AUDIO_FINGERPRINT_HOP
+    ]
+    window = np.hanning(AUDIO_FINGERPRINT_FRAME).astype(np.float32)
+    band_energies = []
+    for start in range(0, len(frames), FINGERPRINT_BLOCK_FRAMES):
+        spectrum = np.fft.rfft(frames[start : start + FINGERPRINT_BLOCK_FRAMES] * window)
+        band_energies.append((np.abs(spectrum) ** 2).astype(np.float32) @ band_matrix)
+    band_energies = np.concatenate(band_energies)
+
+    # Bit m of frame n is set if the energy difference of bands m and m+1 increased since frame n-1
+    band_differences = band_energies[:, :-1] - band_energies[:, 1:]
+    bits = (band_differences[1:] - band_differences[:-1]) > 0
+
+    return (bits.astype(np.uint32) << np.arange(31, -1, -1, dtype=np.uint32)).sum(
+        axis=1, dtype=np.uint32
+    )
+
+
+def fingerprint_bit_error_rate(
+    fingerprint: np.ndarray, other_fingerprint: np.ndarray, offset: int = 0
+) -> tuple:
+    """
+    Compares two fingerprints aligned at an offset.
+
+    Args:
+        fingerprint (np.ndarray): The sub-fingerprints of the first clip.
+        other_fingerprint (np.ndarray): The sub-fingerprints of the second clip.
+        offset (int, optional): The position in the second clip aligned with the start of the first. Defaults to 0.
+
+    Returns:
+        tuple: The fraction of differing bits over the aligned frames (1.0 if none are aligned)
+            and the number of aligned frames.
+    """
+    start = max(0, -offset)
+    end = min(len(fingerprint), len(other_fingerprint) - offset)
+    if end <= start:
+        return 1.0, 0
+
+    differing_bits = np.unpackbits(
+        (fingerprint[start:end] ^ other_fingerprint[start + offset : end + offset]).view(
+            np.uint8
+        )
+    )
+
+    return differing_bits.mean(), end - start
@@ -0,0 +1,312 @@
+import os
+import json
+from functools import lru_cache
+from config.base_config import (
+    GPT_MODEL_PRICING,
+    BATCH_PRICE_DISCOUNT,
+    BATCH_BUDGET_USD,
+    BATCH_BUDGET_ACTION,
+    BATCH_EXPECTED_COMPLETION_TOKENS,
+    BATCH_MAX_REQUESTS,
+    BATCH_MAX_FILE_BYTES,
+)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Tokens added by the chat format to every message and to every request
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REQUEST = 3
+
+
+@lru_cache(maxsize=None)
+def get_token_encoding(gpt_model: str):
+    """
+    Returns the tiktoken encoding of a GPT model, importing tiktoken on first use.
+
+    Args:
+        gpt_model (str): The GPT model.
+
+    Returns:
+        tiktoken.Encoding: The encoding of the model, or None if tiktoken is not installed,
+            in which case tokens are approximated from the number of characters.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        print("tiktoken is not installed, approximating tokens as 4 characters each...")
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(gpt_model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, gpt_model: str) -> int:
+    """
+    Counts the tokens of a text for a GPT model.
+
+    Args:
+        text (str): The text to tokenize.
+        gpt_model (str): The GPT model.
+
+    Returns:
+        int: The number of tokens.
+    """
+    encoding = get_token_encoding(gpt_model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_request_tokens(task: dict) -> int:
+    """
+    Counts the input tokens of a chat completion request of a batch file.
+
+    Args:
+        task (dict): A batch file task with a 'body' containing the 'model' and 'messages'.
+
+    Returns:
+        int: The number of input tokens.
+    """
+    gpt_model = task["body"]["model"]
+    return TOKENS_PER_REQUEST + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message["content"] or "", gpt_model)
+        for message in task["body"]["messages"]
+    )
+
+
+def estimate_completion_tokens(batch_output_path: str) -> float:
+    """
+    Estimates the completion tokens per request from the usage recorded in a previous batch output file.
+
+    Args:
+        batch_output_path (str): The path to a previous batch output file.
+
+    Returns:
+        float: The mean completion tokens per request, or BATCH_EXPECTED_COMPLETION_TOKENS if no usage is available.
+    """
+    if not os.path.exists(batch_output_path):
+        return BATCH_EXPECTED_COMPLETION_TOKENS
+
+    completion_tokens = []
+    with open(batch_output_path, "r") as file:
+        for line in file:
+            result = json.loads(line)
+            usage = ((result.get("response") or {}).get("body") or {}).get("usage")
+            if usage:
+                completion_tokens.append(usage["completion_tokens"])
+
+    if not completion_tokens:
+        return BATCH_EXPECTED_COMPLETION_TOKENS
+
+    return sum(completion_tokens) / len(completion_tokens)
+
+
+def estimate_request_cost(
+    gpt_model: str, prompt_tokens: float, completion_tokens: float
+) -> float:
+    """
+    Estimates the cost of a batch request from the model pricing.
+
+    Args:
+        gpt_model (str): The GPT model.
+        prompt_tokens (float): The number of input tokens.
+        completion_tokens (float): The number of output tokens.
+
+    Returns:
+        float: The projected cost in USD.
+
+    Raises:
+        ValueError: If the model has no pricing in GPT_MODEL_PRICING.
+    """
+    if gpt_model not in GPT_MODEL_PRICING:
+        raise ValueError(
+            f"GPT model {gpt_model} has no pricing. Add it to GPT_MODEL_PRICING in config/base_config.py."
+        )
+
+    input_price, output_price = GPT_MODEL_PRICING[gpt_model]
+    return (
+        (prompt_tokens * input_price + completion_tokens * output_price)
+        / 1_000_000
+        * BATCH_PRICE_DISCOUNT
+    )
+
+
+def estimate_batch_file(
+    project_name: str, batch_input_file_name: str, batch_output_file_name: str = None
+) -> dict:
+    """
+    Tokenizes every request of a batch input file and projects the cost of submitting it.
+
+    Args:
+        project_name (str): The project name used to locate the batch files.
+        batch_input_file_name (str): The name of the batch input file.
+        batch_output_file_name (str, optional): The name of a previous batch output file used to
+            estimate the completion tokens. Defaults to None.
+
+    Returns:
+        dict: The estimate, with the total 'requests', 'prompt_tokens', 'completion_tokens' and
+            'cost_usd', and the per-request 'request_costs' and 'request_bytes'.
+    """
+    batch_file_dir = f"{base_dir}/../data/{project_name}/batch-files"
+    expected_completion_tokens = (
+        estimate_completion_tokens(f"{batch_file_dir}/{batch_output_file_name}")
+        if batch_output_file_name
+        else BATCH_EXPECTED_COMPLETION_TOKENS
+    )
+
+    estimate = {
+        "requests": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cost_usd": 0.0,
+        "request_costs": [],
+        "request_bytes": [],
+    }
+    with open(f"{batch_file_dir}/{batch_input_file_name}", "rb") as file:
+        for line in file:
+            task = json.loads(line)
+            prompt_tokens = count_request_tokens(task)
+            request_cost = estimate_request_cost(
+                task["body"]["model"], prompt_tokens, expected_completion_tokens
+            )
+
+            estimate["requests"] += 1
+            estimate["prompt_tokens"] += prompt_tokens
+            estimate["completion_tokens"] += expected_completion_tokens
+            estimate["cost_usd"] += request_cost
+            estimate["request_costs"].append(request_cost)
+            estimate["request_bytes"].append(len(line))
+
+    return estimate
+
+
+def shard_batch_file(
+    project_name: str,
+    batch_input_file_name: str,
+    request_costs: list,
+    request_bytes: list,
+    budget_usd: float,
+) -> list:
+    """
+    Splits a batch input file into consecutive shards that each stay within the budget and
+    the OpenAI batch limits.
+
+    Args:
+        project_name (str): The project name used to locate the batch files.
+        batch_input_file_name (str): The name of the batch input file.
+        request_costs (list): The projected cost of every request.
+        request_bytes (list): The size in bytes of every request.
+        budget_usd (float): The maximum projected cost of a shard.
+
+    Returns:
+        list: The names of the shard files, in order.
+
+    Raises:
+        ValueError: If a single request exceeds the budget.
+    """
+    batch_file_dir = f"{base_dir}/../data/{project_name}/batch-files"
+    shard_file_stem = os.path.splitext(batch_input_file_name)[0]
+
+    # Assign consecutive requests to shards
+    shard_ids = []
+    shard_id, shard_cost, shard_requests, shard_bytes = 0, 0.0, 0, 0
+    for request_cost, num_bytes in zip(request_costs, request_bytes):
+        if request_cost > budget_usd:
+            raise ValueError(
+                f"A single request of {batch_input_file_name} is projected to cost ${request_cost:.2f}, above the budget of ${budget_usd:.2f}."
+            )
+        if shard_requests > 0 and (
+            shard_cost + request_cost > budget_usd
+            or shard_requests + 1 > BATCH_MAX_REQUESTS
+            or shard_bytes + num_bytes > BATCH_MAX_FILE_BYTES
+        ):
+            shard_id, shard_cost, shard_requests, shard_bytes = shard_id + 1, 0.0, 0, 0
+        shard_ids.append(shard_id)
+        shard_cost += request_cost
+        shard_requests += 1
+        shard_bytes += num_bytes
+
+    # Write the shard files
+    shard_file_names = [
+        f"{shard_file_stem}_shard{i}.jsonl" for i in range(shard_id + 1)
+    ]
+    shard_files = [
+        open(f"{batch_file_dir}/{shard_file_name}", "wb")
+        for shard_file_name in shard_file_names
+    ]
+    try:
+        with open(f"{batch_file_dir}/{batch_input_file_name}", "rb") as file:
+            for line, request_shard_id in zip(file, shard_ids):
+                shard_files[request_shard_id].write(line)
+    finally:
+        for shard_file in shard_files:
+            shard_file.close()
+
+    return shard_file_names
+
+
+def plan_batch_submission(
+    project_name: str,
+    batch_input_file_name: str,
+    batch_output_file_name: str = None,
+    budget_usd: float = BATCH_BUDGET_USD,
+    budget_action: str = BATCH_BUDGET_ACTION,
+) -> list:
+    """
+    Estimates the tokens and cost of a batch input file before it is submitted and, if it is
+    above the budget or the OpenAI batch limits, either refuses it or splits it into shards.
+
+    Args:
+        project_name (str): The project name used to locate the batch files.
+        batch_input_file_name (str): The name of the batch input file.
+        batch_output_file_name (str, optional): The name of a previous batch output file used to
+            estimate the completion tokens. Defaults to None.
+        budget_usd (float, optional): The maximum projected cost of a submission. Defaults to BATCH_BUDGET_USD.
+        budget_action (str, optional): "shard" or "refuse". Defaults to BATCH_BUDGET_ACTION.
+
+    Returns:
+        list: The names of the batch input files to submit, in order.
+
+    Raises:
+        ValueError: If the batch is above the budget and budget_action is "refuse", or if the
+            budget action is not supported.
+    """
+    estimate = estimate_batch_file(
+        project_name, batch_input_file_name, batch_output_file_name
+    )
+    print(
+        f"Batch {batch_input_file_name}: {estimate['requests']} requests, "
+        f"{estimate['prompt_tokens']} input tokens, "
+        f"~{estimate['completion_tokens']:.0f} output tokens, "
+        f"projected cost ${estimate['cost_usd']:.2f} (budget ${budget_usd:.2f})."
+    )
+
+    within_limits = (
+        estimate["cost_usd"] <= budget_usd
+        and estimate["requests"] <= BATCH_MAX_REQUESTS
+        and sum(estimate["request_bytes"]) <= BATCH_MAX_FILE_BYTES
+    )
+    if within_limits:
+        return [batch_input_file_name]
+
+    if budget_action == "refuse":
+        raise ValueError(
+            f"Batch {batch_input_file_name} is above the budget or batch limits. "
+            f"Raise BATCH_BUDGET_USD or set BATCH_BUDGET_ACTION to 'shard'."
+        )
+    elif budget_action != "shard":
+        raise ValueError(f"Budget action {budget_action} is not supported.")
+
+    shard_file_names = shard_batch_file(
+        project_name,
+        batch_input_file_name,
+        estimate["request_costs"],
+        estimate["request_bytes"],
+        budget_usd,
+    )
+    print(f"Split batch {batch_input_file_name} into {len(shard_file_names)} shards.")
+
+    return shard_file_names
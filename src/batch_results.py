@@ -0,0 +1,191 @@
+import os
+import json
+from src.clients import get_openai_client
+from src.metrics import record_metric
+from config.base_config import BATCH_DOWNLOAD_CHUNK_SIZE
+
+
+def download_batch_file(
+    file_id: str, output_file, chunk_size: int = BATCH_DOWNLOAD_CHUNK_SIZE
+) -> int:
+    """
+    Streams an OpenAI file to an open binary file chunk by chunk, without holding the whole
+    file in memory. A newline is added if the file does not end with one, so that the next
+    file appended to the same output starts on a line of its own.
+
+    Args:
+        file_id (str): The ID of the OpenAI file (e.g. the output or error file of a batch).
+        output_file (file): The binary file the contents are written to.
+        chunk_size (int, optional): The bytes read at a time. Defaults to BATCH_DOWNLOAD_CHUNK_SIZE.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    num_bytes = 0
+    last_chunk = b""
+    with get_openai_client().files.with_streaming_response.content(file_id) as response:
+        for chunk in response.iter_bytes(chunk_size):
+            num_bytes += output_file.write(chunk)
+            last_chunk = chunk or last_chunk
+    if last_chunk and not last_chunk.endswith(b"\n"):
+        num_bytes += output_file.write(b"\n")
+    record_metric("bytes_downloaded", num_bytes)
+
+    return num_bytes
+
+
+def parse_batch_result(result: dict) -> tuple:
+    """
+    Extracts the response content or the error of a line of a batch output or error file.
+
+    Args:
+        result (dict): The parsed line, with 'custom_id', 'response' and 'error' fields.
+
+    Returns:
+        tuple: The custom ID, the response content (None if the request failed) and the error
+            message (None if the request succeeded).
+    """
+    custom_id = str(result["custom_id"])
+    if result.get("error"):
+        error = result["error"]
+        return custom_id, None, f"{error.get('code')}: {error.get('message')}"
+
+    response = result.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") != 200 or not body.get("choices"):
+        error = body.get("error") or {}
+        return (
+            custom_id,
+            None,
+            f"{response.get('status_code')}: {error.get('message', 'No choices in response')}",
+        )
+
+    return custom_id, body["choices"][0]["message"]["content"], None
+
+
+def read_batch_results(batch_output_path: str, record_usage: bool = True) -> tuple:
+    """
+    Parses a batch output file one line at a time into a response index keyed by custom ID,
+    recording the token usage of every request. Lines that cannot be parsed (e.g. a truncated
+    download) are skipped and reported, so that their requests are resubmitted as missing.
+
+    Args:
+        batch_output_path (str): The path to the batch output file.
+        record_usage (bool, optional): Whether to record the token usage. Defaults to True.
+
+    Returns:
+        tuple: The response contents and the error messages of the failed requests, both
+            as dictionaries keyed by custom ID.
+    """
+    responses = {}
+    errors = {}
+    num_unparseable_lines = 0
+    with open(batch_output_path, "r") as file:
+        for line in file:
+            if not line.strip():
+                continue
+
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                result = None
+            if not isinstance(result, dict) or "custom_id" not in result:
+                num_unparseable_lines += 1
+                continue
+            if record_usage:
+                usage = ((result.get("response") or {}).get("body") or {}).get("usage") or {}
+                record_metric("prompt_tokens", usage.get("prompt_tokens", 0))
+                record_metric("completion_tokens", usage.get("completion_tokens", 0))
+
+            custom_id, content, error = parse_batch_result(result)
+            if error is None:
+                responses[custom_id] = content
+                errors.pop(custom_id, None)
+            elif custom_id not in responses:
+                errors[custom_id] = error
+
+    if num_unparseable_lines > 0:
+        print(
+            f"Skipped {num_unparseable_lines} unparseable lines of {os.path.basename(batch_output_path)}."
+        )
+
+    return responses, errors
+
+
+def write_resubmission_file(
+    batch_input_path: str, resubmission_path: str, custom_ids: set
+) -> int:
+    """
+    Copies the requests of a batch input file that have the given custom IDs into a new batch
+    input file, one line at a time.
+
+    Args:
+        batch_input_path (str): The path to the original batch input file.
+        resubmission_path (str): The path to the batch input file to write.
+        custom_ids (set): The custom IDs of the requests to copy.
+
+    Returns:
+        int: The number of requests written.
+    """
+    num_requests = 0
+    with open(batch_input_path, "rb") as input_file, open(
+        resubmission_path, "wb"
+    ) as output_file:
+        for line in input_file:
+            if str(json.loads(line)["custom_id"]) in custom_ids:
+                output_file.write(line)
+                num_requests += 1
+
+    return num_requests
+
+
+def query_batch_file_realtime(batch_input_path: str, output_file) -> None:
+    """
+    Sends every request of a batch input file to the real-time chat completion API and writes
+    the results to the output file in the batch output format, so that they are read back
+    with the batch responses.
+
+    Args:
+        batch_input_path (str): The path to the batch input file.
+        output_file (file): The binary batch output file the results are appended to.
+
+    Returns:
+        None
+    """
+    with open(batch_input_path, "rb") as input_file:
+        for line in input_file:
+            task = json.loads(line)
+            try:
+                response = get_openai_client().chat.completions.create(**task["body"])
+                result = {
+                    "custom_id": task["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {
+                            "choices": [
+                                {
+                                    "message": {
+                                        "role": "assistant",
+                                        "content": response.choices[0].message.content,
+                                    }
+                                }
+                            ],
+                            "usage": {
+                                "prompt_tokens": response.usage.prompt_tokens,
+                                "completion_tokens": response.usage.completion_tokens,
+                            },
+                        },
+                    },
+                    "error": None,
+                }
+            except Exception as e:
+                # Handle errors (rate limits, etc.)
+                print(f"Error processing request {task['custom_id']}: {e}")
+                result = {
+                    "custom_id": task["custom_id"],
+                    "response": None,
+                    "error": {"code": type(e).__name__, "message": str(e)},
+                }
+            output_file.write((json.dumps(result) + "\n").encode())
+
+    return None
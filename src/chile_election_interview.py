@@ -1,6 +1,5 @@
 import os
 import pandas as pd
-from pathlib import Path
 from datetime import datetime, timedelta
 from tqdm import tqdm
 
@@ -20,6 +19,7 @@ from config.chile_election_config import (
     # PROFILE_METADATA_POST_GEOGRAPHY_EXCLUSION_FILE,
     # PROFILE_METADATA_POST_ENTITY_GEOGRAPHIC_INCLUSION_FILE,
     # PROFILE_METADATA_POST_POLLING_FILE,
+    VIDEO_TRANSCRIPTION_BACKEND,
 )
 from src.utils import (
     # build_profile_prompt,
@@ -27,13 +27,21 @@ from src.utils import (
     perform_profile_interview_shorten,
     construct_system_prompt,
     construct_user_prompt,
+    construct_profile_prompt,
     extract_video_transcripts,
-    calculate_profile_engagement,
 )
 from src.keyword_search import perform_keyword_search
+from src.video_transcription import perform_video_transcription
 
 # from src.profile_search import perform_profile_search
-from prompts.prompt_template import profile_prompt_template
+from src.polling import build_polling_record, conduct_polling_batch
+from src.polling_store import (
+    append_polling_result,
+    compact_polling_results,
+    import_polled_profiles,
+    select_unpolled_profiles,
+    upsert_polled_profiles,
+)
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -48,52 +56,36 @@ def apply_temporal_inclusion_criteria(
     profile_metadata = pd.read_csv(
         f"{base_dir}/../data/{project_name}/{profile_metadata_input_file}"
     )
+    profile_metadata["id"] = profile_metadata["id"].astype(str)
 
-    print("Exclude profiles that have been polled within the last N days...")
-    polled_profiles_file_path = Path(
-        f"{base_dir}/../data/{project_name}/{polled_profiles_file}"
+    # Map the legacy polled profiles file (keyed on handle) onto the polled profile index
+    import_polled_profiles(
+        project_name=project_name,
+        polled_profiles_file=polled_profiles_file,
+        profile_metadata=profile_metadata,
     )
-    if polled_profiles_file_path.exists():
-        polled_profiles = pd.read_csv(polled_profiles_file_path)
-        polled_profiles["poll_date"] = pd.to_datetime(polled_profiles["poll_date"])
-
-        # Identify profiles that were polled within the last N days
-        recently_polled_profiles = polled_profiles[
-            polled_profiles["poll_date"]
-            >= datetime.today().date() - timedelta(days=TEMPORAL_INCLUSION_PERIOD)
-        ].reset_index(drop=True)
-
-        # Exclude profiles that were polled within the last N days
-        sampled_profile_metadata = profile_metadata[
-            ~profile_metadata["profile"].isin(recently_polled_profiles["profile"])
-        ]
-        sampled_profile_metadata.to_csv(
-            f"{base_dir}/../data/{project_name}/{profile_metadata_output_file}",
-            index=False,
-        )
 
-        # Update polled profiles with profiles that will be polled in the current survey iteration
-        newly_polled_profiles = sampled_profile_metadata[["profile"]]
-        newly_polled_profiles["poll_date"] = datetime.today().date()
-        updated_polled_profiles = pd.concat(
-            [recently_polled_profiles, newly_polled_profiles], ignore_index=True
-        )
-        updated_polled_profiles.to_csv(
-            f"{base_dir}/../data/{project_name}/{polled_profiles_file}", index=False
-        )
-
-    else:  # If no profiles have been polled yet, all existing profiles will be polled
-        sampled_profile_metadata = profile_metadata
-        sampled_profile_metadata.to_csv(
-            f"{base_dir}/../data/{project_name}/{profile_metadata_output_file}",
-            index=False,
-        )
+    print("Exclude profiles that have been polled within the last N days...")
+    poll_date = datetime.today().date()
+    unpolled_profile_ids = select_unpolled_profiles(
+        project_name=project_name,
+        profile_ids=profile_metadata["id"].tolist(),
+        polled_since=poll_date - timedelta(days=TEMPORAL_INCLUSION_PERIOD),
+    )
+    sampled_profile_metadata = profile_metadata[
+        profile_metadata["id"].isin(unpolled_profile_ids)
+    ]
+    sampled_profile_metadata.to_csv(
+        f"{base_dir}/../data/{project_name}/{profile_metadata_output_file}",
+        index=False,
+    )
 
-        newly_polled_profiles = sampled_profile_metadata[["profile"]]
-        newly_polled_profiles["poll_date"] = datetime.today().date()
-        newly_polled_profiles.to_csv(
-            f"{base_dir}/../data/{project_name}/{polled_profiles_file}", index=False
-        )
+    # Update polled profiles with profiles that will be polled in the current survey iteration
+    upsert_polled_profiles(
+        project_name=project_name,
+        polled_profiles=sampled_profile_metadata,
+        poll_date=poll_date,
+    )
 
     return None
 
@@ -184,37 +176,16 @@ def conduct_polling(
     project_name: str,
     profile: pd.Series,
     profile_latest_videos: pd.DataFrame,
-    polling_results_file: str,
     poll_date: datetime,
 ) -> None:
     # Format past video transcripts
-    video_transcripts_combined = extract_video_transcripts(
+    profile["transcripts_combined"] = extract_video_transcripts(
         profile_id=profile["id"], video_metadata=profile_latest_videos
     )
 
     # Construct profile prompt
-    profile["profile_prompt"] = profile_prompt_template.format(
-        profile_image=profile["avatar"],
-        profile_name=profile["profile"],
-        profile_nickname=profile["nickName"],
-        verified_status=profile["verified"],
-        private_account=profile["privateAccount"],
-        region=profile["region"],
-        tiktok_seller=profile["ttSeller"],
-        profile_signature=profile["signature"],
-        num_followers=profile["fans"],
-        num_following=profile["following"],
-        num_likes=profile["heart"],
-        num_videos=profile["video"],
-        num_digg=profile["digg"],
-        total_likes_over_num_followers=calculate_profile_engagement(
-            profile["heart"], profile["fans"]
-        ),
-        total_likes_over_num_videos=calculate_profile_engagement(
-            profile["heart"], profile["video"]
-        ),
-        video_transcripts=video_transcripts_combined,
-    )
+    profile["profile_prompt"] = construct_profile_prompt(profile)
+    profile = profile.drop("transcripts_combined")
     # TODO need to refer to technical paper on dependent and indepepdent features?
     # TODO include construction of background-informed, feature building prompt
 
@@ -230,29 +201,72 @@ def conduct_polling(
     interview_response = ""  # TODO to be implemented
 
     # Preprocess post interview responses
-    extracted_interview_responses = extract_llm_responses(
-        interview_response, substring_exclusion_list=[]
+    profile_with_interview_responses = build_polling_record(
+        profile, interview_response, poll_date
     )
-    profile_with_interview_responses = pd.concat(
-        [profile, extracted_interview_responses], ignore_index=True
-    )
-    profile_with_interview_responses["poll_date"] = poll_date
 
-    # Save the formatted polling interview responses
-    past_polling_results = pd.read_csv(
-        f"{base_dir}/../data/{project_name}/{polling_results_file}"
-    )
-    updated_polling_results = pd.concat(
-        [past_polling_results, profile_with_interview_responses.to_frame().T],
-        ignore_index=True,
-    )
-    updated_polling_results.to_csv(
-        f"{base_dir}/../data/{project_name}/{polling_results_file}", index=False
-    )
+    # Append the formatted polling interview responses to the polling store
+    append_polling_result(project_name, profile_with_interview_responses)
 
     return None
 
 
+def build_pipeline_stages(include_keyword_search: bool = False) -> list:
+    """
+    Declares the stages of the Chile election poll together with the files they read and write.
+
+    Only the pool building stages are declared; the polling stages are added once the Chile
+    election config defines their files.
+
+    Args:
+        include_keyword_search (bool, optional): Whether to include the keyword search stage, which
+            pays for a new Apify scrape on every run. Defaults to False, so the pipeline works on the
+            videos already scraped.
+
+    Returns:
+        list: The ordered list of stage declarations accepted by run_pipeline.
+    """
+    stages = []
+    if include_keyword_search:
+        stages.append(
+            {
+                "name": "keyword_search",
+                "command": "search",
+                "function": perform_keyword_search,
+                "kwargs": {
+                    "project_name": PROJECT,
+                    "search_terms_file": SEARCH_TERMS_FILE,
+                    "profile_metadata_file": KEYWORD_SEARCH_PROFILE_METADATA_FILE,
+                    "video_metadata_file": KEYWORD_SEARCH_VIDEO_METADATA_FILE,
+                    "perform_audio_transcription": False,
+                    "perform_apify_search": True,
+                },
+                "inputs": [],
+                "outputs": [
+                    KEYWORD_SEARCH_PROFILE_METADATA_FILE,
+                    KEYWORD_SEARCH_VIDEO_METADATA_FILE,
+                ],
+                "cache": False,
+            }
+        )
+
+    return stages + [
+        {
+            "name": "transcription",
+            "command": "transcribe",
+            "function": perform_video_transcription,
+            "kwargs": {
+                "project_name": PROJECT,
+                "video_metadata_file": KEYWORD_SEARCH_VIDEO_METADATA_FILE,
+                "transcription_backend": VIDEO_TRANSCRIPTION_BACKEND,
+            },
+            "inputs": [KEYWORD_SEARCH_VIDEO_METADATA_FILE],
+            "outputs": [KEYWORD_SEARCH_VIDEO_METADATA_FILE],
+            "cache": False,
+        },
+    ]
+
+
 if __name__ == "__main__":
     poll_date = datetime.today().date()
 
@@ -267,6 +281,7 @@ if __name__ == "__main__":
         profile_metadata_file=KEYWORD_SEARCH_PROFILE_METADATA_FILE,
         video_metadata_file=KEYWORD_SEARCH_VIDEO_METADATA_FILE,
         perform_audio_transcription=True,
+        transcription_backend=VIDEO_TRANSCRIPTION_BACKEND,
     )
     print()
 
@@ -311,38 +326,46 @@ if __name__ == "__main__":
     # )
     # print()
 
-    # ## Iterate through valid profile pool
-    # print("Iterate through valid profile pool and store polling results...")
+    # ## Apply quota inclusion criteria to the valid profile pool
+    # print("Applying quota inclusion criteria...")
     # eligible_profile_pool = pd.read_csv(
     #     f"{base_dir}/../data/{PROJECT}/{PROFILE_METADATA_POST_ENTITY_GEOGRAPHIC_INCLUSION_FILE}"
     # )
-    # polling_results = pd.read_csv(
-    #     f"{base_dir}/../data/{PROJECT}/{POLLED_PROFILES_FILE}"
-    # )
-    # for i in tqdm(range(len(eligible_profile_pool))):
-    #     ## Apply quota inclusion criteria
-    #     eligible_profile = apply_quota_inclusion_criteria(
-    #         profile=eligible_profile_pool.iloc[i]
-    #     )
-
-    #     if eligible_profile is None:  # Profile does not meet quota inclusion criteria
-    #         continue
+    # eligible_profiles = [
+    #     apply_quota_inclusion_criteria(profile=eligible_profile_pool.iloc[i])
+    #     for i in range(len(eligible_profile_pool))
+    # ]
+    # eligible_profiles = pd.DataFrame(
+    #     [profile for profile in eligible_profiles if profile is not None]
+    # )  # Profiles that do not meet quota inclusion criteria are excluded
+    # print()
 
-    #     ## Sample latest videos from eligible profiles
-    #     profile_latest_videos = perform_profile_search(
+    # if len(eligible_profiles) > 0:
+    #     ## Sample latest videos from all eligible profiles in a single profile search
+    #     print("Sampling latest videos from eligible profiles...")
+    #     latest_videos = perform_profile_search(
     #         project_name=PROJECT,
     #         profile_metadata_file=PROFILE_SEARCH_PROFILE_METADATA_FILE,
     #         video_metadata_file=PROFILE_SEARCH_VIDEO_METADATA_FILE,
-    #         profile_list=[eligible_profile],
+    #         profile_list=eligible_profiles["profile"].tolist(),
     #         perform_audio_transcription=True,
     #         return_videos=True,
     #     )
+    #     print()
 
-    #     # Perform digital election polling on eligible profiles
-    #     conduct_polling(
+    #     ## Perform digital election polling on all eligible profiles and store polling results
+    #     print("Polling eligible profiles and storing polling results...")
+    #     conduct_polling_batch(
     #         project_name=PROJECT,
-    #         profile=eligible_profile,
-    #         profile_latest_videos=profile_latest_videos,
-    #         polling_results_file=PROFILE_METADATA_POST_POLLING_FILE,
+    #         gpt_model=GPT_MODEL,
+    #         eligible_profiles=eligible_profiles,
+    #         video_metadata=latest_videos,
     #         poll_date=poll_date,
     #     )
+    #     print()
+
+    # ## Compact the polling store into the polling results file
+    # print("Compacting polling results...")
+    # compact_polling_results(
+    #     project_name=PROJECT, polling_results_file=PROFILE_METADATA_POST_POLLING_FILE
+    # )
@@ -0,0 +1,126 @@
+import inspect
+import argparse
+import importlib
+from config.base_config import PIPELINE_MAX_WORKERS
+from src.pipeline import run_pipeline, select_stages
+
+# Project configs and the scripts that declare their pipeline stages
+PROJECTS = {
+    "market_signals": "src.market_signals_interview",
+    "canada_election": "src.canada_election_interview",
+    "chile_election": "src.chile_election_interview",
+}
+COMMANDS = {
+    "search": "Search TikTok for videos and profiles using Apify.",
+    "transcribe": "Download and transcribe videos that have not been transcribed.",
+    "build-prompts": "Build the profile prompts from profile and video metadata.",
+    "interview": "Interview profiles using the OpenAI API.",
+    "extract": "Extract stock mentions from video transcripts.",
+    "poll": "Apply the inclusion criteria and poll eligible profiles.",
+}
+
+
+def parse_args(args: list = None) -> argparse.Namespace:
+    """
+    Parses the command-line arguments.
+
+    Args:
+        args (list, optional): The arguments to parse. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Run stages of the TikTok market signals and election polling pipelines.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in COMMANDS.items():
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument(
+            "--project",
+            required=True,
+            choices=PROJECTS.keys(),
+            help="The project config to run the stages for.",
+        )
+        subparser.add_argument(
+            "--from-stage", help="The name of the first stage to run."
+        )
+        subparser.add_argument("--to-stage", help="The name of the last stage to run.")
+        subparser.add_argument(
+            "--concurrency",
+            type=int,
+            default=PIPELINE_MAX_WORKERS,
+            help="The maximum number of stages run concurrently.",
+        )
+        subparser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report which stages would run.",
+        )
+        subparser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rerun stages even if their inputs have not changed.",
+        )
+        if command == "search":
+            subparser.add_argument(
+                "--scrape",
+                action="store_true",
+                help="Include the keyword search stages, which pay for a new Apify scrape.",
+            )
+
+    return parser.parse_args(args)
+
+
+def main(args: list = None) -> dict:
+    """
+    Runs the stages of a project that belong to the given command.
+
+    Args:
+        args (list, optional): The command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        dict: A mapping from stage name to its status.
+
+    Raises:
+        ValueError: If the project has no stages for the command, or if the keyword search
+            is requested without --scrape.
+    """
+    args = parse_args(args)
+    project_module = importlib.import_module(PROJECTS[args.project])
+
+    # Keyword search stages are left out unless the paid scrape is explicitly requested
+    stage_options = {}
+    if "include_keyword_search" in inspect.signature(
+        project_module.build_pipeline_stages
+    ).parameters:
+        stage_options["include_keyword_search"] = getattr(args, "scrape", False)
+
+    stages = [
+        stage
+        for stage in project_module.build_pipeline_stages(**stage_options)
+        if stage["command"] == args.command
+    ]
+    if not stages and stage_options and args.command == "search":
+        raise ValueError(
+            f"The keyword search of project {args.project} pays for a new Apify scrape. "
+            "Pass --scrape to run it."
+        )
+    if not stages:
+        raise ValueError(
+            f"Command {args.command} is not supported for project {args.project}."
+        )
+    stages = select_stages(stages, args.from_stage, args.to_stage)
+
+    return run_pipeline(
+        project_name=project_module.PROJECT,
+        stages=stages,
+        max_workers=args.concurrency,
+        force=args.force,
+        dry_run=args.dry_run,
+    )
+
+
+if __name__ == "__main__":
+    main()
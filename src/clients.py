@@ -0,0 +1,28 @@
+from functools import lru_cache
+from config.base_config import APIFY_API, OPENAI_API_KEY
+
+
+@lru_cache(maxsize=None)
+def get_openai_client():
+    """
+    Returns the shared OpenAI client, importing the OpenAI SDK on first use.
+
+    Returns:
+        OpenAI: The OpenAI client authenticated with OPENAI_API_KEY.
+    """
+    from openai import OpenAI
+
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+
+@lru_cache(maxsize=None)
+def get_apify_client():
+    """
+    Returns the shared Apify client, importing the Apify SDK on first use.
+
+    Returns:
+        ApifyClient: The Apify client authenticated with APIFY_API.
+    """
+    from apify_client import ApifyClient
+
+    return ApifyClient(APIFY_API)
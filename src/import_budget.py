@@ -0,0 +1,81 @@
+import os
+import re
+import subprocess
+import sys
+from config.base_config import IMPORT_TIME_BUDGET_MS
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+ENTRY_POINT_MODULES = [
+    "src.market_signals_interview",
+    "src.canada_election_interview",
+    "src.chile_election_interview",
+    "src.keyword_search",
+    "src.profile_search",
+    "src.video_transcription",
+    "src.pipeline",
+]
+LAZY_MODULES = ["openai", "apify_client", "yt_dlp", "pydub"]
+
+
+def measure_import_time(module: str) -> tuple:
+    """
+    Measures the time taken to import a module in a fresh interpreter using `python -X importtime`.
+
+    Args:
+        module (str): The dotted name of the module to import.
+
+    Returns:
+        tuple: The cumulative import time of the module in milliseconds, and the list of lazily
+            loaded dependencies that were nevertheless imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=f"{base_dir}/..",
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    import_time_ms = None
+    imported_lazy_modules = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+(\S+)$", line)
+        if not match:
+            continue
+        if match.group(2) == module:
+            import_time_ms = int(match.group(1)) / 1000
+        if match.group(2) in LAZY_MODULES:
+            imported_lazy_modules.append(match.group(2))
+
+    return import_time_ms, imported_lazy_modules
+
+
+def check_import_budget(modules: list = ENTRY_POINT_MODULES) -> bool:
+    """
+    Checks that every entry point imports within IMPORT_TIME_BUDGET_MS and without loading
+    the download, transcription, Apify or OpenAI dependencies.
+
+    Args:
+        modules (list, optional): The entry point modules to check. Defaults to ENTRY_POINT_MODULES.
+
+    Returns:
+        bool: True if every module is within budget, otherwise False.
+    """
+    within_budget = True
+    for module in modules:
+        import_time_ms, imported_lazy_modules = measure_import_time(module)
+        status = "OK"
+        if import_time_ms > IMPORT_TIME_BUDGET_MS:
+            status = "OVER BUDGET"
+            within_budget = False
+        if imported_lazy_modules:
+            status = f"EAGERLY IMPORTS {', '.join(imported_lazy_modules)}"
+            within_budget = False
+        print(f"{module:<36} {import_time_ms:>8.1f} ms  {status}")
+
+    return within_budget
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_import_budget() else 1)
@@ -1,5 +1,7 @@
 import os
-from apify_client import ApifyClient
+from src.clients import get_apify_client
+from src.apify_runs import run_actor, mark_actor_run_consumed
+from src.metrics import instrument_stage
 from src.utils import (
     load_text_file,
     update_video_metadata,
@@ -7,68 +9,78 @@ from src.utils import (
 )
 from config.base_config import (
     KEYWORD_SEARCH_RESULTS_PER_PAGE,
-    APIFY_API,
     APIFY_ACTOR_ID,
+    TRANSCRIPTION_BACKEND,
 )
 from src.video_transcription import perform_video_transcription
 
 
+@instrument_stage
 def perform_keyword_search(
     project_name: str,
     search_terms_file: str,
     profile_metadata_file: str,
     video_metadata_file: str,
     perform_audio_transcription: bool = True,
+    transcription_backend: str = TRANSCRIPTION_BACKEND,
+    perform_apify_search: bool = False,
 ) -> None:
-    # # Create the project subfolder within the data folder if it does not exist
-    # base_dir = os.path.dirname(os.path.abspath(__file__))
-    # os.makedirs(os.path.join(base_dir, "../data"), exist_ok=True)
-    # os.makedirs(os.path.join(base_dir, "../data", project_name), exist_ok=True)
+    # Create the project subfolder within the data folder if it does not exist
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(os.path.join(base_dir, "../data"), exist_ok=True)
+    os.makedirs(os.path.join(base_dir, "../data", project_name), exist_ok=True)
 
-    # # Define search parameters
-    # search_terms = load_text_file(search_terms_file)
+    # The Apify scrape is paid for on every call, so it only runs when explicitly requested
+    if not perform_apify_search:
+        print("Skipping the Apify key word search (perform_apify_search is False)...")
+    else:
+        # Define search parameters
+        search_terms = load_text_file(search_terms_file)
 
-    # # Initialize the ApifyClient with your API token
-    # client = ApifyClient(APIFY_API)
+        # Initialize the ApifyClient with your API token
+        client = get_apify_client()
 
-    # # Prepare the Actor input
-    # run_input = {
-    #     "excludePinnedPosts": False,
-    #     "resultsPerPage": KEYWORD_SEARCH_RESULTS_PER_PAGE,
-    #     "searchQueries": search_terms,
-    #     "searchSection": "/video",
-    #     "shouldDownloadCovers": False,
-    #     "shouldDownloadSlideshowImages": False,
-    #     "shouldDownloadSubtitles": False,
-    #     "shouldDownloadVideos": False,
-    # }
+        # Prepare the Actor input
+        run_input = {
+            "excludePinnedPosts": False,
+            "resultsPerPage": KEYWORD_SEARCH_RESULTS_PER_PAGE,
+            "searchQueries": search_terms,
+            "searchSection": "/video",
+            "shouldDownloadCovers": False,
+            "shouldDownloadSlideshowImages": False,
+            "shouldDownloadSubtitles": True,
+            "shouldDownloadVideos": False,
+        }
 
-    # # Run the Actor and wait for it to finish
-    # print("Performing key word search using Apify...")
-    # run = client.actor(APIFY_ACTOR_ID).call(run_input=run_input)
+        # Run the Actor and wait for it to finish, reattaching to the run of an interrupted search
+        print("Performing key word search using Apify...")
+        run = run_actor(client, project_name, APIFY_ACTOR_ID, run_input)
 
-    # # Update video metadata store
-    # print("Updating video metadata...")
-    # update_video_metadata(
-    #     project_name=project_name,
-    #     video_metadata_file=video_metadata_file,
-    #     client=client,
-    #     run=run,
-    #     profile_search=False,
-    #     filtering_list=search_terms,
-    # )
+        # Update video metadata store
+        print("Updating video metadata...")
+        update_video_metadata(
+            project_name=project_name,
+            video_metadata_file=video_metadata_file,
+            client=client,
+            run=run,
+            profile_search=False,
+            filtering_list=search_terms,
+        )
+        mark_actor_run_consumed(project_name, run["id"])
 
-    # # Update profile metadata store
-    # print("Updating profile metadata...")
-    # update_profile_metadata(
-    #     project_name=project_name,
-    #     profile_metadata_file=profile_metadata_file,
-    #     video_metadata_file=video_metadata_file,
-    # )
+        # Update profile metadata store
+        print("Updating profile metadata...")
+        update_profile_metadata(
+            project_name=project_name,
+            profile_metadata_file=profile_metadata_file,
+            video_metadata_file=video_metadata_file,
+        )
 
     # Perform audio transcription of new videos
     if perform_audio_transcription:
         print("Performing audio transcription...")
         perform_video_transcription(
-            project_name=project_name, video_metadata_file=video_metadata_file
+            project_name=project_name,
+            video_metadata_file=video_metadata_file,
+            transcription_backend=transcription_backend,
         )
@@ -8,16 +8,27 @@ tqdm.pandas()
 from datetime import datetime
 from config.market_signals_config import *
 from config.base_config import *
+from config.video_metadata_config import PROFILE_CHUNK_SIZE
 from src.utils import (
     extract_llm_responses,
     extract_stock_recommendations,
     perform_profile_interview,
 )
+from src.pipeline import run_pipeline
+from src.metrics import record_metric
+from src.profile_search import perform_profile_search
+from src.video_transcription import (
+    combine_videos_per_profile,
+    perform_video_transcription,
+)
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
 
-def perform_finfluencer_identification() -> None:
+def perform_finfluencer_identification(
+    incremental: bool = False,
+    videos_per_profile: int = INTERVIEW_VIDEOS_PER_PROFILE,
+) -> None:
 
     # Perform financial influencer identification interview
     perform_profile_interview(
@@ -30,6 +41,10 @@ def perform_finfluencer_identification() -> None:
         user_prompt_field="identification_user_prompt",
         llm_response_field="identification_llm_response",
         interview_type="finfluencer_identification",
+        batch_file_prefix="finfluencer_identification",
+        incremental=incremental,
+        chunk_size=PROFILE_CHUNK_SIZE,
+        videos_per_profile=videos_per_profile,
     )
 
     # Preprocess post identification results
@@ -66,7 +81,11 @@ def perform_finfluencer_identification() -> None:
 
 
 def generate_expert_reflections(
-    role: str, profile_metadata_file: str, output_file: str
+    role: str,
+    profile_metadata_file: str,
+    output_file: str,
+    incremental: bool = False,
+    videos_per_profile: int = INTERVIEW_VIDEOS_PER_PROFILE,
 ) -> None:
 
     if role == "portfolio_manager":
@@ -106,11 +125,45 @@ def generate_expert_reflections(
         user_prompt_field=user_prompt_field,
         llm_response_field=llm_response_field,
         interview_type=interview_type,
+        batch_file_prefix=interview_type,
+        incremental=incremental,
+        chunk_size=PROFILE_CHUNK_SIZE,
+        videos_per_profile=videos_per_profile,
     )
 
     return None
 
 
+def merge_expert_reflections(reflection_files: dict, output_file: str) -> None:
+    """
+    Combines the expert reflections generated independently for each role into a single file.
+
+    Args:
+        reflection_files (dict): A mapping from the LLM response field of each role to the file containing its reflections.
+        output_file (str): The name of the file to save the combined reflections to.
+
+    Returns:
+        None
+    """
+    merged_reflections = None
+    for llm_response_field, reflection_file in reflection_files.items():
+        reflections = pd.read_csv(f"{base_dir}/../data/{PROJECT}/{reflection_file}")
+        reflections["id"] = reflections["id"].astype(str)
+
+        if merged_reflections is None:
+            merged_reflections = reflections
+        else:
+            merged_reflections = pd.merge(
+                left=merged_reflections,
+                right=reflections[["id", llm_response_field]],
+                on="id",
+            )
+
+    merged_reflections.to_csv(f"{base_dir}/../data/{PROJECT}/{output_file}", index=False)
+
+    return None
+
+
 def extract_stock_mentions_from_transcripts(row: pd.Series, russell_4000_stock) -> str:
     # Split the transcripts by double newline
     transcript_chunks = row["transcripts_combined"].strip().split("\n\n")
@@ -198,6 +251,7 @@ def extract_stock_mentions(input_file: str, output_file: str) -> None:
     russell_4000_stock = pd.read_csv(
         f"{base_dir}/../config/{RUSSELL_4000_STOCK_TICKER_FILE}"
     )
+    record_metric("rows", len(post_reflection_results))
     post_reflection_results["stock_mentions"] = post_reflection_results.progress_apply(
         extract_stock_mentions_from_transcripts, args=(russell_4000_stock,), axis=1
     )
@@ -210,7 +264,10 @@ def extract_stock_mentions(input_file: str, output_file: str) -> None:
     return None
 
 
-def perform_digital_interview() -> None:
+def perform_digital_interview(
+    incremental: bool = False,
+    videos_per_profile: int = INTERVIEW_VIDEOS_PER_PROFILE,
+) -> None:
 
     perform_profile_interview(
         project_name=PROJECT,
@@ -222,6 +279,10 @@ def perform_digital_interview() -> None:
         user_prompt_field="digital_interview_user_prompt",
         llm_response_field="digital_interview_llm_response",
         interview_type="interview",
+        batch_file_prefix="interview",
+        incremental=incremental,
+        chunk_size=PROFILE_CHUNK_SIZE,
+        videos_per_profile=videos_per_profile,
     )
 
     # Preprocess post interview results
@@ -307,30 +368,171 @@ def perform_digital_interview() -> None:
     return None
 
 
+def build_pipeline_stages() -> list:
+    """
+    Declares the stages of the market signals pipeline together with the files they read and write.
+
+    The four expert reflections only depend on the panel of identified financial influencers,
+    so they are generated independently (and concurrently) before being merged. Interview
+    stages run incrementally, so only new or changed profiles are sent to the LLM.
+
+    Returns:
+        list: The ordered list of stage declarations accepted by run_pipeline.
+    """
+    reflection_roles = {
+        "portfolio_manager": (
+            "expert_reflection_portfoliomanager",
+            POST_REFLECTION_PORTFOLIOMANAGER_FILE,
+        ),
+        "investment_advisor": (
+            "expert_reflection_investmentadvisor",
+            POST_REFLECTION_INVESTMENTADVISOR_FILE,
+        ),
+        "financial_analyst": (
+            "expert_reflection_financialanalyst",
+            POST_REFLECTION_FINANCIALANALYST_FILE,
+        ),
+        "economist": ("expert_reflection_economist", POST_REFLECTION_ECONOMIST_FILE),
+    }
+
+    stages = [
+        {
+            "name": "profile_search",
+            "command": "search",
+            "function": perform_profile_search,
+            "kwargs": {
+                "project_name": PROJECT,
+                "profile_metadata_file": PROFILESEARCH_PROFILE_METADATA_FILE,
+                "video_metadata_file": PROFILESEARCH_VIDEO_METADATA_FILE,
+                "profile_list_file": PROFILES_FILE,
+                "perform_audio_transcription": False,
+            },
+            "inputs": [],
+            "outputs": [
+                PROFILESEARCH_PROFILE_METADATA_FILE,
+                PROFILESEARCH_VIDEO_METADATA_FILE,
+            ],
+            "cache": False,
+        },
+        {
+            "name": "transcription",
+            "command": "transcribe",
+            "function": perform_video_transcription,
+            "kwargs": {
+                "project_name": PROJECT,
+                "video_metadata_file": PROFILESEARCH_VIDEO_METADATA_FILE,
+                "transcription_backend": VIDEO_TRANSCRIPTION_BACKEND,
+            },
+            "inputs": [PROFILESEARCH_VIDEO_METADATA_FILE],
+            "outputs": [PROFILESEARCH_VIDEO_METADATA_FILE],
+            "cache": False,
+        },
+        {
+            "name": "identification",
+            "command": "interview",
+            "function": perform_finfluencer_identification,
+            "kwargs": {
+                "incremental": True,
+                "videos_per_profile": INTERVIEW_VIDEOS_PER_PROFILE,
+            },
+            "inputs": [
+                PROFILESEARCH_PROFILE_METADATA_FILE,
+                PROFILESEARCH_VIDEO_METADATA_FILE,
+            ],
+            "outputs": [POST_IDENTIFICATION_FILE, PANEL_PROFILE_METADATA_FILE],
+            "params": {
+                "gpt_model": GPT_MODEL,
+                "videos_per_profile": INTERVIEW_VIDEOS_PER_PROFILE,
+            },
+        }
+    ]
+    for role, (_, reflection_file) in reflection_roles.items():
+        stages.append(
+            {
+                "name": f"{role}_reflection",
+                "command": "interview",
+                "function": generate_expert_reflections,
+                "kwargs": {
+                    "role": role,
+                    "profile_metadata_file": PANEL_PROFILE_METADATA_FILE,
+                    "output_file": reflection_file,
+                    "incremental": True,
+                    "videos_per_profile": INTERVIEW_VIDEOS_PER_PROFILE,
+                },
+                "inputs": [
+                    PANEL_PROFILE_METADATA_FILE,
+                    PROFILESEARCH_VIDEO_METADATA_FILE,
+                ],
+                "outputs": [reflection_file],
+                "params": {
+                    "gpt_model": GPT_MODEL,
+                    "videos_per_profile": INTERVIEW_VIDEOS_PER_PROFILE,
+                },
+            }
+        )
+    stages += [
+        {
+            "name": "merge_reflections",
+            "command": "interview",
+            "function": merge_expert_reflections,
+            "kwargs": {
+                "reflection_files": dict(reflection_roles.values()),
+                "output_file": POST_REFLECTION_FILE,
+            },
+            "inputs": [reflection_file for _, reflection_file in reflection_roles.values()],
+            "outputs": [POST_REFLECTION_FILE],
+        },
+        {
+            "name": "stock_extraction",
+            "command": "extract",
+            "function": extract_stock_mentions,
+            "kwargs": {
+                "input_file": POST_REFLECTION_FILE,
+                "output_file": POST_STOCK_EXTRACTION_FILE,
+            },
+            "inputs": [POST_REFLECTION_FILE],
+            "outputs": [POST_STOCK_EXTRACTION_FILE],
+        },
+        {
+            "name": "digital_interview",
+            "command": "interview",
+            "function": perform_digital_interview,
+            "kwargs": {
+                "incremental": True,
+                "videos_per_profile": INTERVIEW_VIDEOS_PER_PROFILE,
+            },
+            "inputs": [POST_STOCK_EXTRACTION_FILE, PROFILESEARCH_VIDEO_METADATA_FILE],
+            "outputs": [POST_INTERVIEW_FILE, FORMATTED_POST_INTERVIEW_FILE],
+            "params": {
+                "gpt_model": GPT_MODEL,
+                "videos_per_profile": INTERVIEW_VIDEOS_PER_PROFILE,
+            },
+        },
+    ]
+
+    # Transcribe the videos embedded by every interview stage, so that a stage embedding more
+    # videos per profile has its missing videos transcribed by the next transcription run
+    for stage in stages:
+        if stage["name"] == "transcription":
+            stage["kwargs"]["videos_per_profile"] = combine_videos_per_profile(
+                [
+                    interview_stage["kwargs"]["videos_per_profile"]
+                    for interview_stage in stages
+                    if "videos_per_profile" in interview_stage["kwargs"]
+                ]
+            )
+
+    return stages
+
+
 if __name__ == "__main__":
-    perform_finfluencer_identification()
-    generate_expert_reflections(
-        role="portfolio_manager",
-        profile_metadata_file=PANEL_PROFILE_METADATA_FILE,
-        output_file=POST_REFLECTION_FILE,
-    )
-    generate_expert_reflections(
-        role="investment_advisor",
-        profile_metadata_file=POST_REFLECTION_FILE,
-        output_file=POST_REFLECTION_FILE,
-    )
-    generate_expert_reflections(
-        role="financial_analyst",
-        profile_metadata_file=POST_REFLECTION_FILE,
-        output_file=POST_REFLECTION_FILE,
-    )
-    generate_expert_reflections(
-        role="economist",
-        profile_metadata_file=POST_REFLECTION_FILE,
-        output_file=POST_REFLECTION_FILE,
-    )
-    extract_stock_mentions(
-        input_file=POST_REFLECTION_FILE,
-        output_file=POST_STOCK_EXTRACTION_FILE,
+    # Run the interview and extraction stages on the existing profile search results
+    run_pipeline(
+        project_name=PROJECT,
+        stages=[
+            stage
+            for stage in build_pipeline_stages()
+            if stage["command"] in ["interview", "extract"]
+        ],
+        max_workers=PIPELINE_MAX_WORKERS,
     )
-    perform_digital_interview()
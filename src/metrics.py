@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import uuid
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from config.base_config import METRICS_FORMAT, METRICS_FILE, PROMETHEUS_METRICS_FILE
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Identifies the stage metrics recorded by this process
+RUN_ID = uuid.uuid4().hex
+METRIC_COUNTERS = [
+    "rows",
+    "bytes_downloaded",
+    "audio_seconds",
+    "prompt_tokens",
+    "completion_tokens",
+    "failures",
+    "fingerprint_matches",
+    "subtitle_transcripts",
+]
+
+# Stages currently running in this context, from outermost to innermost
+_active_stages = contextvars.ContextVar("active_stages", default=())
+_metrics_lock = threading.Lock()
+_latest_metrics = {}
+
+
+def record_metric(name: str, value: float = 1) -> None:
+    """
+    Adds a value to a counter of every stage currently running, so that nested stages
+    (e.g. a batch query within an interview) are also accounted for by their parent stage.
+
+    Args:
+        name (str): The counter name, one of METRIC_COUNTERS.
+        value (float, optional): The value to add. Defaults to 1.
+
+    Returns:
+        None
+    """
+    with _metrics_lock:
+        for stage_record in _active_stages.get():
+            stage_record[name] += value
+
+    return None
+
+
+@contextmanager
+def stage_metrics(project_name: str, stage_name: str):
+    """
+    Records the wall time, counters and outcome of a stage and writes them when the stage ends.
+
+    Args:
+        project_name (str): The project name used to locate the metrics files. Defaults to the
+            project of the enclosing stage when None.
+        stage_name (str): The stage name.
+
+    Yields:
+        dict: The stage record.
+    """
+    active_stages = _active_stages.get()
+    if project_name is None and active_stages:
+        project_name = active_stages[-1]["project"]
+
+    stage_record = {
+        "run_id": RUN_ID,
+        "project": project_name,
+        "stage": stage_name,
+        "parent_stage": active_stages[-1]["stage"] if active_stages else None,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "status": "completed",
+        "error": None,
+        **{counter: 0 for counter in METRIC_COUNTERS},
+    }
+    token = _active_stages.set(active_stages + (stage_record,))
+    start_time = time.perf_counter()
+    try:
+        yield stage_record
+    except Exception as e:
+        stage_record["status"] = "failed"
+        stage_record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        stage_record["wall_seconds"] = round(time.perf_counter() - start_time, 4)
+        _active_stages.reset(token)
+        write_stage_metrics(stage_record)
+
+
+def instrument_stage(function):
+    """
+    Decorates a stage function so that each call is recorded with stage_metrics under the
+    function name, using its 'project_name' argument to locate the metrics files.
+
+    Args:
+        function (callable): The stage function.
+
+    Returns:
+        callable: The instrumented function.
+    """
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        project_name = signature.bind_partial(*args, **kwargs).arguments.get(
+            "project_name"
+        )
+        with stage_metrics(project_name, function.__name__):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def format_prometheus_metrics(stage_records: list) -> str:
+    """
+    Formats stage records in the Prometheus text exposition format.
+
+    Args:
+        stage_records (list): The latest record of every stage.
+
+    Returns:
+        str: The Prometheus text.
+    """
+    lines = []
+    for metric in ["wall_seconds", *METRIC_COUNTERS, "failed"]:
+        lines.append(f"# TYPE pipeline_stage_{metric} gauge")
+        for stage_record in stage_records:
+            value = (
+                int(stage_record["status"] == "failed")
+                if metric == "failed"
+                else stage_record[metric]
+            )
+            lines.append(
+                f'pipeline_stage_{metric}{{project="{stage_record["project"]}",stage="{stage_record["stage"]}"}} {value}'
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def write_stage_metrics(stage_record: dict) -> None:
+    """
+    Appends a stage record to the project metrics file and, if METRICS_FORMAT is "prometheus",
+    atomically rewrites the Prometheus text file with the latest record of every stage.
+
+    Args:
+        stage_record (dict): The stage record.
+
+    Returns:
+        None
+    """
+    project_dir = (
+        f"{base_dir}/../data/{stage_record['project']}"
+        if stage_record["project"]
+        else f"{base_dir}/../data"
+    )
+    os.makedirs(project_dir, exist_ok=True)
+
+    with _metrics_lock:
+        with open(f"{project_dir}/{METRICS_FILE}", "a") as file:
+            file.write(json.dumps(stage_record) + "\n")
+
+        if METRICS_FORMAT == "prometheus":
+            _latest_metrics[(stage_record["project"], stage_record["stage"])] = stage_record
+            prometheus_path = f"{project_dir}/{PROMETHEUS_METRICS_FILE}"
+            with open(f"{prometheus_path}.tmp", "w") as file:
+                file.write(
+                    format_prometheus_metrics(
+                        [
+                            record
+                            for record in _latest_metrics.values()
+                            if record["project"] == stage_record["project"]
+                        ]
+                    )
+                )
+            os.replace(f"{prometheus_path}.tmp", prometheus_path)
+
+    return None
@@ -0,0 +1,243 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from src.metrics import stage_metrics
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+PIPELINE_CACHE_FILE = "pipeline_cache.json"
+
+
+def fingerprint_file(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Computes the SHA-256 fingerprint of a file's contents.
+
+    Args:
+        file_path (str): The path to the file to fingerprint.
+        chunk_size (int, optional): The number of bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        str: The hex digest of the file contents, or "missing" if the file does not exist.
+    """
+    if not os.path.exists(file_path):
+        return "missing"
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def fingerprint_stage(project_name: str, stage: dict) -> str:
+    """
+    Computes the fingerprint of a stage from its name, parameters and the contents of its input files.
+
+    Args:
+        project_name (str): The project name used to locate the input files.
+        stage (dict): The stage declaration (see run_pipeline).
+
+    Returns:
+        str: The hex digest identifying this exact combination of stage and inputs.
+    """
+    digest = hashlib.sha256()
+    digest.update(stage["name"].encode())
+    digest.update(json.dumps(stage.get("params", {}), sort_keys=True, default=str).encode())
+    for input_file in sorted(stage["inputs"]):
+        input_file_path = f"{base_dir}/../data/{project_name}/{input_file}"
+        digest.update(input_file.encode())
+        digest.update(fingerprint_file(input_file_path).encode())
+
+    return digest.hexdigest()
+
+
+def load_pipeline_cache(project_name: str) -> dict:
+    """
+    Loads the stage fingerprints recorded by previous pipeline runs.
+
+    Args:
+        project_name (str): The project name used to locate the cache file.
+
+    Returns:
+        dict: A mapping from stage name to the fingerprint of its last successful run.
+    """
+    cache_path = f"{base_dir}/../data/{project_name}/{PIPELINE_CACHE_FILE}"
+    if not os.path.exists(cache_path):
+        return {}
+
+    with open(cache_path, "r") as file:
+        return json.load(file)
+
+
+def save_pipeline_cache(project_name: str, cache: dict) -> None:
+    """
+    Atomically saves the stage fingerprints so that an interrupted write never corrupts the cache.
+
+    Args:
+        project_name (str): The project name used to locate the cache file.
+        cache (dict): A mapping from stage name to the fingerprint of its last successful run.
+    """
+    cache_path = f"{base_dir}/../data/{project_name}/{PIPELINE_CACHE_FILE}"
+    with open(f"{cache_path}.tmp", "w") as file:
+        json.dump(cache, file, indent=2, sort_keys=True)
+    os.replace(f"{cache_path}.tmp", cache_path)
+
+    return None
+
+
+def resolve_stage_dependencies(stages: list) -> dict:
+    """
+    Derives the dependencies between stages from their declared inputs and outputs.
+
+    A stage depends on every earlier stage that produces one of its inputs. Stages that read
+    and write the same file are ordered by their position in the list.
+
+    Args:
+        stages (list): The ordered list of stage declarations.
+
+    Returns:
+        dict: A mapping from stage name to the set of stage names it depends on.
+
+    Raises:
+        ValueError: If two stages share the same name.
+    """
+    stage_names = [stage["name"] for stage in stages]
+    if len(stage_names) != len(set(stage_names)):
+        raise ValueError("Pipeline stage names must be unique.")
+
+    dependencies = {}
+    for i, stage in enumerate(stages):
+        dependencies[stage["name"]] = {
+            upstream_stage["name"]
+            for upstream_stage in stages[:i]
+            if set(upstream_stage["outputs"]) & set(stage["inputs"])
+        }
+
+    return dependencies
+
+
+def select_stages(stages: list, from_stage: str = None, to_stage: str = None) -> list:
+    """
+    Selects a contiguous range of stages by name.
+
+    Args:
+        stages (list): The ordered list of stage declarations.
+        from_stage (str, optional): The name of the first stage to select. Defaults to the first stage.
+        to_stage (str, optional): The name of the last stage to select. Defaults to the last stage.
+
+    Returns:
+        list: The selected stage declarations.
+
+    Raises:
+        ValueError: If a stage name is not found.
+    """
+    stage_names = [stage["name"] for stage in stages]
+    for stage_name in [from_stage, to_stage]:
+        if stage_name is not None and stage_name not in stage_names:
+            raise ValueError(
+                f"Stage {stage_name} is not supported. Available stages: {', '.join(stage_names)}."
+            )
+
+    start = stage_names.index(from_stage) if from_stage else 0
+    end = stage_names.index(to_stage) + 1 if to_stage else len(stages)
+
+    return stages[start:end]
+
+
+def run_pipeline(
+    project_name: str,
+    stages: list,
+    max_workers: int = 4,
+    force: bool = False,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Runs a list of pipeline stages, skipping stages whose inputs have not changed since their
+    last successful run and running independent stages concurrently.
+
+    Each stage is a dictionary with the following keys:
+        - "name" (str): A unique stage name.
+        - "function" (callable): The function that performs the stage.
+        - "kwargs" (dict, optional): Keyword arguments passed to the function.
+        - "inputs" (list): File names (relative to the project data folder) read by the stage.
+        - "outputs" (list): File names (relative to the project data folder) written by the stage.
+        - "params" (dict, optional): Extra values (e.g. the GPT model) that invalidate the cache when changed.
+        - "cache" (bool, optional): Whether the stage may be skipped when its inputs are unchanged.
+            Stages that read from external services (e.g. searches) set this to False. Defaults to True.
+        - "command" (str, optional): The command-line subcommand the stage belongs to (see src/cli.py).
+
+    Args:
+        project_name (str): The project name used to locate the input and output files.
+        stages (list): The ordered list of stage declarations.
+        max_workers (int, optional): The maximum number of stages run concurrently. Defaults to 4.
+        force (bool, optional): Whether to rerun every stage regardless of its cache. Defaults to False.
+        dry_run (bool, optional): Whether to only report which stages would run. Defaults to False.
+
+    Returns:
+        dict: A mapping from stage name to its status ("skipped", "completed" or "would run").
+
+    Raises:
+        RuntimeError: If a stage fails. Stages that already completed keep their cache entries,
+            so rerunning the pipeline resumes from the failed stage.
+    """
+    dependencies = resolve_stage_dependencies(stages)
+    stages_by_name = {stage["name"]: stage for stage in stages}
+    cache = load_pipeline_cache(project_name)
+    cache_lock = threading.Lock()
+    stage_status = {}
+
+    def execute_stage(stage: dict) -> str:
+        fingerprint = fingerprint_stage(project_name, stage)
+        outputs_exist = all(
+            os.path.exists(f"{base_dir}/../data/{project_name}/{output_file}")
+            for output_file in stage["outputs"]
+        )
+        if (
+            not force
+            and stage.get("cache", True)
+            and outputs_exist
+            and cache.get(stage["name"]) == fingerprint
+        ):
+            print(f"Skipping stage {stage['name']} (inputs unchanged)...")
+            return "skipped"
+
+        if dry_run:
+            print(f"Stage {stage['name']} would run.")
+            return "would run"
+
+        print(f"Running stage {stage['name']}...")
+        with stage_metrics(project_name, stage["name"]):
+            stage["function"](**stage.get("kwargs", {}))
+
+        # Record the fingerprint of the inputs that produced the outputs
+        with cache_lock:
+            cache[stage["name"]] = fingerprint
+            save_pipeline_cache(project_name, cache)
+
+        return "completed"
+
+    pending_stages = [stage["name"] for stage in stages]
+    running_stages = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending_stages or running_stages:
+            # Launch every stage whose upstream stages have finished
+            for stage_name in list(pending_stages):
+                if dependencies[stage_name] <= stage_status.keys():
+                    future = executor.submit(execute_stage, stages_by_name[stage_name])
+                    running_stages[future] = stage_name
+                    pending_stages.remove(stage_name)
+
+            done, _ = wait(running_stages, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage_name = running_stages.pop(future)
+                try:
+                    stage_status[stage_name] = future.result()
+                except Exception as e:
+                    # Let running stages finish so their results are cached, then stop
+                    wait(running_stages)
+                    raise RuntimeError(f"Pipeline stage {stage_name} failed.") from e
+
+    return stage_status
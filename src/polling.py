@@ -0,0 +1,179 @@
+import os
+import contextvars
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+from config.base_config import POLLING_MAX_WORKERS
+from src.utils import (
+    extract_video_transcripts_grouped,
+    construct_profile_prompt,
+    construct_system_prompt,
+    construct_user_prompt,
+    extract_llm_responses,
+    create_batch_file,
+    batch_query,
+    row_query,
+)
+from src.polling_store import append_polling_results
+from src.metrics import instrument_stage, record_metric
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+POLLING_STORE_CHUNK_SIZE = (
+    1000  # Number of polling results written to the polling store per transaction
+)
+
+
+def build_polling_record(
+    profile: pd.Series, interview_response: str, poll_date: datetime
+) -> pd.Series:
+    """
+    Combines a polled profile with its extracted interview responses and poll date.
+
+    Args:
+        profile (pd.Series): A pandas Series containing the profile metadata and prompts.
+        interview_response (str): The raw LLM response to the polling interview.
+        poll_date (datetime): The date of the poll.
+
+    Returns:
+        pd.Series: The polling record to store in the polling store.
+    """
+    extracted_interview_responses = extract_llm_responses(
+        interview_response, substring_exclusion_list=[]
+    )
+    polling_record = pd.concat([profile, extracted_interview_responses])
+    polling_record["poll_date"] = poll_date
+
+    return polling_record
+
+
+def build_polling_prompts(
+    eligible_profiles: pd.DataFrame, video_metadata: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Builds the profile, system and user prompts of every eligible profile in a single pass
+    over the video metadata.
+
+    Args:
+        eligible_profiles (pd.DataFrame): The profiles to poll.
+        video_metadata (pd.DataFrame): The latest videos of the profiles to poll.
+
+    Returns:
+        pd.DataFrame: The eligible profiles with 'profile_prompt', 'system_prompt' and 'user_prompt' fields.
+    """
+    eligible_profiles = eligible_profiles.reset_index(drop=True)
+    eligible_profiles["id"] = eligible_profiles["id"].astype(str)
+    video_metadata = video_metadata.copy()
+    video_metadata["profile_id"] = video_metadata["profile_id"].astype(str)
+
+    video_transcripts = extract_video_transcripts_grouped(video_metadata)
+    eligible_profiles["transcripts_combined"] = (
+        eligible_profiles["id"].map(video_transcripts).fillna("")
+    )
+    eligible_profiles["profile_prompt"] = eligible_profiles.apply(
+        construct_profile_prompt, axis=1
+    )
+    eligible_profiles["system_prompt"] = eligible_profiles.apply(
+        construct_system_prompt, args=("polling",), axis=1
+    )
+    eligible_profiles["user_prompt"] = eligible_profiles.apply(
+        construct_user_prompt, args=("polling",), axis=1
+    )
+
+    return eligible_profiles.drop(columns=["transcripts_combined"])
+
+
+@instrument_stage
+def conduct_polling_batch(
+    project_name: str,
+    gpt_model: str,
+    eligible_profiles: pd.DataFrame,
+    video_metadata: pd.DataFrame,
+    poll_date: datetime,
+    batch_interview: bool = True,
+    max_workers: int = POLLING_MAX_WORKERS,
+) -> None:
+    """
+    Polls every eligible profile, either as a single OpenAI batch or with concurrent chat
+    completion requests, and streams the results into the polling store.
+
+    Args:
+        project_name (str): The project name used to locate the batch files and polling store.
+        gpt_model (str): The GPT model used for the polling interview.
+        eligible_profiles (pd.DataFrame): The profiles to poll.
+        video_metadata (pd.DataFrame): The latest videos of the profiles to poll.
+        poll_date (datetime): The date of the poll.
+        batch_interview (bool, optional): Whether to poll all profiles as one batch. Defaults to True.
+        max_workers (int, optional): The number of concurrent requests when not polling as a batch. Defaults to POLLING_MAX_WORKERS.
+
+    Returns:
+        None
+    """
+    print("Building polling prompts...")
+    polling_prompts = build_polling_prompts(eligible_profiles, video_metadata)
+    record_metric("rows", len(polling_prompts))
+
+    if batch_interview:
+        polling_prompts["custom_id"] = polling_prompts.index
+
+        # Create folder to contain batch files
+        batch_file_dir = f"{base_dir}/../data/{project_name}/batch-files"
+        os.makedirs(batch_file_dir, exist_ok=True)
+
+        create_batch_file(
+            polling_prompts,
+            project_name=project_name,
+            gpt_model=gpt_model,
+            system_prompt_field="system_prompt",
+            user_prompt_field="user_prompt",
+            batch_file_name="polling_input.jsonl",
+        )
+
+        print("Perform batch polling using OpenAI API...")
+        llm_responses = batch_query(
+            project_name=project_name,
+            batch_input_file_dir="polling_input.jsonl",
+            batch_output_file_dir="polling_output.jsonl",
+        )
+
+        print("Storing polling results...")
+        polling_records = []
+        for custom_id, interview_response in llm_responses.items():
+            polling_records.append(
+                build_polling_record(
+                    polling_prompts.loc[int(custom_id)], interview_response, poll_date
+                )
+            )
+            if len(polling_records) == POLLING_STORE_CHUNK_SIZE:
+                append_polling_results(project_name, polling_records)
+                polling_records = []
+
+        if polling_records:
+            append_polling_results(project_name, polling_records)
+
+    else:
+        print("Polling profiles using the OpenAI Chat Completion API...")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Requests run in the context of this stage so that their tokens are recorded
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run,
+                    row_query,
+                    polling_prompts.loc[i],
+                    ["system_prompt", "user_prompt", gpt_model],
+                ): i
+                for i in polling_prompts.index
+            }
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                i = futures[future]
+                append_polling_results(
+                    project_name,
+                    [
+                        build_polling_record(
+                            polling_prompts.loc[i], future.result(), poll_date
+                        )
+                    ],
+                )
+
+    return None
@@ -0,0 +1,344 @@
+import os
+import json
+import sqlite3
+import pandas as pd
+from datetime import datetime
+from config.base_config import POLLING_STORE_FILE
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def connect_polling_store(project_name: str) -> sqlite3.Connection:
+    """
+    Opens the project's polling store, creating its tables if they do not exist.
+
+    The store is a SQLite database in write-ahead logging mode, so every committed write
+    survives a crash and concurrent pollers do not overwrite each other's results.
+
+    Args:
+        project_name (str): The project name used to locate the polling store.
+
+    Returns:
+        sqlite3.Connection: A connection to the polling store.
+    """
+    os.makedirs(f"{base_dir}/../data/{project_name}", exist_ok=True)
+    connection = sqlite3.connect(
+        f"{base_dir}/../data/{project_name}/{POLLING_STORE_FILE}", timeout=60
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS polling_results (
+            profile TEXT NOT NULL,
+            poll_date TEXT NOT NULL,
+            record TEXT NOT NULL,
+            PRIMARY KEY (profile, poll_date)
+        )"""
+    )
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS polled_profiles (
+            profile_id TEXT PRIMARY KEY,
+            profile TEXT,
+            last_poll_date TEXT NOT NULL
+        )"""
+    )
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS legacy_polled_profiles (
+            profile TEXT PRIMARY KEY,
+            last_poll_date TEXT NOT NULL
+        )"""
+    )
+
+    return connection
+
+
+def append_polling_results(project_name: str, polling_results: list) -> None:
+    """
+    Appends polling results to the polling store in a single transaction.
+
+    A profile that is polled twice on the same date keeps its latest result.
+
+    Args:
+        project_name (str): The project name used to locate the polling store.
+        polling_results (list): A list of pandas Series, each containing a profile, its poll date and its interview responses.
+
+    Returns:
+        None
+    """
+    rows = []
+    for polling_result in polling_results:
+        polling_result = polling_result.copy()
+        polling_result["poll_date"] = str(polling_result["poll_date"])
+        rows.append(
+            (
+                str(polling_result["profile"]),
+                polling_result["poll_date"],
+                polling_result.to_json(date_format="iso", default_handler=str),
+            )
+        )
+
+    connection = connect_polling_store(project_name)
+    try:
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO polling_results (profile, poll_date, record) VALUES (?, ?, ?)",
+                rows,
+            )
+    finally:
+        connection.close()
+
+    return None
+
+
+def append_polling_result(project_name: str, polling_result: pd.Series) -> None:
+    """
+    Appends the polling result of a single profile to the polling store.
+
+    Args:
+        project_name (str): The project name used to locate the polling store.
+        polling_result (pd.Series): A pandas Series containing the profile, its poll date and its interview responses.
+
+    Returns:
+        None
+    """
+    return append_polling_results(project_name, [polling_result])
+
+
+def import_polling_results(project_name: str, polling_results_file: str) -> None:
+    """
+    Imports a legacy polling results CSV file into the polling store, so that the polls made
+    before the store existed are kept when the store is compacted into the file.
+
+    The import only happens while the store has no polling results.
+
+    Args:
+        project_name (str): The project name used to locate the polling store and CSV file.
+        polling_results_file (str): The name of the polling results CSV file.
+
+    Returns:
+        None
+    """
+    polling_results_path = f"{base_dir}/../data/{project_name}/{polling_results_file}"
+    if not os.path.exists(polling_results_path) or os.path.getsize(polling_results_path) == 0:
+        return None
+
+    connection = connect_polling_store(project_name)
+    try:
+        if connection.execute("SELECT 1 FROM polling_results LIMIT 1").fetchone():
+            return None
+
+        try:
+            polling_results = pd.read_csv(polling_results_path)
+        except pd.errors.EmptyDataError:
+            return None
+        if "profile" not in polling_results.columns or "poll_date" not in polling_results.columns:
+            return None
+
+        print("Importing polling results into the polling store...")
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO polling_results (profile, poll_date, record) VALUES (?, ?, ?)",
+                (
+                    (
+                        str(polling_result["profile"]),
+                        str(polling_result["poll_date"]),
+                        polling_result.to_json(date_format="iso", default_handler=str),
+                    )
+                    for _, polling_result in polling_results.iterrows()
+                ),
+            )
+    finally:
+        connection.close()
+
+    return None
+
+
+def compact_polling_results(project_name: str, polling_results_file: str) -> None:
+    """
+    Compacts the polling store into the polling results CSV file used for analysis.
+
+    The CSV file is written to a temporary file first and then atomically replaces the
+    previous version, so readers never see a partially written file.
+    Import the previous polling results first (see import_polling_results), as the CSV file is
+    rebuilt from the store alone. An empty store leaves the CSV file untouched.
+
+    Args:
+        project_name (str): The project name used to locate the polling store.
+        polling_results_file (str): The name of the polling results CSV file.
+
+    Returns:
+        None
+    """
+    connection = connect_polling_store(project_name)
+    try:
+        records = [
+            json.loads(record)
+            for (record,) in connection.execute(
+                "SELECT record FROM polling_results ORDER BY poll_date, profile"
+            )
+        ]
+        # Fold the write-ahead log back into the database file
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        connection.close()
+
+    if not records:
+        return None
+
+    polling_results_path = f"{base_dir}/../data/{project_name}/{polling_results_file}"
+    pd.DataFrame(records).to_csv(f"{polling_results_path}.tmp", index=False)
+    os.replace(f"{polling_results_path}.tmp", polling_results_path)
+
+    return None
+
+
+def import_polled_profiles(
+    project_name: str, polled_profiles_file: str, profile_metadata: pd.DataFrame
+) -> None:
+    """
+    Imports a legacy polled profiles CSV file (keyed on profile handle) into the polled profile index.
+
+    The CSV file is imported, keyed on handle, only while the legacy table is empty. Legacy handles
+    are then mapped to profile IDs using the given profile metadata on every call, so a profile
+    polled before the index existed is still excluded when it reappears in a later search.
+
+    Args:
+        project_name (str): The project name used to locate the polling store and CSV file.
+        polled_profiles_file (str): The name of the legacy polled profiles CSV file.
+        profile_metadata (pd.DataFrame): Profile metadata containing the 'id' and 'profile' fields.
+
+    Returns:
+        None
+    """
+    polled_profiles_path = f"{base_dir}/../data/{project_name}/{polled_profiles_file}"
+    if not os.path.exists(polled_profiles_path):
+        return None
+
+    connection = connect_polling_store(project_name)
+    try:
+        if not connection.execute(
+            "SELECT 1 FROM legacy_polled_profiles LIMIT 1"
+        ).fetchone():
+            print("Importing polled profiles into the polled profile index...")
+            polled_profiles = pd.read_csv(polled_profiles_path)
+            polled_profiles["poll_date"] = pd.to_datetime(polled_profiles["poll_date"])
+            polled_profiles = polled_profiles.sort_values(by="poll_date").drop_duplicates(
+                subset="profile", keep="last"
+            )
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO legacy_polled_profiles (profile, last_poll_date) VALUES (?, ?)",
+                    zip(
+                        polled_profiles["profile"].astype(str),
+                        polled_profiles["poll_date"].dt.date.astype(str),
+                    ),
+                )
+
+        # Map the legacy handles of the current profiles to their IDs
+        connection.execute(
+            "CREATE TEMP TABLE current_profiles (profile_id TEXT PRIMARY KEY, profile TEXT)"
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO current_profiles (profile_id, profile) VALUES (?, ?)",
+            zip(
+                profile_metadata["id"].astype(str), profile_metadata["profile"].astype(str)
+            ),
+        )
+        with connection:
+            connection.execute(
+                """INSERT INTO polled_profiles (profile_id, profile, last_poll_date)
+                SELECT current_profiles.profile_id, current_profiles.profile,
+                    legacy_polled_profiles.last_poll_date
+                FROM current_profiles JOIN legacy_polled_profiles
+                    ON legacy_polled_profiles.profile = current_profiles.profile
+                WHERE true
+                ON CONFLICT(profile_id) DO UPDATE SET
+                    profile = excluded.profile,
+                    last_poll_date = MAX(last_poll_date, excluded.last_poll_date)"""
+            )
+    finally:
+        connection.close()
+
+    return None
+
+
+def select_unpolled_profiles(
+    project_name: str, profile_ids: list, polled_since: datetime
+) -> list:
+    """
+    Selects the profiles that have not been polled since the given date.
+
+    The candidate profile IDs are loaded into a temporary table and anti-joined against the
+    polled profile index on its primary key, so the cost grows with the number of candidates
+    rather than with the polling history.
+
+    Args:
+        project_name (str): The project name used to locate the polling store.
+        profile_ids (list): The IDs of the candidate profiles.
+        polled_since (datetime): Profiles polled on or after this date are excluded.
+
+    Returns:
+        list: The IDs of the candidate profiles that have not been polled since the given date.
+    """
+    connection = connect_polling_store(project_name)
+    try:
+        connection.execute(
+            "CREATE TEMP TABLE candidate_profiles (profile_id TEXT PRIMARY KEY)"
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO candidate_profiles (profile_id) VALUES (?)",
+            ((str(profile_id),) for profile_id in profile_ids),
+        )
+        unpolled_profile_ids = {
+            profile_id
+            for (profile_id,) in connection.execute(
+                """SELECT candidate_profiles.profile_id FROM candidate_profiles
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM polled_profiles
+                    WHERE polled_profiles.profile_id = candidate_profiles.profile_id
+                    AND polled_profiles.last_poll_date >= ?
+                )""",
+                (str(polled_since),),
+            )
+        }
+    finally:
+        connection.close()
+
+    return [
+        profile_id for profile_id in profile_ids if str(profile_id) in unpolled_profile_ids
+    ]
+
+
+def upsert_polled_profiles(
+    project_name: str, polled_profiles: pd.DataFrame, poll_date: datetime
+) -> None:
+    """
+    Records the poll date of the given profiles in the polled profile index.
+
+    Args:
+        project_name (str): The project name used to locate the polling store.
+        polled_profiles (pd.DataFrame): The polled profiles, containing the 'id' and 'profile' fields.
+        poll_date (datetime): The date of the poll.
+
+    Returns:
+        None
+    """
+    connection = connect_polling_store(project_name)
+    try:
+        with connection:
+            connection.executemany(
+                """INSERT INTO polled_profiles (profile_id, profile, last_poll_date) VALUES (?, ?, ?)
+                ON CONFLICT(profile_id) DO UPDATE SET
+                    profile = excluded.profile,
+                    last_poll_date = excluded.last_poll_date""",
+                (
+                    (str(profile_id), str(profile), str(poll_date))
+                    for profile_id, profile in zip(
+                        polled_profiles["id"], polled_profiles["profile"]
+                    )
+                ),
+            )
+    finally:
+        connection.close()
+
+    return None
@@ -1,15 +1,24 @@
 import os
 import pandas as pd
-from apify_client import ApifyClient
-from src.utils import load_text_file, update_video_metadata, update_profile_metadata
+from src.clients import get_apify_client
+from src.apify_runs import run_actor, mark_actor_run_consumed
+from src.metrics import instrument_stage
+from src.utils import (
+    load_text_file,
+    update_video_metadata,
+    update_profile_metadata,
+    refresh_video_store,
+)
+from src.video_store import read_profile_videos
 from config.base_config import (
-    APIFY_API,
     APIFY_ACTOR_ID,
     PROFILE_SEARCH_RESULTS_PER_PAGE,
+    TRANSCRIPTION_BACKEND,
 )
 from src.video_transcription import perform_video_transcription
 
 
+@instrument_stage
 def perform_profile_search(
     project_name: str,
     profile_metadata_file: str,
@@ -17,7 +26,9 @@ def perform_profile_search(
     profile_list: list = [],
     profile_list_file: str = None,
     perform_audio_transcription: bool = True,
+    transcription_backend: str = TRANSCRIPTION_BACKEND,
     return_videos: bool = False,
+    latest_n: int = None,
 ) -> pd.DataFrame:
     # Create the project subfolder within the data folder if it does not exist
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -29,7 +40,7 @@ def perform_profile_search(
         profile_list = load_text_file(profile_list_file)
 
     # Initialize the ApifyClient with your API token
-    client = ApifyClient(APIFY_API)
+    client = get_apify_client()
 
     # Prepare the Actor input
     run_input = {
@@ -40,13 +51,13 @@ def perform_profile_search(
         "resultsPerPage": PROFILE_SEARCH_RESULTS_PER_PAGE,
         "shouldDownloadCovers": False,
         "shouldDownloadSlideshowImages": False,
-        "shouldDownloadSubtitles": False,
+        "shouldDownloadSubtitles": True,
         "shouldDownloadVideos": False,
     }
 
-    # Run the Actor and wait for it to finish
+    # Run the Actor and wait for it to finish, reattaching to the run of an interrupted search
     print("Performing profile search using Apify...")
-    run = client.actor(APIFY_ACTOR_ID).call(run_input=run_input)
+    run = run_actor(client, project_name, APIFY_ACTOR_ID, run_input)
 
     # Update video metadata store
     print("Updating video metadata...")
@@ -58,6 +69,7 @@ def perform_profile_search(
         profile_search=True,
         filtering_list=profile_list,
     )
+    mark_actor_run_consumed(project_name, run["id"])
 
     # Update profile metadata store
     print("Updating profile metadata...")
@@ -71,17 +83,25 @@ def perform_profile_search(
     if perform_audio_transcription:
         print("Performing audio transcription...")
         perform_video_transcription(
-            project_name=project_name, video_metadata_file=video_metadata_file
+            project_name=project_name,
+            video_metadata_file=video_metadata_file,
+            transcription_backend=transcription_backend,
         )
 
     # Extract videos from profile list
     if return_videos:
-        updated_video_metadata = pd.read_csv(
-            f"{base_dir}/../data/{project_name}/{video_metadata_file}"
+        refresh_video_store(project_name, video_metadata_file)
+        profile_metadata = pd.read_csv(
+            f"{base_dir}/../data/{project_name}/{profile_metadata_file}",
+            usecols=["id", "profile"],
+            dtype={"id": str},
+        )
+        profile_ids = profile_metadata.loc[
+            profile_metadata["profile"].isin(profile_list), "id"
+        ].tolist()
+        filtered_video_metadata = read_profile_videos(
+            project_name, video_metadata_file, profile_ids, latest_n=latest_n
         )
-        filtered_video_metadata = updated_video_metadata[
-            updated_video_metadata["profile"].isin(profile_list)
-        ].reset_index(drop=True)
 
         return filtered_video_metadata
 
@@ -0,0 +1,115 @@
+import re
+import html
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from config.base_config import (
+    SUBTITLE_EXCLUDED_SOURCES,
+    SUBTITLE_DOWNLOAD_TIMEOUT,
+    SUBTITLE_DOWNLOAD_MAX_WORKERS,
+)
+
+# Cue timing lines, e.g. "00:00:01.000 --> 00:00:04.000 align:start"
+WEBVTT_TIMING = re.compile(r"^(\d+:)?\d+:\d+[.,]\d+\s+-->")
+# Inline cue tags, e.g. <c.colorE5E5E5>, <00:00:01.500>, <v Speaker>
+WEBVTT_TAG = re.compile(r"<[^>]*>")
+
+
+def parse_webvtt(subtitles: str) -> str:
+    """
+    Converts WebVTT subtitles into a plain text transcript.
+
+    Args:
+        subtitles (str): The contents of a WebVTT file.
+
+    Returns:
+        str: The text of the cues joined by spaces, without the header, notes, cue identifiers,
+            timings, tags or consecutive repeated lines (as in rolling captions).
+    """
+    lines = []
+    for block in re.split(r"\n\s*\n", subtitles.replace("\r\n", "\n").strip()):
+        block_lines = block.split("\n")
+        if block_lines[0].startswith(("WEBVTT", "NOTE", "STYLE", "REGION")):
+            continue
+
+        # The cue text follows the timing line (and the optional cue identifier before it)
+        timing_lines = [
+            i for i, line in enumerate(block_lines) if WEBVTT_TIMING.match(line.strip())
+        ]
+        if timing_lines:
+            block_lines = block_lines[timing_lines[0] + 1 :]
+
+        for line in block_lines:
+            line = html.unescape(WEBVTT_TAG.sub("", line)).strip()
+            if line and (not lines or lines[-1] != line):
+                lines.append(line)
+
+    return " ".join(lines)
+
+
+def select_subtitle_link(video_meta: dict) -> str:
+    """
+    Selects the subtitles of a video that transcribe its spoken audio.
+
+    Args:
+        video_meta (dict): The 'videoMeta' field of a scraped video, with the 'subtitleLinks'
+            returned by the scraper when shouldDownloadSubtitles is set.
+
+    Returns:
+        str: The download link of the first subtitles that are not from a source in
+            SUBTITLE_EXCLUDED_SOURCES (e.g. machine translations), or None if there are none.
+    """
+    if not isinstance(video_meta, dict):
+        return None
+
+    for subtitle_link in video_meta.get("subtitleLinks") or []:
+        if (
+            subtitle_link.get("downloadLink")
+            and subtitle_link.get("source") not in SUBTITLE_EXCLUDED_SOURCES
+        ):
+            return subtitle_link["downloadLink"]
+
+    return None
+
+
+def fetch_subtitle_transcript(video_meta: dict) -> str:
+    """
+    Downloads the subtitles of a video and converts them into a transcript.
+
+    Args:
+        video_meta (dict): The 'videoMeta' field of a scraped video.
+
+    Returns:
+        str: The transcript, or None if the video has no usable subtitles or they could not be
+            downloaded, in which case the video is transcribed from its audio.
+    """
+    download_link = select_subtitle_link(video_meta)
+    if download_link is None:
+        return None
+
+    try:
+        with urllib.request.urlopen(
+            download_link, timeout=SUBTITLE_DOWNLOAD_TIMEOUT
+        ) as response:
+            subtitles = response.read().decode("utf-8", errors="replace")
+    except Exception as e:
+        print(f"Error downloading subtitles {download_link}: {e}")
+        return None
+
+    return parse_webvtt(subtitles) or None
+
+
+def fetch_subtitle_transcripts(
+    video_metas: list, max_workers: int = SUBTITLE_DOWNLOAD_MAX_WORKERS
+) -> list:
+    """
+    Downloads the subtitles of many videos concurrently and converts them into transcripts.
+
+    Args:
+        video_metas (list): The 'videoMeta' fields of the videos.
+        max_workers (int, optional): The number of concurrent downloads. Defaults to SUBTITLE_DOWNLOAD_MAX_WORKERS.
+
+    Returns:
+        list: The transcript of every video, in order, None for videos without usable subtitles.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fetch_subtitle_transcript, video_metas))
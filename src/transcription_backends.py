@@ -0,0 +1,213 @@
+import os
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, BrokenExecutor, as_completed
+from src.clients import get_openai_client
+from src.audio_processing import optimize_audio_file
+from config.base_config import (
+    LOCAL_WHISPER_MODEL,
+    LOCAL_WHISPER_COMPUTE_TYPE,
+    LOCAL_WHISPER_CPU_THREADS,
+    LOCAL_WHISPER_BATCH_SIZE,
+    LOCAL_TRANSCRIPTION_WORKERS,
+)
+
+# The local model loaded once by every worker process of the local transcription pool
+_local_model = None
+
+
+def transcribe_file_openai(audio_file_path: str) -> str:
+    """
+    Transcribes an audio or video file with the OpenAI Whisper API. Files that are too large
+    are downsampled and sent again.
+
+    Args:
+        audio_file_path (str): The path to the audio or video file.
+
+    Returns:
+        str: The transcription of the audio.
+    """
+    try:
+        with open(audio_file_path, "rb") as audio_file:
+            return get_openai_client().audio.transcriptions.create(
+                model="whisper-1", file=audio_file, response_format="text"
+            )
+
+    except Exception as e:
+        if getattr(e, "status_code", None) != 413:
+            raise
+
+    print(
+        f"Error: File {os.path.basename(audio_file_path)} is too large to process. Optimizing the audio file..."
+    )
+    audio_file_dir, audio_file_name = os.path.split(audio_file_path)
+    optimized_file_path = (
+        f"{audio_file_dir}/optimized_{os.path.splitext(audio_file_name)[0]}.wav"
+    )
+    optimize_audio_file(audio_file_path, optimized_file_path)
+    with open(optimized_file_path, "rb") as audio_file:
+        return get_openai_client().audio.transcriptions.create(
+            model="whisper-1", file=audio_file, response_format="text"
+        )
+
+
+def transcribe_files_openai(audio_file_paths: list):
+    """
+    Transcribes audio or video files one at a time with the OpenAI Whisper API.
+
+    Args:
+        audio_file_paths (list): The paths to the files.
+
+    Yields:
+        tuple: The position of a file in audio_file_paths and its transcription, or the
+            exception raised if it failed to transcribe, as soon as the file is transcribed.
+    """
+    for position, audio_file_path in enumerate(audio_file_paths):
+        try:
+            yield position, transcribe_file_openai(audio_file_path)
+        except Exception as e:
+            yield position, e
+
+
+def load_local_model(model_size: str, compute_type: str, cpu_threads: int) -> None:
+    """
+    Loads the faster-whisper model of a worker process of the local transcription pool.
+
+    Args:
+        model_size (str): The Whisper model size (e.g. "small").
+        compute_type (str): The quantization of the model weights (e.g. "int8").
+        cpu_threads (int): The CPU threads used by the worker.
+
+    Returns:
+        None
+    """
+    global _local_model
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+    _local_model = BatchedInferencePipeline(
+        model=WhisperModel(
+            model_size,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+        )
+    )
+
+    return None
+
+
+def transcribe_file_local(audio_file_path: str) -> str:
+    """
+    Transcribes an audio or video file with the model of the worker process, decoding the
+    segments of the file in batches of LOCAL_WHISPER_BATCH_SIZE.
+
+    Args:
+        audio_file_path (str): The path to the audio or video file.
+
+    Returns:
+        str: The transcription of the audio.
+    """
+    segments, _ = _local_model.transcribe(
+        audio_file_path, batch_size=LOCAL_WHISPER_BATCH_SIZE
+    )
+
+    return " ".join(segment.text.strip() for segment in segments)
+
+
+@lru_cache(maxsize=None)
+def get_local_transcription_pool() -> ProcessPoolExecutor:
+    """
+    Returns the pool of worker processes transcribing with a local faster-whisper model,
+    starting it on first use. Each worker loads the model once and uses LOCAL_WHISPER_CPU_THREADS
+    threads; the pool has LOCAL_TRANSCRIPTION_WORKERS workers, or as many as the machine's
+    cores allow if it is None.
+
+    Returns:
+        ProcessPoolExecutor: The pool of worker processes.
+
+    Raises:
+        ImportError: If faster-whisper is not installed.
+    """
+    try:
+        import faster_whisper  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "The faster-whisper transcription backend requires faster-whisper (pip install faster-whisper)."
+        )
+
+    max_workers = LOCAL_TRANSCRIPTION_WORKERS or max(
+        1, (os.cpu_count() or 1) // LOCAL_WHISPER_CPU_THREADS
+    )
+    print(
+        f"Starting {max_workers} local transcription workers with the {LOCAL_WHISPER_MODEL} model..."
+    )
+
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=load_local_model,
+        initargs=(
+            LOCAL_WHISPER_MODEL,
+            LOCAL_WHISPER_COMPUTE_TYPE,
+            LOCAL_WHISPER_CPU_THREADS,
+        ),
+    )
+
+
+def transcribe_files_local(audio_file_paths: list):
+    """
+    Transcribes audio or video files concurrently with the local transcription pool, without
+    calling any API.
+
+    Args:
+        audio_file_paths (list): The paths to the files.
+
+    Yields:
+        tuple: The position of a file in audio_file_paths and its transcription, or the
+            exception raised if it failed to transcribe, as soon as the file is transcribed.
+    """
+    local_transcription_pool = get_local_transcription_pool()
+    futures = {
+        local_transcription_pool.submit(transcribe_file_local, audio_file_path): position
+        for position, audio_file_path in enumerate(audio_file_paths)
+    }
+
+    pool_broken = False
+    try:
+        for future in as_completed(futures):
+            error = future.exception()
+            pool_broken |= isinstance(error, BrokenExecutor)
+            yield futures[future], error if error is not None else future.result()
+    finally:
+        # Start a new pool for the next files if a worker process died
+        if pool_broken:
+            local_transcription_pool.shutdown(wait=False)
+            get_local_transcription_pool.cache_clear()
+
+
+# Transcription backends by name. Every backend transcribes a list of files and yields the
+# position and transcription of every file (or the exception raised by a file that failed) as
+# soon as the file is transcribed, so that every transcript is checkpointed as it arrives.
+TRANSCRIPTION_BACKENDS = {
+    "openai": transcribe_files_openai,
+    "faster-whisper": transcribe_files_local,
+}
+
+
+def get_transcription_backend(transcription_backend: str):
+    """
+    Returns a transcription backend by name.
+
+    Args:
+        transcription_backend (str): The name of the backend, one of TRANSCRIPTION_BACKENDS.
+
+    Returns:
+        function: The backend, transcribing a list of files.
+
+    Raises:
+        ValueError: If the backend does not exist.
+    """
+    if transcription_backend not in TRANSCRIPTION_BACKENDS:
+        raise ValueError(
+            f"Unknown transcription backend {transcription_backend}, expected one of {list(TRANSCRIPTION_BACKENDS)}."
+        )
+
+    return TRANSCRIPTION_BACKENDS[transcription_backend]
@@ -0,0 +1,445 @@
+import os
+import sqlite3
+import numpy as np
+from collections import Counter
+from concurrent.futures import BrokenExecutor
+from datetime import datetime, timedelta, timezone
+from config.base_config import (
+    TRANSCRIPTION_STORE_FILE,
+    TRANSCRIPTION_MAX_ATTEMPTS,
+    TRANSCRIPTION_RETRY_BASE_SECONDS,
+    TRANSCRIPTION_RETRY_MAX_SECONDS,
+    TRANSCRIPTION_PERMANENT_ERROR_MESSAGES,
+    TRANSCRIPTION_SERVICE_ERROR_STATUS_CODES,
+    TRANSCRIPTION_SERVICE_ERROR_MESSAGES,
+    AUDIO_FINGERPRINT_INDEX_STRIDE,
+    AUDIO_FINGERPRINT_MAX_CANDIDATES,
+    AUDIO_FINGERPRINT_MAX_BIT_ERROR_RATE,
+    AUDIO_FINGERPRINT_MIN_OVERLAP,
+)
+from src.audio_processing import fingerprint_bit_error_rate
+
+# Sub-fingerprints of silent or clipped frames, shared by unrelated clips
+UNINFORMATIVE_SUB_FINGERPRINTS = {0, 0xFFFFFFFF}
+
+# Sub-fingerprints looked up per query, within SQLite's variable limit
+FINGERPRINT_LOOKUP_BATCH_SIZE = 500
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def connect_transcription_store(project_name: str) -> sqlite3.Connection:
+    """
+    Opens the project's transcription store, creating its tables if they do not exist.
+
+    The ledger table records the transcription attempts of every video that failed to
+    transcribe, so that failing videos are retried with exponential backoff and videos that
+    will never transcribe (deleted, private or oversize) are skipped for good. It also records
+    the videos without speech, whose empty transcript does not survive the video metadata CSV
+    (it reads back as missing), so that they are not downloaded again. The transcripts
+    table checkpoints every completed transcript as soon as it is received, so that an
+    interrupted transcription run resumes where it stopped. The audio fingerprint tables keep
+    the fingerprint and transcript of every transcribed video, indexed by sub-fingerprint, so
+    that videos with the same audio are transcribed once.
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+
+    Returns:
+        sqlite3.Connection: A connection to the transcription store.
+    """
+    os.makedirs(f"{base_dir}/../data/{project_name}", exist_ok=True)
+    connection = sqlite3.connect(
+        f"{base_dir}/../data/{project_name}/{TRANSCRIPTION_STORE_FILE}", timeout=60
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS transcription_ledger (
+            video_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL,
+            last_error TEXT,
+            last_attempt_at TEXT NOT NULL,
+            next_eligible_at TEXT
+        )"""
+    )
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS transcripts (
+            video_id TEXT PRIMARY KEY,
+            video_transcript TEXT NOT NULL,
+            transcribed_at TEXT NOT NULL
+        )"""
+    )
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS audio_fingerprints (
+            video_id TEXT PRIMARY KEY,
+            fingerprint BLOB NOT NULL,
+            video_transcript TEXT NOT NULL
+        )"""
+    )
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS audio_fingerprint_index (
+            sub_fingerprint INTEGER NOT NULL,
+            video_id TEXT NOT NULL,
+            position INTEGER NOT NULL
+        )"""
+    )
+    connection.execute(
+        """CREATE INDEX IF NOT EXISTS audio_fingerprint_index_sub_fingerprint
+        ON audio_fingerprint_index (sub_fingerprint)"""
+    )
+
+    return connection
+
+
+def is_video_error(error: Exception) -> bool:
+    """
+    Tells whether a download or transcription error is specific to the video, as opposed to an
+    error of the account, quota, network, transcription service or local transcription pool that
+    any other video would have hit as well.
+
+    Args:
+        error (Exception): The error raised while downloading or transcribing a video.
+
+    Returns:
+        bool: Whether the error is specific to the video. Only these count as attempts of the video.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, BrokenExecutor)) or any(
+        error_type.__name__ == "APIConnectionError" for error_type in type(error).__mro__
+    ):
+        return False
+
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return (
+            status_code not in TRANSCRIPTION_SERVICE_ERROR_STATUS_CODES
+            and status_code < 500
+        )
+
+    error_message = str(error).lower()
+    return not any(
+        service_error_message in error_message
+        for service_error_message in TRANSCRIPTION_SERVICE_ERROR_MESSAGES
+    )
+
+
+def classify_transcription_error(error: Exception) -> tuple:
+    """
+    Classifies a download or transcription error.
+
+    Args:
+        error (Exception): The error raised while downloading or transcribing a video.
+
+    Returns:
+        tuple: The error class and whether the error is permanent. Errors of videos that are
+            private, deleted or unavailable, and files that the transcription API rejects
+            as invalid or too large, are permanent.
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return f"{type(error).__name__}({status_code})", status_code in [400, 413]
+
+    error_message = str(error).lower()
+    permanent = any(
+        permanent_error_message in error_message
+        for permanent_error_message in TRANSCRIPTION_PERMANENT_ERROR_MESSAGES
+    )
+
+    return type(error).__name__, permanent
+
+
+def load_ineligible_videos(project_name: str, now: datetime = None) -> set:
+    """
+    Returns the videos that must not be transcribed in this run, either because they failed
+    permanently, because their backoff period has not elapsed or because they have no speech.
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+        now (datetime, optional): The current time. Defaults to the current UTC time.
+
+    Returns:
+        set: The IDs of the ineligible videos.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+
+    connection = connect_transcription_store(project_name)
+    try:
+        rows = connection.execute(
+            """SELECT video_id FROM transcription_ledger
+            WHERE status IN ('permanent_failure', 'no_speech')
+            OR (status = 'failed' AND next_eligible_at > ?)""",
+            (now.isoformat(),),
+        ).fetchall()
+    finally:
+        connection.close()
+
+    return {video_id for (video_id,) in rows}
+
+
+def record_transcription_failure(
+    project_name: str, video_id: str, error: Exception, now: datetime = None
+) -> str:
+    """
+    Records a failed transcription attempt of a video in the ledger. The video becomes eligible
+    again after TRANSCRIPTION_RETRY_BASE_SECONDS, doubled after every further failure, and fails
+    permanently after a permanent error or TRANSCRIPTION_MAX_ATTEMPTS attempts.
+    Errors that are not specific to the video (see is_video_error) are not recorded.
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+        video_id (str): The video ID.
+        error (Exception): The error raised while downloading or transcribing the video.
+        now (datetime, optional): The time of the attempt. Defaults to the current UTC time.
+
+    Returns:
+        str: The status of the video, "failed" or "permanent_failure", or None if the error was
+            not recorded.
+    """
+    if not is_video_error(error):
+        return None
+
+    if now is None:
+        now = datetime.now(timezone.utc)
+    error_class, permanent = classify_transcription_error(error)
+
+    connection = connect_transcription_store(project_name)
+    try:
+        with connection:
+            row = connection.execute(
+                "SELECT attempts FROM transcription_ledger WHERE video_id = ?",
+                (str(video_id),),
+            ).fetchone()
+            attempts = (row[0] if row else 0) + 1
+
+            if permanent or attempts >= TRANSCRIPTION_MAX_ATTEMPTS:
+                status, next_eligible_at = "permanent_failure", None
+            else:
+                backoff_seconds = min(
+                    TRANSCRIPTION_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+                    TRANSCRIPTION_RETRY_MAX_SECONDS,
+                )
+                status = "failed"
+                next_eligible_at = (now + timedelta(seconds=backoff_seconds)).isoformat()
+
+            connection.execute(
+                """INSERT OR REPLACE INTO transcription_ledger
+                (video_id, status, attempts, last_error, last_attempt_at, next_eligible_at)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+                (
+                    str(video_id),
+                    status,
+                    attempts,
+                    error_class,
+                    now.isoformat(),
+                    next_eligible_at,
+                ),
+            )
+    finally:
+        connection.close()
+
+    return status
+
+
+def record_transcript(
+    project_name: str, video_id: str, video_transcript: str, now: datetime = None
+) -> None:
+    """
+    Checkpoints the transcript of a video and removes the video from the ledger, in a single
+    transaction. A video with an empty transcript (no speech) stays in the ledger with the
+    'no_speech' status instead, so that later runs do not transcribe it again.
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+        video_id (str): The video ID.
+        video_transcript (str): The transcript of the video.
+        now (datetime, optional): The time of the transcription. Defaults to the current UTC time.
+
+    Returns:
+        None
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+
+    connection = connect_transcription_store(project_name)
+    try:
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO transcripts (video_id, video_transcript, transcribed_at) VALUES (?, ?, ?)",
+                (str(video_id), video_transcript, now.isoformat()),
+            )
+            if video_transcript:
+                connection.execute(
+                    "DELETE FROM transcription_ledger WHERE video_id = ?",
+                    (str(video_id),),
+                )
+            else:
+                connection.execute(
+                    """INSERT OR REPLACE INTO transcription_ledger
+                    (video_id, status, attempts, last_error, last_attempt_at, next_eligible_at)
+                    VALUES (?, 'no_speech', 0, NULL, ?, NULL)""",
+                    (str(video_id), now.isoformat()),
+                )
+    finally:
+        connection.close()
+
+    return None
+
+
+def load_checkpointed_transcripts(project_name: str) -> dict:
+    """
+    Loads the transcripts checkpointed by runs that have not yet saved them to the video metadata.
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+
+    Returns:
+        dict: The checkpointed transcripts keyed by video ID.
+    """
+    connection = connect_transcription_store(project_name)
+    try:
+        rows = connection.execute(
+            "SELECT video_id, video_transcript FROM transcripts"
+        ).fetchall()
+    finally:
+        connection.close()
+
+    return dict(rows)
+
+
+def clear_checkpointed_transcripts(project_name: str, video_ids: list) -> None:
+    """
+    Removes checkpointed transcripts once they have been saved to the video metadata.
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+        video_ids (list): The IDs of the saved videos.
+
+    Returns:
+        None
+    """
+    connection = connect_transcription_store(project_name)
+    try:
+        with connection:
+            connection.executemany(
+                "DELETE FROM transcripts WHERE video_id = ?",
+                [(str(video_id),) for video_id in video_ids],
+            )
+    finally:
+        connection.close()
+
+    return None
+
+
+def record_audio_fingerprint(
+    project_name: str, video_id: str, fingerprint: np.ndarray, video_transcript: str
+) -> None:
+    """
+    Stores the audio fingerprint and transcript of a transcribed video, indexing every
+    AUDIO_FINGERPRINT_INDEX_STRIDE-th sub-fingerprint for lookup.
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+        video_id (str): The video ID.
+        fingerprint (np.ndarray): The sub-fingerprints of the video's audio (see fingerprint_audio).
+        video_transcript (str): The transcript of the video.
+
+    Returns:
+        None
+    """
+    index_rows = [
+        (int(sub_fingerprint), str(video_id), position)
+        for position, sub_fingerprint in enumerate(fingerprint)
+        if position % AUDIO_FINGERPRINT_INDEX_STRIDE == 0
+        and int(sub_fingerprint) not in UNINFORMATIVE_SUB_FINGERPRINTS
+    ]
+
+    connection = connect_transcription_store(project_name)
+    try:
+        with connection:
+            connection.execute(
+                "DELETE FROM audio_fingerprint_index WHERE video_id = ?", (str(video_id),)
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO audio_fingerprints (video_id, fingerprint, video_transcript) VALUES (?, ?, ?)",
+                (
+                    str(video_id),
+                    fingerprint.astype("<u4").tobytes(),
+                    video_transcript,
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO audio_fingerprint_index (sub_fingerprint, video_id, position) VALUES (?, ?, ?)",
+                index_rows,
+            )
+    finally:
+        connection.close()
+
+    return None
+
+
+def find_matching_transcript(project_name: str, fingerprint: np.ndarray) -> tuple:
+    """
+    Looks up a transcribed video with the same audio as a fingerprint.
+
+    Candidate videos share exact sub-fingerprints with the fingerprint, and every shared
+    sub-fingerprint votes for the alignment it implies. The best aligned candidates are then
+    compared bit by bit: a candidate matches if it differs in at most
+    AUDIO_FINGERPRINT_MAX_BIT_ERROR_RATE of the bits over at least AUDIO_FINGERPRINT_MIN_OVERLAP
+    of the longer clip.
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+        fingerprint (np.ndarray): The sub-fingerprints of the audio to look up.
+
+    Returns:
+        tuple: The ID and transcript of the matching video, or (None, None) if there is no match.
+    """
+    query_positions = {}
+    for position, sub_fingerprint in enumerate(fingerprint):
+        if int(sub_fingerprint) not in UNINFORMATIVE_SUB_FINGERPRINTS:
+            query_positions.setdefault(int(sub_fingerprint), position)
+    if not query_positions:
+        return None, None
+
+    connection = connect_transcription_store(project_name)
+    try:
+        # Vote for the (video, offset) alignments implied by the shared sub-fingerprints
+        alignment_votes = Counter()
+        sub_fingerprints = list(query_positions)
+        for start in range(0, len(sub_fingerprints), FINGERPRINT_LOOKUP_BATCH_SIZE):
+            batch = sub_fingerprints[start : start + FINGERPRINT_LOOKUP_BATCH_SIZE]
+            rows = connection.execute(
+                f"""SELECT sub_fingerprint, video_id, position FROM audio_fingerprint_index
+                WHERE sub_fingerprint IN ({", ".join("?" * len(batch))})""",
+                batch,
+            ).fetchall()
+            for sub_fingerprint, video_id, position in rows:
+                alignment_votes[
+                    (video_id, position - query_positions[sub_fingerprint])
+                ] += 1
+
+        # Compare the best aligned candidates bit by bit
+        for (video_id, offset), _ in alignment_votes.most_common(
+            AUDIO_FINGERPRINT_MAX_CANDIDATES
+        ):
+            candidate_fingerprint, video_transcript = connection.execute(
+                "SELECT fingerprint, video_transcript FROM audio_fingerprints WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+            candidate_fingerprint = np.frombuffer(candidate_fingerprint, dtype="<u4")
+            bit_error_rate, overlap = fingerprint_bit_error_rate(
+                fingerprint, candidate_fingerprint, offset
+            )
+            if (
+                bit_error_rate <= AUDIO_FINGERPRINT_MAX_BIT_ERROR_RATE
+                and overlap
+                >= AUDIO_FINGERPRINT_MIN_OVERLAP
+                * max(len(fingerprint), len(candidate_fingerprint))
+            ):
+                return video_id, video_transcript
+    finally:
+        connection.close()
+
+    return None, None
@@ -1,13 +1,15 @@
 import pandas as pd
+import numpy as np
 import os
 import ast
-import yt_dlp
+import shutil
+import hashlib
+import tempfile
 import time
 import json
 import re
-from pydub import AudioSegment
-from apify_client import ApifyClient
-from openai import OpenAI
+from typing import TYPE_CHECKING
+from tqdm import tqdm
 from prompts.prompt_template import (
     finfluencer_identification_system_prompt,
     video_transcript_template,
@@ -28,13 +30,48 @@ from prompts.prompt_template import (
     polling_system_prompt,
     polling_user_prompt,
 )
-from config.base_config import *
+from config.base_config import (
+    BATCH_MAX_RESUBMISSIONS,
+    BATCH_REALTIME_RESUBMISSION_MAX,
+    TRANSCRIPTION_VAD,
+    TRANSCRIPTION_BACKEND,
+)
 from config.market_signals_config import (
     RUSSELL_4000_STOCK_TICKER_FILE,
 )
+from config.video_metadata_config import (
+    VIDEO_METADATA_DTYPES,
+    VIDEO_METADATA_CHUNK_SIZE,
+    PROMPT_VIDEO_COLUMNS,
+    PROMPT_VIDEOS_PER_PROFILE,
+    VIDEO_STORE_COLUMNS,
+)
+from src.clients import get_openai_client
+from src.metrics import instrument_stage, record_metric
+from src.batch_estimator import plan_batch_submission
+from src.audio_processing import trim_to_speech, fingerprint_audio, optimize_audio_file
+from src.transcription_backends import get_transcription_backend
+from src.subtitles import fetch_subtitle_transcripts
+from src.video_downloader import download_video_url
+from src.batch_results import (
+    download_batch_file,
+    read_batch_results,
+    write_resubmission_file,
+    query_batch_file_realtime,
+)
+from src.video_store import (
+    build_video_store,
+    load_video_store_bucket,
+    partition_by_profile,
+    load_partition,
+)
 
+if TYPE_CHECKING:
+    from apify_client import ApifyClient
+
+# Download, transcription, Apify and OpenAI dependencies are imported on first use,
+# so stages that only parse CSV files do not pay for them at start-up
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
 
@@ -53,10 +90,11 @@ def load_text_file(file_path) -> list:
         return [line.strip() for line in file]
 
 
+@instrument_stage
 def update_video_metadata(
     project_name: str,
     video_metadata_file: str,
-    client: ApifyClient,
+    client: "ApifyClient",
     run: dict,
     profile_search: bool,
     filtering_list: list,
@@ -65,6 +103,11 @@ def update_video_metadata(
     Updates the video metadata by fetching new data, appending it to the existing data,
     and removing duplicates.
 
+    Videos with subtitles (requested with shouldDownloadSubtitles) are transcribed from them at
+    ingest, so that only videos without usable captions are downloaded and transcribed with
+    Whisper. Videos fetched again keep the transcript of their previous entry, so their subtitles
+    are not downloaded again and their Whisper transcripts are never replaced.
+
     Args:
         client (ApifyClient): The Apify client used to fetch video metadata.
         run (dict): The run object containing the default dataset ID.
@@ -86,6 +129,7 @@ def update_video_metadata(
         video_metadata = video_metadata[
             video_metadata["searchQuery"].isin(filtering_list)
         ].reset_index(drop=True)
+    record_metric("rows", len(video_metadata))
 
     # Append extraction time to extracted video metadata
     video_metadata["extractionTime"] = pd.Timestamp.utcnow()
@@ -98,12 +142,37 @@ def update_video_metadata(
     # Define the file path
     video_metadata_path = f"{base_dir}/../data/{project_name}/{video_metadata_file}"
 
+    # Load the transcripts of the stored videos, which are kept for videos fetched again
+    old_video_metadata = None
+    old_transcripts = pd.Series(dtype=object)
     if os.path.exists(video_metadata_path):
-        # Load existing video metadata file
         old_video_metadata = pd.read_csv(video_metadata_path)
         old_video_metadata["id"] = old_video_metadata["id"].astype("str")
+        if "video_transcript" in old_video_metadata.columns:
+            old_transcripts = old_video_metadata.dropna(
+                subset=["video_transcript"]
+            ).set_index("id")["video_transcript"]
+    video_metadata["video_transcript"] = (
+        video_metadata["id"].astype(str).map(old_transcripts).astype(object)
+    )
 
-        # Append new data
+    # Transcribe captioned videos without a stored transcript from their subtitles
+    without_transcript = video_metadata["video_transcript"].isnull()
+    video_metadata.loc[without_transcript, "video_transcript"] = fetch_subtitle_transcripts(
+        video_metadata.loc[without_transcript]
+        .get("videoMeta", pd.Series(dtype=object))
+        .tolist()
+    )
+    num_subtitle_transcripts = int(
+        video_metadata.loc[without_transcript, "video_transcript"].notnull().sum()
+    )
+    record_metric("subtitle_transcripts", num_subtitle_transcripts)
+    print(
+        f"Transcribed {num_subtitle_transcripts} of {int(without_transcript.sum())} new videos from their subtitles..."
+    )
+
+    # Append new data
+    if old_video_metadata is not None:
         video_metadata = pd.concat([old_video_metadata, video_metadata])
 
     # Remove duplicated video entries based on video ID, keeping the latest entry
@@ -119,6 +188,104 @@ def update_video_metadata(
     return None
 
 
+def iterate_video_metadata(
+    project_name: str,
+    video_metadata_file: str,
+    usecols: list = None,
+    chunksize: int = VIDEO_METADATA_CHUNK_SIZE,
+):
+    """
+    Iterates over the video metadata in chunks, with the dtypes of VIDEO_METADATA_DTYPES and only
+    the columns a stage needs.
+
+    When 'profile_id' is requested, profile ids missing from the file (e.g. videos stored before the
+    column existed) are extracted from 'authorMeta' one chunk at a time, so the large 'authorMeta'
+    strings are never held in memory for the whole file unless they are requested.
+
+    Args:
+        project_name (str): The project name used to locate the video metadata file.
+        video_metadata_file (str): The name of the video metadata file.
+        usecols (list, optional): The columns to load. Columns missing from the file are skipped. Defaults to every column.
+        chunksize (int, optional): The number of rows parsed at a time. Defaults to VIDEO_METADATA_CHUNK_SIZE.
+
+    Yields:
+        pd.DataFrame: A chunk of the video metadata.
+    """
+    video_metadata_path = f"{base_dir}/../data/{project_name}/{video_metadata_file}"
+    file_columns = pd.read_csv(video_metadata_path, nrows=0).columns.tolist()
+    columns = file_columns if usecols is None else usecols
+    derive_profile_id = "profile_id" in columns and "authorMeta" in file_columns
+    read_columns = [
+        column
+        for column in file_columns
+        if column in columns or (derive_profile_id and column == "authorMeta")
+    ]
+
+    for chunk in pd.read_csv(
+        video_metadata_path,
+        usecols=read_columns,
+        dtype={
+            column: dtype
+            for column, dtype in VIDEO_METADATA_DTYPES.items()
+            if column in read_columns
+        },
+        chunksize=chunksize,
+    ):
+        if derive_profile_id:
+            if "profile_id" not in chunk.columns:
+                chunk["profile_id"] = pd.Series(pd.NA, index=chunk.index, dtype="string")
+            missing_profile_ids = chunk["profile_id"].isnull()
+            if missing_profile_ids.any():
+                chunk.loc[missing_profile_ids, "profile_id"] = chunk.loc[
+                    missing_profile_ids, "authorMeta"
+                ].apply(extract_profile_id)
+            if "authorMeta" not in columns:
+                chunk = chunk.drop(columns=["authorMeta"])
+        yield chunk
+
+
+def load_video_metadata(
+    project_name: str,
+    video_metadata_file: str,
+    usecols: list = None,
+    chunksize: int = VIDEO_METADATA_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """
+    Loads video metadata with the dtypes of VIDEO_METADATA_DTYPES, reading only the columns a stage needs
+    (see iterate_video_metadata).
+
+    Args:
+        project_name (str): The project name used to locate the video metadata file.
+        video_metadata_file (str): The name of the video metadata file.
+        usecols (list, optional): The columns to load. Columns missing from the file are skipped. Defaults to every column.
+        chunksize (int, optional): The number of rows parsed at a time. Defaults to VIDEO_METADATA_CHUNK_SIZE.
+
+    Returns:
+        pd.DataFrame: The video metadata.
+    """
+    chunks = list(
+        iterate_video_metadata(project_name, video_metadata_file, usecols, chunksize)
+    )
+    if not chunks:
+        video_metadata_path = f"{base_dir}/../data/{project_name}/{video_metadata_file}"
+        file_columns = pd.read_csv(video_metadata_path, nrows=0).columns
+        return pd.DataFrame(
+            columns=[
+                column for column in file_columns if usecols is None or column in usecols
+            ]
+        )
+
+    # Align the categories of every chunk so that concatenation keeps the categorical dtype
+    for column in chunks[0].select_dtypes("category").columns:
+        categories = pd.api.types.union_categoricals(
+            [chunk[column] for chunk in chunks]
+        ).categories
+        for chunk in chunks:
+            chunk[column] = chunk[column].cat.set_categories(categories)
+
+    return pd.concat(chunks, ignore_index=True)
+
+
 def convert_str_to_dictionary(str_to_convert: str) -> dict:
     """
     Converts a string representation of a dictionary to an actual dictionary.
@@ -135,6 +302,7 @@ def convert_str_to_dictionary(str_to_convert: str) -> dict:
         return {"id": None}
 
 
+@instrument_stage
 def update_profile_metadata(
     project_name: str, profile_metadata_file: str, video_metadata_file: str
 ) -> None:
@@ -174,6 +342,8 @@ def update_profile_metadata(
         & (~profile_metadata["id"].isnull())
     ].reset_index(drop=True)
 
+    record_metric("rows", len(profile_metadata))
+
     # Save profile metadata locally, overwrite existing profile metadata if it exist
     profile_metadata_path = f"{base_dir}/../data/{project_name}/{profile_metadata_file}"
     profile_metadata.to_csv(profile_metadata_path, index=False)
@@ -217,9 +387,9 @@ def identify_top_influencers(
     return None
 
 
-def download_video(row: pd.Series, project_name: str) -> None:
+def download_video_file(row: pd.Series, project_name: str) -> None:
     """
-    Downloads a TikTok video using the provided information in the row.
+    Downloads a TikTok video using the provided information in the row, raising any download error.
 
     Args:
         row (pd.Series): A pandas Series containing the video information, including the 'webVideoUrl' and 'video_filename'.
@@ -236,90 +406,164 @@ def download_video(row: pd.Series, project_name: str) -> None:
         f"{base_dir}/../data/{project_name}/video-downloads/{row['video_filename']}"
     )
 
-    # Options for yt-dlp
-    ydl_opts = {
-        "outtmpl": output_file,  # Save the video with this file name
-        "format": "best",  # Download the best quality available
-    }
+    # Download the video, reusing the downloader of this worker
+    num_bytes = download_video_url(video_url, output_file)
+    if num_bytes:
+        record_metric("bytes_downloaded", num_bytes)
+
+    return None
+
+
+def download_video(row: pd.Series, project_name: str) -> None:
+    """
+    Downloads a TikTok video using the provided information in the row.
+
+    Args:
+        row (pd.Series): A pandas Series containing the video information, including the 'webVideoUrl' and 'video_filename'.
+        project_name (str): The project name used to construct the output file path.
 
-    # Download the video
+    Returns:
+        None
+    """
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([video_url])
+        download_video_file(row, project_name)
     except Exception as e:
-        print(f"An error occurred downloading {video_url}:", str(e))
+        record_metric("failures")
+        print(f"An error occurred downloading {row['webVideoUrl']}:", str(e))
 
 
-def optimize_audio_file(input_file_path: str, output_file_path: str) -> None:
+def extract_video_duration(row: pd.Series) -> float:
     """
-    Optimize an audio file by downsampling it to 16 kHz and converting it to mono.
+    Extracts the duration of a video from its video metadata.
 
     Args:
-        input_file_path (str): The path to the input audio file.
-        output_file_path (str): The path where the optimized audio file will be saved.
+        row (pd.Series): A pandas Series containing the video information, including the 'videoMeta' field.
 
     Returns:
-        None
+        float: The duration of the video in seconds, or 0.0 if it is unknown.
     """
-    # Load the audio file
-    audio = AudioSegment.from_file(input_file_path)
+    video_meta = row.get("videoMeta")
+    if isinstance(video_meta, str):
+        video_meta = convert_str_to_dictionary(video_meta)
+    if not isinstance(video_meta, dict):
+        return 0.0
 
-    # Downsample the audio to 16 kHz and convert to mono
-    audio = audio.set_frame_rate(16000).set_channels(1)
+    return float(pd.to_numeric(video_meta.get("duration"), errors="coerce") or 0.0)
 
-    # Export the optimized audio file
-    audio.export(output_file_path, format="wav")
 
+def prepare_audio_file(row: pd.Series, project_name: str) -> tuple:
+    """
+    Selects the audio of a downloaded video file to transcribe.
 
-def transcribe_videos(row: pd.Series, project_name: str) -> str:
+    If TRANSCRIPTION_VAD is enabled, a local voice activity pre-pass skips videos without speech
+    and trims the others to the audio from the first to the last speech frame (see
+    src/audio_processing.py).
+
+    Args:
+        row (pd.Series): A pandas Series containing information about the video file.
+                         It must include a 'video_filename' key with the name of the video file.
+        project_name (str): The name of the project, used to construct the file paths.
+
+    Returns:
+        tuple: The path to the audio file to transcribe (None if the video has no speech) and
+            its duration in seconds.
     """
-    Transcribes the audio from a video file using the OpenAI Whisper model.
+    input_file_path = (
+        f"{base_dir}/../data/{project_name}/video-downloads/{row['video_filename']}"
+    )
+    speech_file_path = f"{base_dir}/../data/{project_name}/video-downloads/speech_{row['video_filename'][:-4] + '.wav'}"
+
+    # Skip videos without speech and transcribe only the speech of the others
+    audio_seconds = extract_video_duration(row)
+    if TRANSCRIPTION_VAD:
+        speech_seconds = trim_to_speech(input_file_path, speech_file_path)
+        if speech_seconds == 0.0:
+            print(f"No speech detected in {row['video_filename']}, skipping transcription...")
+            return None, 0.0
+        elif speech_seconds is not None:
+            return speech_file_path, speech_seconds
+
+    return input_file_path, audio_seconds
+
+
+def transcribe_video_file(
+    row: pd.Series, project_name: str, transcription_backend: str = TRANSCRIPTION_BACKEND
+) -> str:
+    """
+    Transcribes the audio from a downloaded video file with a transcription backend (see
+    src/transcription_backends.py), raising any transcription error. Videos without speech are
+    transcribed as an empty string without calling the backend (see prepare_audio_file).
+
     Args:
         row (pd.Series): A pandas Series containing information about the video file.
                          It must include a 'video_filename' key with the name of the video file.
         project_name (str): The name of the project, used to construct the file paths.
+        transcription_backend (str, optional): The transcription backend. Defaults to TRANSCRIPTION_BACKEND.
+
     Returns:
-        str: The transcription of the audio if successful, otherwise None.
+        str: The transcription of the audio.
+
     Raises:
         FileNotFoundError: If the input video file is not found.
         Exception: For other errors encountered during transcription, including file size issues.
     """
-    input_file_path = (
+    audio_file_path, audio_seconds = prepare_audio_file(row, project_name)
+    if audio_file_path is None:
+        return ""
+
+    _, transcription = next(
+        get_transcription_backend(transcription_backend)([audio_file_path])
+    )
+    if isinstance(transcription, Exception):
+        raise transcription
+
+    record_metric("audio_seconds", audio_seconds)
+    return transcription
+
+
+def fingerprint_video_file(row: pd.Series, project_name: str) -> np.ndarray:
+    """
+    Computes the audio fingerprint of a downloaded video file.
+
+    Args:
+        row (pd.Series): A pandas Series containing information about the video file.
+                         It must include a 'video_filename' key with the name of the video file.
+        project_name (str): The name of the project, used to locate the video file.
+
+    Returns:
+        np.ndarray: The sub-fingerprints of the video's audio (see src/audio_processing.py).
+    """
+    return fingerprint_audio(
         f"{base_dir}/../data/{project_name}/video-downloads/{row['video_filename']}"
     )
-    optimized_file_path = f"{base_dir}/../data/{project_name}/video-downloads/optimized_{row['video_filename'][:-4] + '.wav'}"
 
+
+def transcribe_videos(row: pd.Series, project_name: str) -> str:
+    """
+    Transcribes the audio from a video file using the OpenAI Whisper model.
+    Args:
+        row (pd.Series): A pandas Series containing information about the video file.
+                         It must include a 'video_filename' key with the name of the video file.
+        project_name (str): The name of the project, used to construct the file paths.
+    Returns:
+        str: The transcription of the audio if successful, otherwise None.
+    """
     try:
-        with open(input_file_path, "rb") as audio_file:
-            transcription = openai_client.audio.transcriptions.create(
-                model="whisper-1", file=audio_file, response_format="text"
-            )
-        return transcription
+        return transcribe_video_file(row, project_name)
 
     except FileNotFoundError:
+        record_metric("failures")
         return None
 
     except Exception as e:
-        if e.status_code == 413:
+        record_metric("failures")
+        if getattr(e, "status_code", None) == 413:
             print(
-                f"Error: File {row['video_filename']} is too large to process. Optimizing the audio file..."
+                f"Error: File {row['video_filename']} is still too large after optimisation: {e}"
             )
-            # Optimize the audio file
-            optimize_audio_file(input_file_path, optimized_file_path)
-            try:
-                with open(optimized_file_path, "rb") as audio_file:
-                    transcription = openai_client.audio.transcriptions.create(
-                        model="whisper-1", file=audio_file, response_format="text"
-                    )
-                return transcription
-            except Exception as e:
-                print(
-                    f"Error: File {optimized_file_path} is still too large after optimisation: {e}"
-                )
-                return None
         else:
             print(f"Error encountered when transcribing {row['video_filename']}: {e}")
-            return None
+        return None
 
 
 def calculate_profile_engagement(num_likes: str, num_fans_videos: str) -> float:
@@ -631,6 +875,36 @@ def extract_stock_recommendations(
     return df
 
 
+def build_batch_task(
+    custom_id, gpt_model: str, system_prompt: str, user_prompt: str
+) -> dict:
+    """
+    Builds a chat completion task of a batch file.
+
+    Args:
+        custom_id: The id used to match the response to its prompt.
+        gpt_model (str): The GPT model.
+        system_prompt (str): The system prompt.
+        user_prompt (str): The user prompt.
+
+    Returns:
+        dict: The batch task.
+    """
+    return {
+        "custom_id": f"{custom_id}",
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": gpt_model,
+            "temperature": 0,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        },
+    }
+
+
 def create_batch_file(
     prompts: pd.DataFrame,
     project_name: str,
@@ -654,19 +928,12 @@ def create_batch_file(
     # Creating an array of json tasks
     tasks = []
     for i in range(len(prompts)):
-        task = {
-            "custom_id": f'{prompts.loc[i, "custom_id"]}',
-            "method": "POST",
-            "url": "/v1/chat/completions",
-            "body": {
-                "model": gpt_model,
-                "temperature": 0,
-                "messages": [
-                    {"role": "system", "content": prompts.loc[i, system_prompt_field]},
-                    {"role": "user", "content": prompts.loc[i, user_prompt_field]},
-                ],
-            },
-        }
+        task = build_batch_task(
+            custom_id=prompts.loc[i, "custom_id"],
+            gpt_model=gpt_model,
+            system_prompt=prompts.loc[i, system_prompt_field],
+            user_prompt=prompts.loc[i, user_prompt_field],
+        )
         tasks.append(task)
 
     # Creating batch file
@@ -679,32 +946,34 @@ def create_batch_file(
     return batch_file_name
 
 
-def batch_query(
-    project_name: str,
-    batch_input_file_dir: str,
-    batch_output_file_dir: str,
-) -> pd.DataFrame:
+def submit_batch(project_name: str, batch_input_file_name: str, output_file) -> None:
     """
-    Executes a batch query using the OpenAI API and processes the results into a pandas DataFrame.
+    Submits a batch input file to the OpenAI batch API, waits for it to end and streams its
+    results to the output file.
+
+    Batches that fail, expire or are cancelled are not raised: the results of the requests
+    that completed and the errors of the error file are saved, and the remaining requests are
+    resubmitted by batch_query.
 
     Args:
-        batch_input_file_dir (str): The directory path of the batch input file.
-        batch_output_file_dir (str): The directory path where the batch output file will be saved.
+        project_name (str): The project name used to locate the batch files.
+        batch_input_file_name (str): The name of the batch input file.
+        output_file (file): The binary file the batch output and errors are written to.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the processed results from the batch query.
+        None
     """
     # Upload batch input file
-    batch_file = openai_client.files.create(
+    batch_file = get_openai_client().files.create(
         file=open(
-            f"{base_dir}/../data/{project_name}/batch-files/{batch_input_file_dir}",
+            f"{base_dir}/../data/{project_name}/batch-files/{batch_input_file_name}",
             "rb",
         ),
         purpose="batch",
     )
 
     # Create batch job
-    batch_job = openai_client.batches.create(
+    batch_job = get_openai_client().batches.create(
         input_file_id=batch_file.id,
         endpoint="/v1/chat/completions",
         completion_window="24h",
@@ -712,44 +981,142 @@ def batch_query(
 
     # Check batch status
     while True:
-        batch_job = openai_client.batches.retrieve(batch_job.id)
+        batch_job = get_openai_client().batches.retrieve(batch_job.id)
         print(f"Batch job status: {batch_job.status}")
-        if batch_job.status == "completed":
+        if batch_job.status in ["completed", "failed", "expired", "cancelled"]:
             break
-        elif batch_job.status == "failed":
-            raise Exception("Batch job failed.")
         else:
             # Wait for 5 minutes before checking again
             time.sleep(300)
 
-    # Retrieve batch results
-    result_file_id = batch_job.output_file_id
-    results = openai_client.files.content(result_file_id).content
+    if batch_job.status != "completed":
+        print(f"Batch job {batch_job.status}, keeping the results of completed requests.")
 
-    # Save the batch output
-    with open(
-        f"{base_dir}/../data/{project_name}/batch-files/{batch_output_file_dir}", "wb"
-    ) as file:
-        file.write(results)
+    # Stream batch results and errors to disk
+    if batch_job.output_file_id:
+        download_batch_file(batch_job.output_file_id, output_file)
+    if batch_job.error_file_id:
+        download_batch_file(batch_job.error_file_id, output_file)
 
-    # Loading data from saved output file
-    response_list = []
-    with open(
-        f"{base_dir}/../data/{project_name}/batch-files/{batch_output_file_dir}", "r"
-    ) as file:
-        for line in file:
-            # Parsing the JSON result string into a dict
-            result = json.loads(line.strip())
-            response_list.append(
-                {
-                    "custom_id": f'{result["custom_id"]}',
-                    "query_response": result["response"]["body"]["choices"][0][
-                        "message"
-                    ]["content"],
-                }
-            )
+    return None
 
-    return pd.DataFrame(response_list)
+
+@instrument_stage
+def batch_query(
+    project_name: str,
+    batch_input_file_dir: str,
+    batch_output_file_dir: str,
+    max_resubmissions: int = BATCH_MAX_RESUBMISSIONS,
+) -> dict:
+    """
+    Executes a batch query using the OpenAI API and indexes the responses by custom ID.
+
+    The cost of the batch is estimated before submission, and batches above the budget are
+    refused or split into shards that are submitted one after the other (see src/batch_estimator.py).
+    The batch output is streamed to disk and parsed one line at a time, so that large outputs
+    are never held in memory in full (see src/batch_results.py).
+
+    Requests that failed or are missing from the output (e.g. because the batch expired) are
+    resubmitted until every request has a response: as a follow-up batch, or through the
+    real-time API once at most BATCH_REALTIME_RESUBMISSION_MAX requests remain.
+
+    Args:
+        batch_input_file_dir (str): The directory path of the batch input file.
+        batch_output_file_dir (str): The directory path where the batch output file will be saved.
+        max_resubmissions (int, optional): The maximum number of resubmissions. Defaults to BATCH_MAX_RESUBMISSIONS.
+
+    Returns:
+        dict: The response content of every successful request, keyed by custom ID (as a string).
+    """
+    batch_file_dir = f"{base_dir}/../data/{project_name}/batch-files"
+    batch_output_path = f"{batch_file_dir}/{batch_output_file_dir}"
+    with open(f"{batch_file_dir}/{batch_input_file_dir}", "rb") as file:
+        custom_ids = {str(json.loads(line)["custom_id"]) for line in file}
+
+    # Estimate the cost of the batch and shard it if it is above the budget
+    batch_input_file_names = plan_batch_submission(
+        project_name=project_name,
+        batch_input_file_name=batch_input_file_dir,
+        batch_output_file_name=batch_output_file_dir,
+    )
+
+    # Save the batch output of every shard
+    with open(batch_output_path, "wb") as file:
+        for batch_input_file_name in batch_input_file_names:
+            submit_batch(project_name, batch_input_file_name, file)
+
+    # Resubmit the failed and missing requests, appending their results to the output file
+    for resubmission in range(1, max_resubmissions + 1):
+        llm_responses, _ = read_batch_results(batch_output_path, record_usage=False)
+        pending_custom_ids = custom_ids - llm_responses.keys()
+        if not pending_custom_ids:
+            break
+
+        resubmission_file_name = f"{os.path.splitext(batch_input_file_dir)[0]}_resubmission{resubmission}.jsonl"
+        write_resubmission_file(
+            f"{batch_file_dir}/{batch_input_file_dir}",
+            f"{batch_file_dir}/{resubmission_file_name}",
+            pending_custom_ids,
+        )
+        with open(batch_output_path, "ab") as file:
+            if len(pending_custom_ids) <= BATCH_REALTIME_RESUBMISSION_MAX:
+                print(
+                    f"Resubmitting {len(pending_custom_ids)} failed or missing requests using the real-time API..."
+                )
+                query_batch_file_realtime(
+                    f"{batch_file_dir}/{resubmission_file_name}", file
+                )
+            else:
+                print(
+                    f"Resubmitting {len(pending_custom_ids)} failed or missing requests as a follow-up batch..."
+                )
+                for batch_input_file_name in plan_batch_submission(
+                    project_name=project_name,
+                    batch_input_file_name=resubmission_file_name,
+                    batch_output_file_name=batch_output_file_dir,
+                ):
+                    submit_batch(project_name, batch_input_file_name, file)
+
+    # Index the responses of the saved output file by custom ID
+    llm_responses, errors = read_batch_results(batch_output_path)
+    missing_custom_ids = custom_ids - llm_responses.keys()
+    if missing_custom_ids:
+        record_metric("failures", len(missing_custom_ids))
+        example_error = next(
+            (errors[custom_id] for custom_id in missing_custom_ids if custom_id in errors),
+            "no result",
+        )
+        print(
+            f"{len(missing_custom_ids)} batch requests have no response after {max_resubmissions} resubmissions, e.g. {example_error}"
+        )
+
+    return llm_responses
+
+
+def merge_batch_responses(
+    profile_metadata: pd.DataFrame, llm_responses: dict, llm_response_field: str
+) -> pd.DataFrame:
+    """
+    Joins batch responses to the rows they were requested for through the response index,
+    keeping only the rows that received a response.
+
+    Args:
+        profile_metadata (pd.DataFrame): The rows of the batch, with a 'custom_id' column.
+        llm_responses (dict): The response contents keyed by custom ID (as returned by batch_query).
+        llm_response_field (str): The column the responses are stored in.
+
+    Returns:
+        pd.DataFrame: The rows with a response, in their original order.
+    """
+    custom_ids = profile_metadata["custom_id"].astype(str)
+    profile_metadata_with_responses = profile_metadata[
+        custom_ids.isin(llm_responses.keys())
+    ].copy()
+    profile_metadata_with_responses[llm_response_field] = custom_ids[
+        profile_metadata_with_responses.index
+    ].map(llm_responses)
+
+    return profile_metadata_with_responses
 
 
 def extract_profile_id(author_metadata: str) -> str:
@@ -856,6 +1223,35 @@ def calculate_video_engagement(video_data: pd.Series) -> float:
     return video_engagement
 
 
+def format_video_transcript(video: pd.Series) -> str:
+    """
+    Formats the metadata and transcript of a single video using the video transcript template.
+
+    Args:
+        video (pd.Series): A pandas Series containing the video metadata, including 'createTimeISO' and 'video_transcript'.
+
+    Returns:
+        str: The formatted video transcript.
+    """
+    return video_transcript_template.format(
+        video_creation_date=video["createTimeISO"],
+        video_text=(
+            video["text"].replace("\n", " ") if not pd.isnull(video["text"]) else ""
+        ),
+        num_likes=video["diggCount"],
+        num_shares=video["shareCount"],
+        view_count=video["playCount"],
+        num_saves=video["collectCount"],
+        num_comments=video["commentCount"],
+        total_engagement_over_num_views=calculate_video_engagement(video),
+        mentions=extract_mentions(video["detailedMentions"]),
+        hashtags=extract_hashtags(video["hashtags"]),
+        is_sponsored=video["isSponsored"],
+        is_advertisement=video["isAd"],
+        video_transcript=video["video_transcript"],
+    )
+
+
 def extract_video_transcripts(profile_id, video_metadata) -> str:
     """
     Extracts and combines video transcripts for a given profile ID from the provided video metadata.
@@ -878,35 +1274,120 @@ def extract_video_transcripts(profile_id, video_metadata) -> str:
     # Join the list of video transcripts into a single string, separated by newlines
     video_transcripts_combined = ""
     for i in range(len(filtered_videos)):
-        video_transcripts_combined += video_transcript_template.format(
-            video_creation_date=filtered_videos.loc[i, "createTimeISO"],
-            video_text=(
-                filtered_videos.loc[i, "text"].replace("\n", " ")
-                if not pd.isnull(filtered_videos.loc[i, "text"])
-                else ""
-            ),
-            num_likes=filtered_videos.loc[i, "diggCount"],
-            num_shares=filtered_videos.loc[i, "shareCount"],
-            view_count=filtered_videos.loc[i, "playCount"],
-            num_saves=filtered_videos.loc[i, "collectCount"],
-            num_comments=filtered_videos.loc[i, "commentCount"],
-            total_engagement_over_num_views=calculate_video_engagement(
-                filtered_videos.loc[i, :]
-            ),
-            mentions=extract_mentions(filtered_videos.loc[i, "detailedMentions"]),
-            hashtags=extract_hashtags(filtered_videos.loc[i, "hashtags"]),
-            is_sponsored=filtered_videos.loc[i, "isSponsored"],
-            is_advertisement=filtered_videos.loc[i, "isAd"],
-            video_transcript=filtered_videos.loc[i, "video_transcript"],
-        )
+        video_transcripts_combined += format_video_transcript(filtered_videos.loc[i, :])
 
     return video_transcripts_combined
 
 
+def select_latest_videos(video_metadata: pd.DataFrame, latest_n: int = None) -> pd.DataFrame:
+    """
+    Sorts videos by creation time from latest to oldest and keeps the latest videos of each profile.
+
+    Args:
+        video_metadata (pd.DataFrame): A DataFrame containing video metadata, including 'profile_id' and 'createTimeISO' columns.
+        latest_n (int, optional): The number of latest videos kept per profile. Defaults to every video.
+
+    Returns:
+        pd.DataFrame: The latest videos, sorted from latest to oldest.
+    """
+    # Sort videos by creation time from latest to oldest (stable, so ties keep their original order)
+    sorted_videos = video_metadata.sort_values(
+        by="createTimeISO", ascending=False, kind="stable"
+    )
+    if latest_n is None:
+        return sorted_videos
+
+    return sorted_videos.groupby(
+        sorted_videos["profile_id"].astype(str), sort=False
+    ).head(latest_n)
+
+
+def extract_video_transcripts_grouped(
+    video_metadata: pd.DataFrame, latest_n: int = PROMPT_VIDEOS_PER_PROFILE
+) -> pd.Series:
+    """
+    Extracts and combines the video transcripts of every profile in a single pass over the video metadata.
+
+    This produces the same combined transcripts as calling extract_video_transcripts for each profile,
+    without rescanning the whole video metadata once per profile.
+
+    Args:
+        video_metadata (pd.DataFrame): A DataFrame containing video metadata, including 'profile_id', 'createTimeISO', and 'video_transcript' columns.
+        latest_n (int, optional): The number of latest videos combined per profile. Defaults to PROMPT_VIDEOS_PER_PROFILE.
+
+    Returns:
+        pd.Series: The combined video transcripts (latest to oldest), indexed by profile ID.
+    """
+    if len(video_metadata) == 0:
+        return pd.Series(dtype=str)
+
+    sorted_videos = select_latest_videos(video_metadata, latest_n)
+
+    formatted_transcripts = sorted_videos.apply(format_video_transcript, axis=1)
+
+    return formatted_transcripts.groupby(
+        sorted_videos["profile_id"].astype(str), sort=False
+    ).agg("".join)
+
+
+def refresh_video_store(project_name: str, video_metadata_file: str) -> list:
+    """
+    Builds the profile-partitioned video store of a video metadata file, unless it is already up to date.
+
+    Args:
+        project_name (str): The project name used to locate the video metadata file.
+        video_metadata_file (str): The name of the video metadata file.
+
+    Returns:
+        list: The buckets of the video store that contain videos.
+    """
+    return build_video_store(
+        project_name,
+        video_metadata_file,
+        iterate_video_metadata(
+            project_name, video_metadata_file, usecols=VIDEO_STORE_COLUMNS
+        ),
+    )
+
+
+def construct_profile_prompt(row: pd.Series) -> str:
+    """
+    Constructs the profile prompt of a profile from its metadata and combined video transcripts.
+
+    Args:
+        row (pd.Series): A pandas Series containing the profile metadata and a 'transcripts_combined' field.
+
+    Returns:
+        str: The formatted profile prompt.
+    """
+    return profile_prompt_template.format(
+        profile_image=row["avatar"],
+        profile_name=row["profile"],
+        profile_nickname=row["nickName"],
+        verified_status=row["verified"],
+        private_account=row["privateAccount"],
+        region=row["region"],
+        tiktok_seller=row["ttSeller"],
+        profile_signature=row["signature"],
+        num_followers=row["fans"],
+        num_following=row["following"],
+        num_likes=row["heart"],
+        num_videos=row["video"],
+        num_digg=row["digg"],
+        total_likes_over_num_followers=calculate_profile_engagement(
+            row["heart"], row["fans"]
+        ),
+        total_likes_over_num_videos=calculate_profile_engagement(
+            row["heart"], row["video"]
+        ),
+        video_transcripts=row["transcripts_combined"],
+    )
+
+
 def row_query(row: pd.Series, args: list) -> str:
     system_prompt = row[args[0]]
     user_prompt = row[args[1]]
-    gpt_model = row[args[2]]
+    gpt_model = args[2]
 
     # Skip if system_prompt/user_prompt is empty or NaN (depending on your logic)
     if not isinstance(system_prompt, str) or not isinstance(user_prompt, str):
@@ -914,7 +1395,7 @@ def row_query(row: pd.Series, args: list) -> str:
 
     # Make a chat completion request
     try:
-        response = openai_client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model=gpt_model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -922,16 +1403,156 @@ def row_query(row: pd.Series, args: list) -> str:
             ],
             temperature=0,
         )
+        if getattr(response, "usage", None) is not None:
+            record_metric("prompt_tokens", response.usage.prompt_tokens)
+            record_metric("completion_tokens", response.usage.completion_tokens)
 
         # Extract the assistant's response
         return response.choices[0].message.content
 
     except Exception as e:
         # Handle errors (rate limits, etc.)
+        record_metric("failures")
         print(f"Error processing row: {e}")
         return "Error or Timeout"
 
 
+def compute_prompt_fingerprint(
+    row: pd.Series,
+    video_ids: str,
+    system_prompt_field: str,
+    user_prompt_field: str,
+    gpt_model: str,
+) -> str:
+    """
+    Computes a fingerprint of everything that determines a profile's LLM response.
+
+    The system prompt already embeds the profile fields and the text and transcript of every
+    video, so hashing it together with the video ids, the user prompt and the model identifies
+    profiles whose response would change if they were interviewed again.
+
+    Args:
+        row (pd.Series): A pandas Series containing the profile's system and user prompts.
+        video_ids (str): A comma-separated string of the profile's video ids.
+        system_prompt_field (str): The field containing the system prompt.
+        user_prompt_field (str): The field containing the user prompt.
+        gpt_model (str): The GPT model used for the interview.
+
+    Returns:
+        str: The hex digest of the prompt fingerprint.
+    """
+    digest = hashlib.sha256()
+    for value in [
+        gpt_model,
+        video_ids,
+        row[system_prompt_field],
+        row[user_prompt_field],
+    ]:
+        digest.update(str(value).encode())
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def load_previous_responses(
+    previous_output_path: str, llm_response_field: str, fingerprint_field: str
+) -> dict:
+    """
+    Loads the valid LLM responses of a previous interview run keyed by profile and prompt fingerprint.
+
+    Args:
+        previous_output_path (str): The path to the output file of the previous interview run.
+        llm_response_field (str): The field containing the LLM response.
+        fingerprint_field (str): The field containing the prompt fingerprint.
+
+    Returns:
+        dict: A mapping from (profile ID, prompt fingerprint) to the previous LLM response.
+    """
+    if not os.path.exists(previous_output_path):
+        return {}
+
+    previous_output = pd.read_csv(
+        previous_output_path,
+        usecols=lambda column: column
+        in ["id", llm_response_field, fingerprint_field],
+    )
+    if not {llm_response_field, fingerprint_field} <= set(previous_output.columns):
+        return {}
+
+    # Only carry over valid responses
+    previous_output = previous_output[
+        previous_output[llm_response_field].notnull()
+        & (previous_output[llm_response_field] != "Error or Timeout")
+    ].copy()
+    previous_output["id"] = previous_output["id"].astype(str)
+
+    return dict(
+        zip(
+            zip(previous_output["id"], previous_output[fingerprint_field]),
+            previous_output[llm_response_field],
+        )
+    )
+
+
+def match_previous_responses(
+    profile_metadata: pd.DataFrame, previous_responses: dict, fingerprint_field: str
+) -> pd.Series:
+    """
+    Matches profiles to the previous LLM responses of the same profile and prompt fingerprint.
+
+    Args:
+        profile_metadata (pd.DataFrame): The profiles to interview, including their prompt fingerprints.
+        previous_responses (dict): A mapping from (profile ID, prompt fingerprint) to the previous LLM response.
+        fingerprint_field (str): The field containing the prompt fingerprint.
+
+    Returns:
+        pd.Series: The previous response of every profile, or NaN for new or changed profiles.
+    """
+    return pd.Series(
+        zip(profile_metadata["id"], profile_metadata[fingerprint_field]),
+        index=profile_metadata.index,
+        dtype=object,
+    ).map(previous_responses)
+
+
+def split_changed_profiles(
+    profile_metadata: pd.DataFrame,
+    previous_output_path: str,
+    llm_response_field: str,
+    fingerprint_field: str,
+) -> tuple:
+    """
+    Splits profiles into those whose prompt fingerprint matches a response in the previous
+    output file and those that are new or have changed since.
+
+    Args:
+        profile_metadata (pd.DataFrame): The profiles to interview, including their prompt fingerprints.
+        previous_output_path (str): The path to the output file of the previous interview run.
+        llm_response_field (str): The field containing the LLM response.
+        fingerprint_field (str): The field containing the prompt fingerprint.
+
+    Returns:
+        tuple: A DataFrame of unchanged profiles with their previous responses carried over,
+            and a DataFrame of new or changed profiles that need to be interviewed.
+    """
+    previous_responses = load_previous_responses(
+        previous_output_path, llm_response_field, fingerprint_field
+    )
+    if not previous_responses:
+        return profile_metadata.iloc[0:0], profile_metadata
+
+    carried_over_responses = match_previous_responses(
+        profile_metadata, previous_responses, fingerprint_field
+    )
+    unchanged = carried_over_responses.notnull()
+
+    unchanged_profiles = profile_metadata[unchanged].copy()
+    unchanged_profiles[llm_response_field] = carried_over_responses[unchanged]
+
+    return unchanged_profiles, profile_metadata[~unchanged]
+
+
+@instrument_stage
 def perform_profile_interview(
     project_name: str,
     gpt_model: str,
@@ -943,30 +1564,56 @@ def perform_profile_interview(
     llm_response_field: str,
     interview_type: str,
     batch_interview: bool = True,
+    batch_file_prefix: str = "batch",
+    incremental: bool = False,
+    chunk_size: int = None,
+    videos_per_profile: int = PROMPT_VIDEOS_PER_PROFILE,
 ) -> None:
+    if chunk_size:
+        return perform_profile_interview_chunked(
+            project_name=project_name,
+            gpt_model=gpt_model,
+            profile_metadata_file=profile_metadata_file,
+            video_metadata_file=video_metadata_file,
+            output_file=output_file,
+            system_prompt_field=system_prompt_field,
+            user_prompt_field=user_prompt_field,
+            llm_response_field=llm_response_field,
+            interview_type=interview_type,
+            batch_interview=batch_interview,
+            batch_file_prefix=batch_file_prefix,
+            incremental=incremental,
+            chunk_size=chunk_size,
+            videos_per_profile=videos_per_profile,
+        )
 
     # Load profile and video metadata
     print("Loading profile and video metadata...")
     profile_metadata = pd.read_csv(
         f"{base_dir}/../data/{project_name}/{profile_metadata_file}"
     )
-    video_metadata = pd.read_csv(
-        f"{base_dir}/../data/{project_name}/{video_metadata_file}"
+    video_metadata = load_video_metadata(
+        project_name, video_metadata_file, usecols=PROMPT_VIDEO_COLUMNS
     )
     video_metadata["createTimeISO"] = pd.to_datetime(video_metadata["createTimeISO"])
 
     # Preprocess profile and video metadata
     print("Preprocess profile and video metadata...")
-    video_metadata["profile_id"] = video_metadata["authorMeta"].apply(
-        extract_profile_id
-    )
     video_metadata["profile_id"] = video_metadata["profile_id"].astype(str)
     profile_metadata["id"] = profile_metadata["id"].astype(str)
 
+    # Drop responses from a previous interview of the same type (e.g. when the input and output file are the same)
+    fingerprint_field = f"{llm_response_field}_fingerprint"
+    profile_metadata = profile_metadata.drop(
+        columns=[llm_response_field, fingerprint_field], errors="ignore"
+    )
+
     # Generate system and user prompts
     print("Generate system and user prompts...")
-    profile_metadata["transcripts_combined"] = profile_metadata["id"].apply(
-        extract_video_transcripts, args=(video_metadata,)
+    video_metadata = select_latest_videos(video_metadata, videos_per_profile)
+    video_transcripts = extract_video_transcripts_grouped(video_metadata, latest_n=None)
+    profile_metadata["transcripts_combined"] = (
+        profile_metadata["id"].map(video_transcripts).fillna("")
     )
 
     profile_metadata[system_prompt_field] = profile_metadata.apply(
@@ -976,50 +1623,76 @@ def perform_profile_interview(
         construct_user_prompt, args=(interview_type,), axis=1
     )
 
+    # Fingerprint the prompts so that later runs can skip unchanged profiles
+    video_ids = (
+        video_metadata[["profile_id", "id"]]
+        .astype({"id": str})
+        .sort_values(by="id")
+        .groupby("profile_id")["id"]
+        .agg(",".join)
+    )
+    profile_metadata[fingerprint_field] = profile_metadata.apply(
+        lambda row: compute_prompt_fingerprint(
+            row,
+            video_ids=video_ids.get(row["id"], ""),
+            system_prompt_field=system_prompt_field,
+            user_prompt_field=user_prompt_field,
+            gpt_model=gpt_model,
+        ),
+        axis=1,
+    )
+
     if batch_interview:
         # Generate custom ids
         if "custom_id" not in profile_metadata.columns:
             profile_metadata = profile_metadata.reset_index(drop=False)
             profile_metadata.rename(columns={"index": "custom_id"}, inplace=True)
+        profile_metadata["custom_id"] = profile_metadata["custom_id"].astype("int64")
+
+    if incremental:
+        print("Identifying new or changed profiles since the previous interview...")
+        unchanged_profiles, profile_metadata = split_changed_profiles(
+            profile_metadata,
+            previous_output_path=f"{base_dir}/../data/{project_name}/{output_file}",
+            llm_response_field=llm_response_field,
+            fingerprint_field=fingerprint_field,
+        )
+        print(
+            f"{len(profile_metadata)} new or changed profiles, {len(unchanged_profiles)} unchanged profiles carried over."
+        )
+
+    record_metric("rows", len(profile_metadata))
+    if len(profile_metadata) == 0:
+        profile_metadata_with_responses = profile_metadata.assign(
+            **{llm_response_field: None}
+        )
 
+    elif batch_interview:
         # Create folder to contain batch files
         batch_file_dir = f"{base_dir}/../data/{project_name}/batch-files"
         os.makedirs(batch_file_dir, exist_ok=True)
 
         # Perform batch query for survey questions
         batch_file_dir = create_batch_file(
-            profile_metadata,
+            profile_metadata.reset_index(drop=True),
             project_name=project_name,
             gpt_model=gpt_model,
             system_prompt_field=system_prompt_field,
             user_prompt_field=user_prompt_field,
-            batch_file_name="batch_input.jsonl",
+            batch_file_name=f"{batch_file_prefix}_input.jsonl",
         )
 
         print("Perform batch query using OpenAI API...")
         llm_responses = batch_query(
             project_name=project_name,
-            batch_input_file_dir="batch_input.jsonl",
-            batch_output_file_dir="batch_output.jsonl",
-        )
-        llm_responses.rename(
-            columns={"query_response": llm_response_field}, inplace=True
+            batch_input_file_dir=f"{batch_file_prefix}_input.jsonl",
+            batch_output_file_dir=f"{batch_file_prefix}_output.jsonl",
         )
 
         # Merge LLM response with original dataset
         print("Merge LLM response with original dataset...")
-        profile_metadata["custom_id"] = profile_metadata["custom_id"].astype("int64")
-        llm_responses["custom_id"] = llm_responses["custom_id"].astype("int64")
-        profile_metadata_with_responses = pd.merge(
-            left=profile_metadata,
-            right=llm_responses[["custom_id", llm_response_field]],
-            on="custom_id",
-        )
-
-        # Save profile metadata after analysis into CSV file
-        print("Saving profile metadata with analysis...")
-        profile_metadata_with_responses.to_csv(
-            f"{base_dir}/../data/{project_name}/{output_file}", index=False
+        profile_metadata_with_responses = merge_batch_responses(
+            profile_metadata, llm_responses, llm_response_field
         )
 
     else:
@@ -1029,14 +1702,29 @@ def perform_profile_interview(
             args=([system_prompt_field, user_prompt_field, gpt_model],),
             axis=1,
         )
+        profile_metadata_with_responses = profile_metadata
 
-        # Save profile metadata after analysis into CSV file
-        print("Saving profile metadata with analysis...")
-        profile_metadata.to_csv(
-            f"{base_dir}/../data/{project_name}/{output_file}", index=False
+    if incremental:
+        # Merge newly interviewed profiles with unchanged profiles, keeping the original profile order
+        print("Merge newly interviewed profiles with unchanged profiles...")
+        profile_metadata_with_responses = pd.concat(
+            [unchanged_profiles, profile_metadata_with_responses]
         )
+        if batch_interview:
+            profile_metadata_with_responses = (
+                profile_metadata_with_responses.sort_values(by="custom_id")
+            )
+        else:
+            profile_metadata_with_responses = profile_metadata_with_responses.sort_index()
+
+    # Save profile metadata after analysis into CSV file
+    print("Saving profile metadata with analysis...")
+    profile_metadata_with_responses.to_csv(
+        f"{base_dir}/../data/{project_name}/{output_file}", index=False
+    )
 
 
+@instrument_stage
 def perform_profile_interview_shorten(
     project_name: str,
     gpt_model: str,
@@ -1047,12 +1735,14 @@ def perform_profile_interview_shorten(
     llm_response_field: str,
     interview_type: str,
     batch_interview: bool = True,
+    batch_file_prefix: str = "batch",
 ) -> None:
 
     print("Loading profile metadata...")
     profile_metadata = pd.read_csv(
         f"{base_dir}/../data/{project_name}/{profile_metadata_input_file}"
     )
+    record_metric("rows", len(profile_metadata))
 
     print("Generate system and user prompts...")
     profile_metadata[system_prompt_field] = profile_metadata.apply(
@@ -1079,27 +1769,20 @@ def perform_profile_interview_shorten(
             gpt_model=gpt_model,
             system_prompt_field=system_prompt_field,
             user_prompt_field=user_prompt_field,
-            batch_file_name="batch_input.jsonl",
+            batch_file_name=f"{batch_file_prefix}_input.jsonl",
         )
 
         print("Perform batch query using OpenAI API...")
         llm_responses = batch_query(
             project_name=project_name,
-            batch_input_file_dir="batch_input.jsonl",
-            batch_output_file_dir="batch_output.jsonl",
-        )
-        llm_responses.rename(
-            columns={"query_response": llm_response_field}, inplace=True
+            batch_input_file_dir=f"{batch_file_prefix}_input.jsonl",
+            batch_output_file_dir=f"{batch_file_prefix}_output.jsonl",
         )
 
         # Merge LLM response with original dataset
         print("Merge LLM response with original dataset...")
-        profile_metadata["custom_id"] = profile_metadata["custom_id"].astype("int64")
-        llm_responses["custom_id"] = llm_responses["custom_id"].astype("int64")
-        profile_metadata_with_responses = pd.merge(
-            left=profile_metadata,
-            right=llm_responses[["custom_id", llm_response_field]],
-            on="custom_id",
+        profile_metadata_with_responses = merge_batch_responses(
+            profile_metadata, llm_responses, llm_response_field
         )
 
         # Save profile metadata after analysis into CSV file
@@ -1125,63 +1808,55 @@ def perform_profile_interview_shorten(
         )
 
 
+@instrument_stage
 def build_profile_prompt(
     project_name: str,
     profile_metadata_input_file: str,
     profile_metadata_output_file: str,
     video_metadata_file: str,
+    chunk_size: int = None,
+    videos_per_profile: int = PROMPT_VIDEOS_PER_PROFILE,
 ) -> None:
+    if chunk_size:
+        return build_profile_prompt_chunked(
+            project_name=project_name,
+            profile_metadata_input_file=profile_metadata_input_file,
+            profile_metadata_output_file=profile_metadata_output_file,
+            video_metadata_file=video_metadata_file,
+            chunk_size=chunk_size,
+            videos_per_profile=videos_per_profile,
+        )
+
     # Load profile and video metadata
     print("Loading profile and video metadata...")
     profile_metadata = pd.read_csv(
         f"{base_dir}/../data/{project_name}/{profile_metadata_input_file}"
     )
-    video_metadata = pd.read_csv(
-        f"{base_dir}/../data/{project_name}/{video_metadata_file}"
+    video_metadata = load_video_metadata(
+        project_name, video_metadata_file, usecols=PROMPT_VIDEO_COLUMNS
     )
     video_metadata["createTimeISO"] = pd.to_datetime(video_metadata["createTimeISO"])
 
     # Preprocess profile and video metadata
     print("Preprocess profile and video metadata...")
-    video_metadata["profile_id"] = video_metadata["authorMeta"].apply(
-        extract_profile_id
-    )
     video_metadata["profile_id"] = video_metadata["profile_id"].astype(str)
     profile_metadata["id"] = profile_metadata["id"].astype(str)
 
     # Construct past transcripts
     print("Construct past transcripts...")
-    profile_metadata["transcripts_combined"] = profile_metadata["id"].apply(
-        extract_video_transcripts, args=(video_metadata,)
+    video_transcripts = extract_video_transcripts_grouped(
+        video_metadata, latest_n=videos_per_profile
+    )
+    profile_metadata["transcripts_combined"] = (
+        profile_metadata["id"].map(video_transcripts).fillna("")
     )
 
     # Construct profile prompt
     print("Construct profile prompt...")
     profile_metadata["profile_prompt"] = profile_metadata.apply(
-        lambda row: profile_prompt_template.format(
-            profile_image=row["avatar"],
-            profile_name=row["profile"],
-            profile_nickname=row["nickName"],
-            verified_status=row["verified"],
-            private_account=row["privateAccount"],
-            region=row["region"],
-            tiktok_seller=row["ttSeller"],
-            profile_signature=row["signature"],
-            num_followers=row["fans"],
-            num_following=row["following"],
-            num_likes=row["heart"],
-            num_videos=row["video"],
-            num_digg=row["digg"],
-            total_likes_over_num_followers=calculate_profile_engagement(
-                row["heart"], row["fans"]
-            ),
-            total_likes_over_num_videos=calculate_profile_engagement(
-                row["heart"], row["video"]
-            ),
-            video_transcripts=row["transcripts_combined"],
-        ),
-        axis=1,
+        construct_profile_prompt, axis=1
     )
+    record_metric("rows", len(profile_metadata))
 
     # Save updated profile metadata
     profile_metadata.to_csv(
@@ -1189,3 +1864,327 @@ def build_profile_prompt(
     )
 
     return None
+
+
+def build_bucket_transcripts(
+    project_name: str,
+    video_metadata_file: str,
+    bucket: int,
+    videos_per_profile: int = PROMPT_VIDEOS_PER_PROFILE,
+) -> tuple:
+    """
+    Combines the video transcripts and video ids of every profile in a bucket of the video store.
+
+    Args:
+        project_name (str): The project name used to locate the video store.
+        video_metadata_file (str): The name of the video metadata file the store was built from.
+        bucket (int): The bucket of the video store.
+        videos_per_profile (int, optional): The number of latest videos combined per profile. Defaults to PROMPT_VIDEOS_PER_PROFILE.
+
+    Returns:
+        tuple: The combined video transcripts and the comma-separated sorted video ids, both indexed by profile ID.
+    """
+    bucket_videos = load_video_store_bucket(project_name, video_metadata_file, bucket)
+    if len(bucket_videos) == 0:
+        return pd.Series(dtype=str), pd.Series(dtype=str)
+
+    bucket_videos["createTimeISO"] = pd.to_datetime(bucket_videos["createTimeISO"])
+    bucket_videos["profile_id"] = bucket_videos["profile_id"].astype(str)
+
+    bucket_videos = select_latest_videos(bucket_videos, videos_per_profile)
+    video_transcripts = extract_video_transcripts_grouped(bucket_videos, latest_n=None)
+    video_ids = (
+        bucket_videos[["profile_id", "id"]]
+        .astype({"id": str})
+        .sort_values(by="id")
+        .groupby("profile_id")["id"]
+        .agg(",".join)
+    )
+
+    return video_transcripts, video_ids
+
+
+def partition_profiles(
+    project_name: str,
+    profile_metadata_file: str,
+    chunk_size: int,
+    drop_columns: list = [],
+    add_custom_id: bool = False,
+) -> tuple:
+    """
+    Streams the profile metadata into profile hash buckets matching the buckets of the video store.
+
+    Args:
+        project_name (str): The project name used to locate the profile metadata.
+        profile_metadata_file (str): The name of the profile metadata file.
+        chunk_size (int): The number of profiles read at a time.
+        drop_columns (list, optional): Columns dropped from the profile metadata. Defaults to [].
+        add_custom_id (bool, optional): Whether to add the row number of each profile as its 'custom_id'
+            when the profile metadata has none. Defaults to False.
+
+    Returns:
+        tuple: The folder containing the profile partitions, private to the caller who removes it
+            once done, and the list of buckets with profiles.
+    """
+    profile_partition_dir = tempfile.mkdtemp(
+        prefix="profile-partitions-", dir=f"{base_dir}/../data/{project_name}"
+    )
+
+    def profile_chunks():
+        for chunk in pd.read_csv(
+            f"{base_dir}/../data/{project_name}/{profile_metadata_file}",
+            dtype={"id": str},
+            chunksize=chunk_size,
+        ):
+            chunk = chunk.drop(columns=drop_columns, errors="ignore")
+            if add_custom_id and "custom_id" not in chunk.columns:
+                chunk.insert(0, "custom_id", chunk.index)
+            yield chunk
+
+    try:
+        buckets = partition_by_profile(
+            profile_chunks(), profile_partition_dir, id_column="id"
+        )
+    except Exception:
+        shutil.rmtree(profile_partition_dir, ignore_errors=True)
+        raise
+
+    return profile_partition_dir, buckets
+
+
+def perform_profile_interview_chunked(
+    project_name: str,
+    gpt_model: str,
+    profile_metadata_file: str,
+    video_metadata_file: str,
+    output_file: str,
+    system_prompt_field: str,
+    user_prompt_field: str,
+    llm_response_field: str,
+    interview_type: str,
+    chunk_size: int,
+    batch_interview: bool = True,
+    batch_file_prefix: str = "batch",
+    incremental: bool = False,
+    videos_per_profile: int = PROMPT_VIDEOS_PER_PROFILE,
+) -> None:
+    """
+    Interviews profiles like perform_profile_interview while holding only one bucket of the video
+    store and one chunk of profiles in memory at a time.
+
+    The prompts of each chunk of profiles are built from the videos of their bucket, their batch
+    tasks are appended to the batch input file and the profiles are staged on disk. The LLM
+    responses are then merged into the staged profiles while streaming them to the output file,
+    so the profiles in the output file are ordered by bucket.
+
+    Args:
+        chunk_size (int): The maximum number of profiles held in memory at a time.
+        videos_per_profile (int, optional): The number of latest videos embedded per profile.
+            Defaults to PROMPT_VIDEOS_PER_PROFILE.
+
+    Returns:
+        None
+    """
+    data_dir = f"{base_dir}/../data/{project_name}"
+    fingerprint_field = f"{llm_response_field}_fingerprint"
+    staging_path = f"{data_dir}/{output_file}.staging"
+    batch_input_file_name = f"{batch_file_prefix}_input.jsonl"
+    os.makedirs(f"{data_dir}/batch-files", exist_ok=True)
+
+    print("Building profile-partitioned video store...")
+    refresh_video_store(project_name, video_metadata_file)
+
+    print("Partitioning profile metadata...")
+    profile_partition_dir, buckets = partition_profiles(
+        project_name,
+        profile_metadata_file,
+        chunk_size,
+        drop_columns=[llm_response_field, fingerprint_field],
+        add_custom_id=batch_interview,
+    )
+    try:
+        if not buckets:
+            print("No profiles to interview.")
+            return None
+
+        previous_responses = (
+            load_previous_responses(
+                f"{data_dir}/{output_file}", llm_response_field, fingerprint_field
+            )
+            if incremental
+            else {}
+        )
+
+        print("Generate system and user prompts chunk by chunk...")
+        num_pending_profiles = 0
+        num_staged_chunks = 0
+        with open(f"{data_dir}/batch-files/{batch_input_file_name}", "w") as batch_file:
+            for bucket in tqdm(buckets):
+                bucket_profiles = load_partition(
+                    profile_partition_dir, bucket, dtype={"id": str}
+                )
+                video_transcripts, video_ids = build_bucket_transcripts(
+                    project_name, video_metadata_file, bucket, videos_per_profile
+                )
+
+                for start in range(0, len(bucket_profiles), chunk_size):
+                    profiles = bucket_profiles.iloc[start : start + chunk_size].copy()
+                    profiles["transcripts_combined"] = (
+                        profiles["id"].map(video_transcripts).fillna("")
+                    )
+                    profiles[system_prompt_field] = profiles.apply(
+                        construct_system_prompt, args=(interview_type,), axis=1
+                    )
+                    profiles[user_prompt_field] = profiles.apply(
+                        construct_user_prompt, args=(interview_type,), axis=1
+                    )
+                    profiles[fingerprint_field] = profiles.apply(
+                        lambda row: compute_prompt_fingerprint(
+                            row,
+                            video_ids=video_ids.get(row["id"], ""),
+                            system_prompt_field=system_prompt_field,
+                            user_prompt_field=user_prompt_field,
+                            gpt_model=gpt_model,
+                        ),
+                        axis=1,
+                    )
+
+                    # Carry over unchanged responses and interview the remaining profiles
+                    profiles[llm_response_field] = match_previous_responses(
+                        profiles, previous_responses, fingerprint_field
+                    ).astype(object)
+                    pending = profiles[llm_response_field].isnull()
+                    num_pending_profiles += int(pending.sum())
+                    if batch_interview:
+                        for _, profile in profiles[pending].iterrows():
+                            task = build_batch_task(
+                                custom_id=profile["custom_id"],
+                                gpt_model=gpt_model,
+                                system_prompt=profile[system_prompt_field],
+                                user_prompt=profile[user_prompt_field],
+                            )
+                            batch_file.write(json.dumps(task) + "\n")
+                    elif pending.any():
+                        profiles.loc[pending, llm_response_field] = profiles[pending].apply(
+                            row_query,
+                            args=([system_prompt_field, user_prompt_field, gpt_model],),
+                            axis=1,
+                        )
+
+                    profiles.to_csv(
+                        staging_path,
+                        mode="w" if num_staged_chunks == 0 else "a",
+                        header=num_staged_chunks == 0,
+                        index=False,
+                    )
+                    num_staged_chunks += 1
+
+        record_metric("rows", num_pending_profiles)
+        print(
+            f"{num_pending_profiles} profiles to interview, {len(previous_responses)} previous responses available."
+        )
+
+        llm_responses = {}
+        if batch_interview and num_pending_profiles > 0:
+            print("Perform batch query using OpenAI API...")
+            llm_responses = batch_query(
+                project_name=project_name,
+                batch_input_file_dir=batch_input_file_name,
+                batch_output_file_dir=f"{batch_file_prefix}_output.jsonl",
+            )
+
+        # Merge LLM responses into the staged profiles while streaming them to the output file
+        print("Merge LLM response with staged profiles and saving them...")
+        output_path = f"{data_dir}/{output_file}"
+        for i, profiles in enumerate(
+            pd.read_csv(
+                staging_path,
+                dtype={"id": str, llm_response_field: object},
+                chunksize=chunk_size,
+            )
+        ):
+            if llm_responses:
+                missing_responses = profiles[llm_response_field].isnull()
+                profiles.loc[missing_responses, llm_response_field] = (
+                    profiles.loc[missing_responses, "custom_id"].astype(str).map(llm_responses)
+                )
+            profiles.to_csv(
+                f"{output_path}.tmp", mode="w" if i == 0 else "a", header=i == 0, index=False
+            )
+        os.replace(f"{output_path}.tmp", output_path)
+
+        # Clean up staged profiles
+        os.remove(staging_path)
+    finally:
+        shutil.rmtree(profile_partition_dir, ignore_errors=True)
+
+    return None
+
+
+def build_profile_prompt_chunked(
+    project_name: str,
+    profile_metadata_input_file: str,
+    profile_metadata_output_file: str,
+    video_metadata_file: str,
+    chunk_size: int,
+    videos_per_profile: int = PROMPT_VIDEOS_PER_PROFILE,
+) -> None:
+    """
+    Builds profile prompts like build_profile_prompt while holding only one bucket of the video
+    store and one chunk of profiles in memory at a time. The profiles in the output file are
+    ordered by bucket.
+
+    Args:
+        chunk_size (int): The maximum number of profiles held in memory at a time.
+        videos_per_profile (int, optional): The number of latest videos embedded per profile.
+            Defaults to PROMPT_VIDEOS_PER_PROFILE.
+
+    Returns:
+        None
+    """
+    data_dir = f"{base_dir}/../data/{project_name}"
+
+    print("Building profile-partitioned video store...")
+    refresh_video_store(project_name, video_metadata_file)
+
+    print("Partitioning profile metadata...")
+    profile_partition_dir, buckets = partition_profiles(
+        project_name, profile_metadata_input_file, chunk_size
+    )
+    try:
+
+        print("Construct profile prompts chunk by chunk...")
+        output_path = f"{data_dir}/{profile_metadata_output_file}"
+        num_written_chunks = 0
+        for bucket in tqdm(buckets):
+            bucket_profiles = load_partition(
+                profile_partition_dir, bucket, dtype={"id": str}
+            )
+            video_transcripts, _ = build_bucket_transcripts(
+                project_name, video_metadata_file, bucket, videos_per_profile
+            )
+
+            for start in range(0, len(bucket_profiles), chunk_size):
+                profiles = bucket_profiles.iloc[start : start + chunk_size].copy()
+                profiles["transcripts_combined"] = (
+                    profiles["id"].map(video_transcripts).fillna("")
+                )
+                profiles["profile_prompt"] = profiles.apply(
+                    construct_profile_prompt, axis=1
+                )
+                record_metric("rows", len(profiles))
+
+                profiles.to_csv(
+                    f"{output_path}.tmp",
+                    mode="w" if num_written_chunks == 0 else "a",
+                    header=num_written_chunks == 0,
+                    index=False,
+                )
+                num_written_chunks += 1
+
+        if num_written_chunks > 0:
+            os.replace(f"{output_path}.tmp", output_path)
+    finally:
+        shutil.rmtree(profile_partition_dir, ignore_errors=True)
+
+    return None
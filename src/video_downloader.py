@@ -0,0 +1,56 @@
+import os
+import threading
+from config.base_config import VIDEO_DOWNLOAD_OPTIONS
+
+# Long-lived yt-dlp downloaders, one per worker thread
+_video_downloaders = threading.local()
+
+
+def get_video_downloader():
+    """
+    Returns the yt-dlp downloader of the current thread, creating it on first use. Reusing the
+    downloader across videos initialises the extractors once and keeps the HTTP connections
+    alive between downloads.
+
+    Returns:
+        yt_dlp.YoutubeDL: The downloader of the current thread.
+    """
+    video_downloader = getattr(_video_downloaders, "video_downloader", None)
+    if video_downloader is None:
+        import yt_dlp
+
+        video_downloader = yt_dlp.YoutubeDL(dict(VIDEO_DOWNLOAD_OPTIONS))
+        _video_downloaders.video_downloader = video_downloader
+
+    return video_downloader
+
+
+def download_video_url(video_url: str, output_file: str) -> int:
+    """
+    Downloads a video with the downloader of the current thread, raising any download error.
+
+    The video information is fetched first (a single request). A file already present with the
+    size of the video (or any file if the size is unknown) is kept as is, and a partial download
+    left by an interrupted run (the '.part' file next to it) is resumed rather than restarted.
+
+    Args:
+        video_url (str): The URL of the video.
+        output_file (str): The path the video is saved to.
+
+    Returns:
+        int: The size of the downloaded file in bytes, or 0 if the file was already present.
+    """
+    video_downloader = get_video_downloader()
+    video_downloader.params["outtmpl"]["default"] = output_file
+    video_info = video_downloader.extract_info(video_url, download=False)
+
+    # Keep a complete file, and download again a file that does not have the size of the video
+    if os.path.exists(output_file):
+        expected_size = video_info.get("filesize")
+        if expected_size is None or os.path.getsize(output_file) == expected_size:
+            return 0
+        os.remove(output_file)
+
+    video_downloader.process_ie_result(video_info, download=True)
+
+    return os.path.getsize(output_file) if os.path.exists(output_file) else 0
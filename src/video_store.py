@@ -0,0 +1,354 @@
+import io
+import os
+import csv
+import json
+import zlib
+import fcntl
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from config.video_metadata_config import (
+    VIDEO_METADATA_DTYPES,
+    VIDEO_STORE_DIR,
+    VIDEO_STORE_BUCKETS,
+)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+VIDEO_STORE_MANIFEST_FILE = "manifest.json"
+VIDEO_STORE_INDEX_FILE = "index.csv"
+
+
+def profile_bucket(profile_id: str, num_buckets: int = VIDEO_STORE_BUCKETS) -> int:
+    """
+    Assigns a profile to a hash bucket. The hash is stable across processes, unlike hash().
+
+    Args:
+        profile_id (str): The profile ID.
+        num_buckets (int, optional): The number of buckets. Defaults to VIDEO_STORE_BUCKETS.
+
+    Returns:
+        int: The bucket of the profile.
+    """
+    return zlib.crc32(str(profile_id).encode()) % num_buckets
+
+
+def partition_by_profile(
+    chunks, partition_dir: str, id_column: str, num_buckets: int = VIDEO_STORE_BUCKETS
+) -> list:
+    """
+    Streams chunks of rows into one CSV file per profile hash bucket.
+
+    Args:
+        chunks (iterable): DataFrames of rows to partition.
+        partition_dir (str): The folder the bucket files are written to. Existing files are removed.
+        id_column (str): The column containing the profile ID.
+        num_buckets (int, optional): The number of buckets. Defaults to VIDEO_STORE_BUCKETS.
+
+    Returns:
+        list: The buckets that received at least one row, in ascending order.
+    """
+    shutil.rmtree(partition_dir, ignore_errors=True)
+    os.makedirs(partition_dir, exist_ok=True)
+
+    buckets = set()
+    for chunk in chunks:
+        chunk_buckets = chunk[id_column].map(
+            lambda profile_id: profile_bucket(profile_id, num_buckets)
+        )
+        for bucket, rows in chunk.groupby(chunk_buckets):
+            bucket_path = f"{partition_dir}/bucket_{bucket:03d}.csv"
+            rows.to_csv(
+                bucket_path, mode="a", header=bucket not in buckets, index=False
+            )
+            buckets.add(bucket)
+
+    return sorted(buckets)
+
+
+def load_partition(
+    partition_dir: str, bucket: int, dtype: dict = None
+) -> pd.DataFrame:
+    """
+    Loads the rows of a bucket written by partition_by_profile.
+
+    Args:
+        partition_dir (str): The folder containing the bucket files.
+        bucket (int): The bucket to load.
+        dtype (dict, optional): The column dtypes. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The rows of the bucket, or an empty DataFrame if the bucket has no rows.
+    """
+    bucket_path = f"{partition_dir}/bucket_{bucket:03d}.csv"
+    if not os.path.exists(bucket_path):
+        return pd.DataFrame()
+
+    return pd.read_csv(bucket_path, dtype=dtype)
+
+
+def get_video_store_dir(project_name: str, video_metadata_file: str) -> str:
+    """
+    Returns the folder of the video store built from a video metadata file.
+
+    Args:
+        project_name (str): The project name.
+        video_metadata_file (str): The name of the video metadata file.
+
+    Returns:
+        str: The path to the video store folder.
+    """
+    video_store_name = os.path.splitext(video_metadata_file)[0]
+    return f"{base_dir}/../data/{project_name}/{VIDEO_STORE_DIR}/{video_store_name}"
+
+
+def sort_store_bucket(bucket_path: str, bucket: int) -> pd.DataFrame:
+    """
+    Rewrites a bucket file with the videos of each profile stored contiguously from latest to
+    oldest, and saves the byte offset of every row next to it.
+
+    Args:
+        bucket_path (str): The path to the bucket file.
+        bucket (int): The bucket.
+
+    Returns:
+        pd.DataFrame: The index entries of the profiles in the bucket, with the 'profile_id',
+            'bucket', 'first_row' and 'num_videos' of each profile.
+    """
+    # ISO 8601 timestamps sort chronologically as strings
+    bucket_videos = pd.read_csv(bucket_path, dtype=str, keep_default_na=False)
+    bucket_videos = bucket_videos.sort_values(
+        by=["profile_id", "createTimeISO"], ascending=[True, False], kind="stable"
+    ).reset_index(drop=True)
+
+    # Write the rows one at a time to record where each row starts
+    row_offsets = []
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    with open(bucket_path, "wb") as file:
+        writer.writerow(bucket_videos.columns)
+        position = file.write(buffer.getvalue().encode())
+        for row in bucket_videos.itertuples(index=False, name=None):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(row)
+            row_offsets.append(position)
+            position += file.write(buffer.getvalue().encode())
+        row_offsets.append(position)
+    np.save(f"{os.path.splitext(bucket_path)[0]}_offsets.npy", np.array(row_offsets))
+
+    profile_rows = bucket_videos.groupby("profile_id", sort=False).size()
+    return pd.DataFrame(
+        {
+            "profile_id": profile_rows.index,
+            "bucket": bucket,
+            "first_row": np.concatenate([[0], profile_rows.cumsum().values[:-1]]),
+            "num_videos": profile_rows.values,
+        }
+    )
+
+
+def build_video_store(
+    project_name: str, video_metadata_file: str, video_metadata_chunks
+) -> list:
+    """
+    Builds the video store of a video metadata file, unless it was already built from the
+    current version of the file.
+
+    The videos are partitioned by profile hash bucket. Within a bucket, the videos of each
+    profile are stored contiguously from latest to oldest, and an index records where each
+    profile starts, so the videos of a profile are read with a single seek. Builds of the same
+    store are serialised with a lock file, so concurrent callers build it once.
+
+    Args:
+        project_name (str): The project name used to locate the video store.
+        video_metadata_file (str): The name of the video metadata file the store is built from.
+        video_metadata_chunks (iterable): DataFrames of video metadata with 'profile_id' and
+            'createTimeISO' columns (e.g. from iterate_video_metadata). Not consumed if the store is up to date.
+
+    Returns:
+        list: The buckets of the video store that contain videos.
+    """
+    video_store_dir = get_video_store_dir(project_name, video_metadata_file)
+    video_metadata_stat = os.stat(
+        f"{base_dir}/../data/{project_name}/{video_metadata_file}"
+    )
+    source = {
+        "video_metadata_file": video_metadata_file,
+        "size": video_metadata_stat.st_size,
+        "mtime": video_metadata_stat.st_mtime,
+        "num_buckets": VIDEO_STORE_BUCKETS,
+    }
+
+    # Concurrent builders of the same store wait for the first one and then reuse its store
+    os.makedirs(os.path.dirname(video_store_dir), exist_ok=True)
+    with open(f"{video_store_dir}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        # Reuse the video store if the video metadata has not changed since it was built
+        manifest_path = f"{video_store_dir}/{VIDEO_STORE_MANIFEST_FILE}"
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as file:
+                manifest = json.load(file)
+            if manifest["source"] == source:
+                return manifest["buckets"]
+
+        # Build the video store in a folder of its own next to the existing one and swap it in once complete
+        build_dir = tempfile.mkdtemp(
+            prefix=f"{os.path.basename(video_store_dir)}.tmp-",
+            dir=os.path.dirname(video_store_dir),
+        )
+        try:
+            buckets = partition_by_profile(
+                video_metadata_chunks, build_dir, id_column="profile_id"
+            )
+            profile_index = [
+                sort_store_bucket(f"{build_dir}/bucket_{bucket:03d}.csv", bucket)
+                for bucket in buckets
+            ]
+            if profile_index:
+                pd.concat(profile_index).to_csv(
+                    f"{build_dir}/{VIDEO_STORE_INDEX_FILE}", index=False
+                )
+            with open(f"{build_dir}/{VIDEO_STORE_MANIFEST_FILE}", "w") as file:
+                json.dump({"source": source, "buckets": buckets}, file, indent=2)
+
+            # Move the old store aside rather than deleting it in place, so the swap is two renames
+            if os.path.exists(video_store_dir):
+                os.replace(video_store_dir, f"{build_dir}.old")
+            os.replace(build_dir, video_store_dir)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            shutil.rmtree(f"{build_dir}.old", ignore_errors=True)
+
+    return buckets
+
+
+def load_video_store_bucket(
+    project_name: str, video_metadata_file: str, bucket: int
+) -> pd.DataFrame:
+    """
+    Loads the videos of every profile in a bucket of the video store.
+
+    Args:
+        project_name (str): The project name used to locate the video store.
+        video_metadata_file (str): The name of the video metadata file the store was built from.
+        bucket (int): The bucket to load.
+
+    Returns:
+        pd.DataFrame: The videos of the bucket.
+    """
+    return load_partition(
+        get_video_store_dir(project_name, video_metadata_file),
+        bucket,
+        dtype=VIDEO_METADATA_DTYPES,
+    )
+
+
+@lru_cache(maxsize=8)
+def load_video_store_index(video_store_dir: str, manifest_mtime: float) -> dict:
+    """
+    Loads the profile index of a video store. Cached until the store is rebuilt.
+
+    Args:
+        video_store_dir (str): The path to the video store folder.
+        manifest_mtime (float): The modification time of the store manifest, used to invalidate the cache.
+
+    Returns:
+        dict: A mapping from profile ID to its (bucket, first_row, num_videos).
+    """
+    index_path = f"{video_store_dir}/{VIDEO_STORE_INDEX_FILE}"
+    if not os.path.exists(index_path):
+        return {}
+
+    profile_index = pd.read_csv(index_path, dtype={"profile_id": str})
+    return {
+        profile_id: (bucket, first_row, num_videos)
+        for profile_id, bucket, first_row, num_videos in profile_index.itertuples(
+            index=False, name=None
+        )
+    }
+
+
+@lru_cache(maxsize=VIDEO_STORE_BUCKETS)
+def load_bucket_offsets(bucket_path: str, manifest_mtime: float) -> tuple:
+    """
+    Loads the header and row offsets of a bucket file. Cached until the store is rebuilt.
+
+    Args:
+        bucket_path (str): The path to the bucket file.
+        manifest_mtime (float): The modification time of the store manifest, used to invalidate the cache.
+
+    Returns:
+        tuple: The header line of the bucket file and the memory-mapped byte offsets of its rows.
+    """
+    with open(bucket_path, "rb") as file:
+        header = file.readline()
+    row_offsets = np.load(
+        f"{os.path.splitext(bucket_path)[0]}_offsets.npy", mmap_mode="r"
+    )
+
+    return header, row_offsets
+
+
+def read_profile_videos(
+    project_name: str,
+    video_metadata_file: str,
+    profile_ids: list,
+    latest_n: int = None,
+) -> pd.DataFrame:
+    """
+    Reads the videos of the given profiles from the video store, seeking directly to each
+    profile's videos.
+
+    Args:
+        project_name (str): The project name used to locate the video store.
+        video_metadata_file (str): The name of the video metadata file the store was built from.
+        profile_ids (list): The profile IDs.
+        latest_n (int, optional): The number of latest videos to read per profile. Defaults to all videos.
+
+    Returns:
+        pd.DataFrame: The videos of the profiles, each profile's videos ordered from latest to oldest.
+            Empty, with the store's columns, if none of the profiles have videos in the store.
+    """
+    video_store_dir = get_video_store_dir(project_name, video_metadata_file)
+    manifest_mtime = os.path.getmtime(f"{video_store_dir}/{VIDEO_STORE_MANIFEST_FILE}")
+    profile_index = load_video_store_index(video_store_dir, manifest_mtime)
+
+    header = None
+    profile_videos = []
+    for profile_id in profile_ids:
+        if str(profile_id) not in profile_index:
+            continue
+
+        bucket, first_row, num_videos = profile_index[str(profile_id)]
+        if latest_n is not None:
+            num_videos = min(num_videos, latest_n)
+        bucket_path = f"{video_store_dir}/bucket_{bucket:03d}.csv"
+        header, row_offsets = load_bucket_offsets(bucket_path, manifest_mtime)
+
+        start, end = row_offsets[first_row], row_offsets[first_row + num_videos]
+        with open(bucket_path, "rb") as file:
+            file.seek(start)
+            profile_videos.append(file.read(end - start))
+
+    # Without any of the profiles in the store, keep the store's columns so callers can still select them
+    if header is None:
+        bucket_paths = sorted(
+            file_name
+            for file_name in os.listdir(video_store_dir)
+            if file_name.startswith("bucket_") and file_name.endswith(".csv")
+        )
+        if not bucket_paths:
+            return pd.DataFrame(columns=list(VIDEO_METADATA_DTYPES.keys())).astype(
+                VIDEO_METADATA_DTYPES
+            )
+        header, _ = load_bucket_offsets(
+            f"{video_store_dir}/{bucket_paths[0]}", manifest_mtime
+        )
+
+    return pd.read_csv(
+        io.BytesIO(header + b"".join(profile_videos)), dtype=VIDEO_METADATA_DTYPES
+    )
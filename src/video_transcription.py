@@ -1,13 +1,326 @@
 import os
+import numpy as np
 import pandas as pd
-from src.utils import download_video, transcribe_videos
+from src.utils import (
+    download_video_file,
+    prepare_audio_file,
+    fingerprint_video_file,
+    load_video_metadata,
+    calculate_video_engagement,
+    extract_video_duration,
+    select_latest_videos,
+)
+from src.metrics import instrument_stage, record_metric
+from src.transcription_backends import get_transcription_backend
+from src.transcription_store import (
+    load_ineligible_videos,
+    record_transcription_failure,
+    record_transcript,
+    load_checkpointed_transcripts,
+    clear_checkpointed_transcripts,
+    record_audio_fingerprint,
+    find_matching_transcript,
+)
+from config.base_config import (
+    TRANSCRIPTION_PRIORITY_KEYS,
+    TRANSCRIPTION_BUDGET_AUDIO_MINUTES,
+    TRANSCRIPTION_BUDGET_USD,
+    TRANSCRIPTION_PRICE_PER_MINUTE,
+    TRANSCRIPTION_UNKNOWN_DURATION_SECONDS,
+    AUDIO_FINGERPRINT,
+    TRANSCRIPTION_BACKEND,
+    TRANSCRIPTION_BATCH_SIZE,
+)
 from config.market_signals_config import *
+from config.video_metadata_config import (
+    TRANSCRIPTION_VIDEO_COLUMNS,
+    PROMPT_VIDEOS_PER_PROFILE,
+)
 from tqdm import tqdm
 
 tqdm.pandas()
 
 
-def perform_video_transcription(project_name: str, video_metadata_file: str) -> None:
+def report_transcription_failure(
+    project_name: str, row: pd.Series, error: Exception
+) -> None:
+    """
+    Records a failed download or transcription of a video in the transcription ledger, unless the
+    error is not specific to the video (see is_video_error).
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+        row (pd.Series): A pandas Series containing the video information, including the 'id'.
+        error (Exception): The error raised while downloading or transcribing the video.
+
+    Returns:
+        None
+    """
+    record_metric("failures")
+    status = record_transcription_failure(project_name, row["id"], error)
+    print(f"Error transcribing video {row['id']} ({status or 'not recorded'}): {error}")
+
+    return None
+
+
+def save_video_transcript(
+    project_name: str,
+    row: pd.Series,
+    video_transcript: str,
+    audio_seconds: float,
+    fingerprint: np.ndarray = None,
+) -> str:
+    """
+    Checkpoints the transcript of a video in the transcription store, along with its audio
+    fingerprint if it has one.
+
+    Args:
+        project_name (str): The project name used to locate the transcription store.
+        row (pd.Series): A pandas Series containing the video information, including the 'id'.
+        video_transcript (str): The transcript of the video, empty if it has no speech.
+        audio_seconds (float): The seconds of audio transcribed.
+        fingerprint (np.ndarray, optional): The audio fingerprint of the video. Defaults to None.
+
+    Returns:
+        str: The transcript of the video.
+    """
+    record_metric("audio_seconds", audio_seconds)
+    record_transcript(project_name, row["id"], video_transcript)
+    if fingerprint is not None:
+        record_audio_fingerprint(project_name, row["id"], fingerprint, video_transcript)
+
+    return video_transcript
+
+
+def transcribe_video_batch(
+    videos: pd.DataFrame,
+    project_name: str,
+    transcription_backend: str = TRANSCRIPTION_BACKEND,
+) -> pd.Series:
+    """
+    Downloads and transcribes a batch of videos, checkpointing every transcript in the
+    transcription store and recording failed attempts in the transcription ledger.
+
+    The videos are downloaded and their audio prepared one at a time (see prepare_audio_file),
+    then the audio of the whole batch is sent to the transcription backend at once, so that a
+    local backend transcribes the batch in parallel. Every transcript is checkpointed as soon as
+    the backend returns it, so an interrupted batch keeps the transcripts already paid for. If AUDIO_FINGERPRINT is enabled, a video
+    whose audio matches a previously transcribed video (a reused sound or a repost) reuses its
+    transcript instead of being transcribed again.
+
+    Args:
+        videos (pd.DataFrame): The videos, including the 'id', 'webVideoUrl' and 'video_filename'.
+        project_name (str): The project name used to locate the video downloads and transcription store.
+        transcription_backend (str, optional): The transcription backend. Defaults to TRANSCRIPTION_BACKEND.
+
+    Returns:
+        pd.Series: The transcript of every video, with the index of videos, or None for the
+            videos that failed to transcribe.
+    """
+    video_transcripts = pd.Series(None, index=videos.index, dtype=object)
+    fingerprints = {}
+    audio_files = {}
+    for index, row in videos.iterrows():
+        try:
+            download_video_file(row, project_name)
+            if AUDIO_FINGERPRINT:
+                fingerprints[index] = fingerprint_video_file(row, project_name)
+                matching_video_id, video_transcript = find_matching_transcript(
+                    project_name, fingerprints[index]
+                )
+                if matching_video_id is not None:
+                    record_metric("fingerprint_matches")
+                    print(
+                        f"Video {row['id']} has the same audio as video {matching_video_id}, reusing its transcript..."
+                    )
+                    record_transcript(project_name, row["id"], video_transcript)
+                    video_transcripts.at[index] = video_transcript
+                    continue
+
+            audio_files[index] = prepare_audio_file(row, project_name)
+        except Exception as e:
+            report_transcription_failure(project_name, row, e)
+
+    # Videos without speech have an empty transcript
+    speech_indices = []
+    for index, (audio_file_path, audio_seconds) in audio_files.items():
+        if audio_file_path is None:
+            video_transcripts.at[index] = save_video_transcript(
+                project_name, videos.loc[index], "", audio_seconds, fingerprints.get(index)
+            )
+        else:
+            speech_indices.append(index)
+
+    # Transcribe the audio of the videos with speech at once, checkpointing every transcript as
+    # soon as the backend returns it
+    if speech_indices:
+        for position, video_transcript in get_transcription_backend(
+            transcription_backend
+        )([audio_files[index][0] for index in speech_indices]):
+            index = speech_indices[position]
+            if not isinstance(video_transcript, Exception):
+                video_transcripts.at[index] = save_video_transcript(
+                    project_name,
+                    videos.loc[index],
+                    video_transcript,
+                    audio_files[index][1],
+                    fingerprints.get(index),
+                )
+                continue
+
+            report_transcription_failure(
+                project_name, videos.loc[index], video_transcript
+            )
+            # Stop the run if the transcription service rejects the credentials, as every
+            # video would fail
+            if getattr(video_transcript, "status_code", None) in [401, 403]:
+                raise video_transcript
+
+    return video_transcripts
+
+
+def prioritize_videos(
+    videos: pd.DataFrame, priority_keys: list, panel_profile_ids: set = None
+) -> pd.DataFrame:
+    """
+    Orders videos by priority keys, highest value first.
+
+    Args:
+        videos (pd.DataFrame): The videos to order.
+        priority_keys (list): The keys to order by, in order of importance. "panel" ranks the
+            videos of panel profiles first, "engagement" ranks videos by calculate_video_engagement,
+            and any other key is a video metadata column (e.g. "createTimeISO" or "playCount").
+        panel_profile_ids (set, optional): The IDs of the panel profiles. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The videos in priority order. Videos missing a key are ranked last for that key.
+    """
+    if len(videos) == 0 or not priority_keys:
+        return videos
+
+    sort_keys = pd.DataFrame(index=videos.index)
+    for priority_key in priority_keys:
+        if priority_key == "panel":
+            sort_keys[priority_key] = (
+                videos["profile_id"].astype(str).isin(panel_profile_ids or set())
+            )
+        elif priority_key == "engagement":
+            sort_keys[priority_key] = videos.apply(calculate_video_engagement, axis=1)
+        else:
+            sort_keys[priority_key] = videos[priority_key]
+
+    sorted_index = sort_keys.sort_values(
+        by=priority_keys, ascending=False, na_position="last", kind="stable"
+    ).index
+
+    return videos.loc[sorted_index]
+
+
+def apply_transcription_budget(
+    videos: pd.DataFrame,
+    max_audio_minutes: float = None,
+    max_cost_usd: float = None,
+    price_per_minute: float = None,
+) -> pd.DataFrame:
+    """
+    Keeps the videos that fit within the audio and spend budgets of a run, in order, stopping
+    at the first video that does not fit. Videos whose duration is unknown are charged
+    TRANSCRIPTION_UNKNOWN_DURATION_SECONDS, so they cannot overrun the budgets.
+
+    Args:
+        videos (pd.DataFrame): The videos in priority order, with a 'videoMeta' field.
+        max_audio_minutes (float, optional): The maximum minutes of audio. Defaults to None (no limit).
+        max_cost_usd (float, optional): The maximum transcription spend, converted to minutes
+            with price_per_minute. Defaults to None (no limit).
+        price_per_minute (float, optional): The price of a minute of audio with the transcription
+            backend. Defaults to None (a free backend, to which max_cost_usd does not apply).
+
+    Returns:
+        pd.DataFrame: The videos to transcribe in this run.
+    """
+    budget_minutes = [
+        budget
+        for budget in [
+            max_audio_minutes,
+            (
+                max_cost_usd / price_per_minute
+                if max_cost_usd is not None and price_per_minute
+                else None
+            ),
+        ]
+        if budget is not None
+    ]
+    if len(videos) == 0 or not budget_minutes:
+        return videos
+
+    durations = videos.apply(extract_video_duration, axis=1)
+    durations = durations.where(durations > 0, TRANSCRIPTION_UNKNOWN_DURATION_SECONDS)
+    cumulative_minutes = durations.cumsum() / 60
+    within_budget = (cumulative_minutes <= min(budget_minutes)).cummin()
+    print(
+        f"Transcription budget of {min(budget_minutes):.1f} audio minutes covers {within_budget.sum()} of {len(videos)} videos."
+    )
+
+    return videos[within_budget]
+
+
+def combine_videos_per_profile(videos_per_profile: list) -> int:
+    """
+    Combines the numbers of latest videos per profile embedded by several prompt stages into the
+    working set that the transcription stage must cover for all of them.
+
+    Args:
+        videos_per_profile (list): The videos_per_profile of each prompt stage (None for every video).
+
+    Returns:
+        int: The largest number of videos per profile, or None if a stage embeds every video.
+    """
+    if any(latest_n is None for latest_n in videos_per_profile):
+        return None
+
+    return max(videos_per_profile)
+
+
+@instrument_stage
+def perform_video_transcription(
+    project_name: str,
+    video_metadata_file: str,
+    panel_profile_metadata_file: str = None,
+    priority_keys: list = TRANSCRIPTION_PRIORITY_KEYS,
+    max_audio_minutes: float = TRANSCRIPTION_BUDGET_AUDIO_MINUTES,
+    max_cost_usd: float = TRANSCRIPTION_BUDGET_USD,
+    videos_per_profile: int = PROMPT_VIDEOS_PER_PROFILE,
+    transcription_backend: str = TRANSCRIPTION_BACKEND,
+) -> None:
+    """
+    Downloads and transcribes the videos of a video metadata file that have no transcript yet.
+
+    Only the working set of the prompts is transcribed: the latest videos_per_profile videos of
+    each profile. The older videos are left untranscribed until a stage that embeds more videos
+    per profile runs the transcription again with a larger videos_per_profile, which then only
+    transcribes the videos that are still missing. Pipelines size the working set from the
+    videos_per_profile of their prompt stages (see combine_videos_per_profile).
+
+    Args:
+        project_name (str): The project name used to locate the video metadata file.
+        video_metadata_file (str): The name of the video metadata file.
+        panel_profile_metadata_file (str, optional): A profile metadata file whose profiles are
+            transcribed first. Defaults to None.
+        priority_keys (list, optional): The order in which videos are transcribed. Defaults to TRANSCRIPTION_PRIORITY_KEYS.
+        max_audio_minutes (float, optional): The maximum minutes of audio transcribed. Defaults to TRANSCRIPTION_BUDGET_AUDIO_MINUTES.
+        max_cost_usd (float, optional): The maximum transcription spend, applied to the backends of
+            TRANSCRIPTION_PRICE_PER_MINUTE only. Defaults to TRANSCRIPTION_BUDGET_USD.
+        videos_per_profile (int, optional): The number of latest videos per profile to transcribe.
+            Defaults to PROMPT_VIDEOS_PER_PROFILE (None transcribes every video).
+        transcription_backend (str, optional): The transcription backend (see
+            src/transcription_backends.py). Defaults to TRANSCRIPTION_BACKEND.
+
+    Returns:
+        None
+    """
+    # Fail before any work if the transcription backend does not exist
+    get_transcription_backend(transcription_backend)
+
     print("Creating video downloads folder...")
     # Create the video downloads folder for project if it does not exist
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -24,7 +337,9 @@ def perform_video_transcription(project_name: str, video_metadata_file: str) ->
             "Run profile_search.py to generate video metadata first."
         )
     else:
-        video_metadata = pd.read_csv(video_metadata_file_path)
+        video_metadata = load_video_metadata(
+            project_name, video_metadata_file, usecols=TRANSCRIPTION_VIDEO_COLUMNS
+        )
 
     if "video_transcript" not in video_metadata.columns:
         video_metadata.dropna(subset=["id"], inplace=True)
@@ -53,18 +368,81 @@ def perform_video_transcription(project_name: str, video_metadata_file: str) ->
         video_metadata_without_transcript["id"].apply(lambda x: x + ".mp4")
     )
 
-    # Download videos that have not been transcribed and perform transcription
-    print("Downloading videos that have not been transcribed...")
-    video_metadata_without_transcript.progress_apply(
-        download_video, args=(project_name,), axis=1
-    )
-    print("Transcribing videos...")
     video_metadata_without_transcript["video_transcript"] = (
-        video_metadata_without_transcript.progress_apply(
-            transcribe_videos, args=(project_name,), axis=1
+        video_metadata_without_transcript["video_transcript"].astype(object)
+    )
+
+    # Resume from the transcripts checkpointed by an interrupted run
+    checkpointed_transcripts = load_checkpointed_transcripts(project_name)
+    checkpointed = video_metadata_without_transcript["id"].isin(
+        checkpointed_transcripts.keys()
+    )
+    print(f"Resuming {checkpointed.sum()} transcripts checkpointed by a previous run...")
+    video_metadata_without_transcript.loc[checkpointed, "video_transcript"] = (
+        video_metadata_without_transcript.loc[checkpointed, "id"].map(
+            checkpointed_transcripts
+        )
+    )
+
+    # Skip videos that failed permanently or whose next attempt is not due yet
+    ineligible_videos = load_ineligible_videos(project_name)
+    ineligible = video_metadata_without_transcript["id"].isin(ineligible_videos)
+    eligible = ~checkpointed & ~ineligible
+
+    # Leave the videos that no prompt embeds for a later run that asks for them
+    if videos_per_profile is not None:
+        working_set = set(
+            select_latest_videos(
+                video_metadata.dropna(subset=["id"]), videos_per_profile
+            )["id"]
+            .astype("int64")
+            .astype(str)
+        )
+        in_working_set = video_metadata_without_transcript["id"].isin(working_set)
+        print(
+            f"Deferring {(eligible & ~in_working_set).sum()} videos beyond the latest {videos_per_profile} of each profile..."
         )
+        eligible &= in_working_set
+    print(
+        f"Skipping {ineligible.sum()} videos that failed to transcribe or had no speech in previous runs..."
     )
 
+    # Queue the eligible videos by priority and keep those within the budget of this run
+    panel_profile_ids = set()
+    panel_profile_metadata_path = (
+        f"{base_dir}/../data/{project_name}/{panel_profile_metadata_file}"
+    )
+    if panel_profile_metadata_file and os.path.exists(panel_profile_metadata_path):
+        panel_profile_ids = set(
+            pd.read_csv(panel_profile_metadata_path, usecols=["id"], dtype=str)["id"]
+        )
+    transcription_queue = apply_transcription_budget(
+        prioritize_videos(
+            video_metadata_without_transcript[eligible],
+            priority_keys,
+            panel_profile_ids,
+        ),
+        max_audio_minutes=max_audio_minutes,
+        max_cost_usd=max_cost_usd,
+        price_per_minute=TRANSCRIPTION_PRICE_PER_MINUTE.get(transcription_backend),
+    )
+    record_metric("rows", len(transcription_queue))
+
+    # Download and transcribe videos that have not been transcribed, a batch at a time
+    # (every transcript is checkpointed as soon as its batch is transcribed)
+    print(
+        f"Downloading and transcribing videos that have not been transcribed with the {transcription_backend} backend..."
+    )
+    with tqdm(total=len(transcription_queue)) as progress_bar:
+        for start in range(0, len(transcription_queue), TRANSCRIPTION_BATCH_SIZE):
+            video_batch = transcription_queue.iloc[
+                start : start + TRANSCRIPTION_BATCH_SIZE
+            ]
+            video_metadata_without_transcript.loc[
+                video_batch.index, "video_transcript"
+            ] = transcribe_video_batch(video_batch, project_name, transcription_backend)
+            progress_bar.update(len(video_batch))
+
     # Merge newly transcribed videos with existing video metadata
     print(
         "Merge newly transcribed videos with existing video metadata and saving it..."
@@ -76,13 +454,20 @@ def perform_video_transcription(project_name: str, video_metadata_file: str) ->
         [video_metadata_with_transcript, video_metadata_without_transcript],
         ignore_index=True,
     )
-    video_metadata.to_csv(
-        f"{base_dir}/../data/{project_name}/{video_metadata_file}", index=False
+    video_metadata.to_csv(f"{video_metadata_file_path}.tmp", index=False)
+    os.replace(f"{video_metadata_file_path}.tmp", video_metadata_file_path)
+
+    # The saved transcripts no longer need their checkpoints
+    clear_checkpointed_transcripts(
+        project_name,
+        video_metadata.loc[video_metadata["video_transcript"].notnull(), "id"]
+        .astype(str)
+        .tolist(),
     )
 
-    # Clean up downloaded videos to save disk space
+    # Clean up downloaded videos to save disk space, keeping partial downloads to resume them
     print("Disk clean up of downloaded videos...")
     for file in os.listdir(video_download_folder_path):
         file_path = os.path.join(video_download_folder_path, file)
-        if os.path.isfile(file_path):
+        if os.path.isfile(file_path) and not file.endswith(".part"):
             os.remove(file_path)